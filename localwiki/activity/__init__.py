@@ -1,4 +1,5 @@
 from .models import ActivityForModel
+from .signals import connect_changes_class
 
 
 class Registry(object):
@@ -22,6 +23,7 @@ def register(changes_class):
         changes_class: A subclass of ActivityForModel
     """
     changes_registry.register(changes_class)
+    connect_changes_class(changes_class)
 
 
 def get_changes_classes():
@@ -0,0 +1,33 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+
+from follow.models import Follow
+
+from activity.timeline import rebuild_timeline, timeline_length
+
+
+class Command(BaseCommand):
+    args = '[<username> ...]'
+    help = ("Builds the followed activity timelines of the given users, or "
+            "of everyone who follows something, from scratch.")
+    option_list = BaseCommand.option_list + (
+        make_option('--length',
+            type='int',
+            dest='length',
+            default=None,
+            help='Number of changes to keep in each timeline'),
+    )
+
+    def handle(self, *usernames, **options):
+        length = options['length'] or timeline_length()
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+        else:
+            users = User.objects.filter(
+                id__in=Follow.objects.values('user').distinct())
+
+        for user in users.iterator():
+            n = rebuild_timeline(user, length=length)
+            self.stdout.write('%s: %d changes\n' % (user.username, n))
@@ -1,3 +1,7 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+
 from localwiki.utils.urlresolvers import reverse
 
 
@@ -92,3 +96,21 @@ class ActivityForModel(object):
             'region': self.page(obj).region.slug,
             'date': obj.version_info.date,
         })
+
+
+class TimelineEntry(models.Model):
+    """
+    A change (a historical record or an actstream Action) in the timeline
+    of a user who follows it.  Filled in by timeline.py as changes are
+    made.
+    """
+    user = models.ForeignKey(User, related_name='+')
+    timestamp = models.DateTimeField()
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+
+    class Meta:
+        index_together = [('user', 'timestamp', 'id')]
+
+
+import signals
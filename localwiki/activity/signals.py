@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+
+from actstream.models import Action
+from follow.models import Follow
+
+from .timeline import change_created, follow_changed
+
+
+def connect_changes_class(changes_class):
+    """
+    Fans the new historical records shown by `changes_class` out to
+    timelines.  Called as each changes class is registered.
+    """
+    post_save.connect(change_created, sender=changes_class().queryset().model)
+
+
+post_save.connect(change_created, sender=Action)
+post_save.connect(follow_changed, sender=Follow)
+post_delete.connect(follow_changed, sender=Follow)
@@ -0,0 +1,110 @@
+import datetime
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.utils.html import escape
+
+from follow.models import Follow
+
+from regions.models import Region
+from pages.models import Page
+
+from .models import TimelineEntry
+from .timeline import fan_out, rebuild_timeline, resolve_entries, _rebuild_timeline
+from .views import RegionActivity
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name="San Francisco", slug="sf")
+        self.sf.save()
+        self.oak = Region(full_name="Oakland", slug="oak")
+        self.oak.save()
+
+        self.user = User.objects.create_user(
+            username='testuser', email='testuser@example.org', password='fakepassword')
+        Follow(user=self.user, target_region=self.sf).save()
+
+        for name in ('Parks', 'Dolores Park', 'Cafes'):
+            Page(name=name, content='<p>Hi</p>', region=self.sf).save()
+        Page(name='Lake Merritt', content='<p>Hi</p>', region=self.oak).save()
+
+    def timeline(self):
+        entries = TimelineEntry.objects.filter(user=self.user).order_by('-timestamp', '-id')
+        return resolve_entries(entries)
+
+    def test_rebuild_timeline(self):
+        TimelineEntry.objects.filter(user=self.user).delete()
+        self.assertEqual(rebuild_timeline(self.user), 3)
+        self.assertEqual([p.name for p in self.timeline()],
+                         ['Cafes', 'Dolores Park', 'Parks'])
+
+        # Bounded in length
+        self.assertEqual(rebuild_timeline(self.user, length=2), 2)
+        self.assertEqual([p.name for p in self.timeline()],
+                         ['Cafes', 'Dolores Park'])
+
+    @override_settings(ACTIVITY_TIMELINE_LENGTH=2)
+    def test_fan_out_trims(self):
+        TimelineEntry.objects.filter(user=self.user).delete()
+        page_ct = ContentType.objects.get_for_model(Page.versions.model)
+        for i, p in enumerate(Page.versions.filter(region=self.sf).order_by('history_id')):
+            fan_out(page_ct.id, p.history_id, datetime.datetime(2014, 1, i + 1), [self.user.id])
+
+        self.assertEqual([p.name for p in self.timeline()], ['Cafes', 'Dolores Park'])
+
+    def test_follow_changed(self):
+        # What the task queued when a Follow is saved or deleted does.
+        TimelineEntry.objects.filter(user=self.user).delete()
+        follow = Follow(user=self.user, target_region=self.oak)
+        follow.save()
+        _rebuild_timeline(self.user.id)
+        self.assertEqual([p.name for p in self.timeline()],
+                         ['Lake Merritt', 'Cafes', 'Dolores Park', 'Parks'])
+
+        follow.delete()
+        _rebuild_timeline(self.user.id)
+        self.assertEqual([p.name for p in self.timeline()],
+                         ['Cafes', 'Dolores Park', 'Parks'])
+
+    def test_followed_activity_view(self):
+        rebuild_timeline(self.user)
+        self.client.login(username='testuser', password='fakepassword')
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c.name for c in response.context['changes']],
+                         ['Cafes', 'Dolores Park', 'Parks'])
+        self.assertFalse(response.context['pagination_has_more_left'])
+        self.assertContains(response, 'Dolores Park')
+
+
+class RegionActivityViewTest(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name="San Francisco", slug="sf")
+        self.sf.save()
+        for name in ('Parks', 'Dolores Park', 'Cafes'):
+            Page(name=name, content='<p>Hi</p>', region=self.sf).save()
+
+        self._items_per_page = RegionActivity.items_per_page
+        RegionActivity.items_per_page = 2
+
+    def tearDown(self):
+        RegionActivity.items_per_page = self._items_per_page
+
+    def test_pages(self):
+        response = self.client.get('/sf/_activity')
+        self.assertEqual(response.status_code, 200)
+        changes = response.context['changes']
+        self.assertEqual([c.name for c in changes], ['Cafes', 'Dolores Park'])
+        self.assertTrue(response.context['pagination_has_more_left'])
+        pagination_next = response.context['pagination_next']
+        self.assertTrue(pagination_next.startswith('?'))
+        self.assertContains(response, escape(pagination_next))
+
+        response = self.client.get('/sf/_activity' + pagination_next)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c.name for c in response.context['changes']], ['Parks'])
+        self.assertFalse(response.context['pagination_has_more_left'])
+        self.assertEqual(response.context['pagination_next'], '')
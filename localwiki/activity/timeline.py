@@ -0,0 +1,300 @@
+"""
+Per-user timelines of followed activity.
+
+Rather than assembling a user's followed activity from every region, page
+and user they follow on each request, we copy each change into the
+timeline of everyone following it when the change is made ("fan-out on
+write").  Each timeline is trimmed to the ACTIVITY_TIMELINE_LENGTH most
+recent changes.
+"""
+from collections import defaultdict
+
+from celery import shared_task
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.contrib.contenttypes.models import ContentType
+
+from follow.models import Follow
+
+from localwiki.utils import take_n_newest
+
+from .models import TimelineEntry
+
+
+def timeline_length():
+    return getattr(settings, 'ACTIVITY_TIMELINE_LENGTH', 1000)
+
+
+def _changes_by_model():
+    """
+    Returns:
+        A dictionary mapping each historical model shown on the Activity
+        pages to an instance of its changes class.
+    """
+    from . import get_changes_classes
+
+    changes = {}
+    for change_class in get_changes_classes():
+        change_obj = change_class()
+        changes[change_obj.queryset().model] = change_obj
+    return changes
+
+
+def _lookup(obj, attr):
+    # E.g. 'page__slug'
+    for name in attr.split('__'):
+        obj = getattr(obj, name, None)
+    return obj
+
+
+def change_followers(region_id, slug):
+    """
+    Returns:
+        The ids of the users following a change in the region, either
+        because they follow the region or the page it's on.
+    """
+    followers = set(Follow.objects.filter(target_region=region_id).
+        values_list('user', flat=True))
+    if slug is not None:
+        followers.update(Follow.objects.filter(
+            target_page__region=region_id, target_page__slug=slug).
+            values_list('user', flat=True))
+    return followers
+
+
+def action_followers(actor_id):
+    """
+    Returns:
+        The ids of the users following the actor of an Action.
+    """
+    return set(Follow.objects.filter(target_user=actor_id).
+        exclude(user=actor_id).values_list('user', flat=True))
+
+
+def trim_timelines(user_ids, length=None):
+    """
+    Removes all but the `length` most recent entries from the timelines
+    of the users.
+    """
+    if not user_ids:
+        return
+    length = length or timeline_length()
+    table = TimelineEntry._meta.db_table
+    cursor = connection.cursor()
+    cursor.execute("""
+        DELETE FROM %(table)s WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS n
+                FROM %(table)s WHERE user_id IN %%s
+            ) numbered WHERE n > %%s
+        )""" % {'table': table}, [tuple(user_ids), length])
+
+
+def fan_out(content_type_id, object_id, timestamp, user_ids):
+    """
+    Adds a change to the timelines of the users.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.commit_on_success():
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, timestamp=timestamp,
+                content_type_id=content_type_id, object_id=object_id)
+            for user_id in user_ids
+        ])
+        trim_timelines(user_ids)
+
+
+@shared_task(ignore_result=True)
+def _fan_out_change(content_type_id, object_id, timestamp, region_id, slug):
+    fan_out(content_type_id, object_id, timestamp,
+            change_followers(region_id, slug))
+
+
+@shared_task(ignore_result=True)
+def _fan_out_action(content_type_id, object_id, timestamp, actor_id):
+    fan_out(content_type_id, object_id, timestamp, action_followers(actor_id))
+
+
+_timeline_models = None
+
+
+def timeline_models():
+    global _timeline_models
+    if _timeline_models is None:
+        _timeline_models = _changes_by_model()
+    return _timeline_models
+
+
+def change_created(sender, instance, created, raw, **kwargs):
+    """
+    post_save handler that fans new historical records and actstream
+    Actions out to the timelines of their followers.
+    """
+    if not created or raw:
+        return
+
+    from actstream.models import Action
+    from django.contrib.auth.models import User
+
+    if sender is Action:
+        if instance.actor_content_type_id != ContentType.objects.get_for_model(User).id:
+            return
+        _fan_out_action.delay(
+            ContentType.objects.get_for_model(Action).id, instance.id,
+            instance.timestamp, int(instance.actor_object_id))
+        return
+
+    change_obj = timeline_models().get(sender)
+    if change_obj is None:
+        return
+    _fan_out_change.delay(
+        ContentType.objects.get_for_model(sender).id, instance.history_id,
+        instance.version_info.date, instance.region_id,
+        _lookup(instance, change_obj.get_page_lookup_info()))
+
+
+@shared_task(ignore_result=True)
+def _rebuild_timeline(user_id):
+    from django.contrib.auth.models import User
+
+    users = User.objects.filter(id=user_id)
+    if users:
+        rebuild_timeline(users[0])
+
+
+def follow_changed(sender, instance, raw=False, **kwargs):
+    """
+    post_save and post_delete handler for Follow.  Rebuilds the follower's
+    timeline, which backfills it with the changes they now follow or
+    drops the ones they've stopped following.
+    """
+    if raw:
+        return
+    _rebuild_timeline.delay(instance.user_id)
+
+
+def followed_changes(user):
+    """
+    Returns:
+        A list of querysets that together make up the changes followed by
+        `user`, newest first.  Used to build timelines from scratch.
+    """
+    from actstream.models import actor_stream, Action
+    from . import get_changes_classes
+
+    change_sets = []
+
+    pages_followed = Follow.objects.filter(user=user).\
+        exclude(target_page=None).\
+        select_related('target_page').\
+        only('target_page__slug', 'target_page__region__id')
+
+    followed_by_region = defaultdict(list)
+    for f in pages_followed:
+        slug, region_id = f.target_page.slug, f.target_page.region_id
+        followed_by_region[region_id].append(slug)
+
+    regions_followed = Follow.objects.filter(user=user).\
+        exclude(target_region=None).\
+        select_related('target_region')
+
+    for change_class in get_changes_classes():
+        change_obj = change_class()
+        change_set = change_obj.queryset().none()
+
+        # The followed pages' changes
+        key = "%s__in" % change_obj.get_page_lookup_info()
+        for region, pages_followed_slugs in followed_by_region.iteritems():
+            change_obj.region = region
+            lookups = {
+                'region': region,
+                key: pages_followed_slugs,
+            }
+            change_set = change_set | change_obj.queryset().filter(**lookups)
+
+        # The followed regions' changes
+        for follow in regions_followed:
+            change_obj.region = follow.target_region
+            change_set = change_set | change_obj.queryset().filter(region=follow.target_region)
+
+        change_sets.append(change_set.order_by('-history_date', '-history_id'))
+
+    # The actions of users we follow
+    action_set = Action.objects.none()
+    for follow in Follow.objects.filter(user=user).\
+        exclude(target_user=None).\
+        exclude(target_user=user).\
+        select_related('target_user'):
+
+        action_set = action_set | actor_stream(follow.target_user)
+    change_sets.append(action_set.order_by('-timestamp', '-id'))
+
+    return change_sets
+
+
+def rebuild_timeline(user, length=None):
+    """
+    Replaces the timeline of `user` with their `length` most recent
+    followed changes.
+
+    Returns:
+        The number of entries in the new timeline.
+    """
+    from actstream.models import Action
+
+    length = length or timeline_length()
+    change_sets = [qs[:length] for qs in followed_changes(user)]
+
+    def _key(obj):
+        if isinstance(obj, Action):
+            return (obj.timestamp, obj.id)
+        return (obj.version_info.date, obj.history_id)
+
+    changes, last_keys, has_more_left = take_n_newest(change_sets, length, key=_key)
+    content_types = {}
+    entries = []
+    for obj in changes:
+        model = obj.__class__
+        if model not in content_types:
+            content_types[model] = ContentType.objects.get_for_model(model)
+        entries.append(TimelineEntry(user=user, timestamp=_key(obj)[0],
+            content_type=content_types[model], object_id=obj.pk))
+
+    with transaction.commit_on_success():
+        TimelineEntry.objects.filter(user=user).delete()
+        TimelineEntry.objects.bulk_create(entries)
+    return len(entries)
+
+
+def resolve_entries(entries):
+    """
+    Returns:
+        The changes the timeline entries refer to, in the same order, with
+        one query per type of change.  Changes that no longer exist are
+        left out.
+    """
+    from actstream.models import Action
+
+    ids_by_type = defaultdict(list)
+    for entry in entries:
+        ids_by_type[entry.content_type_id].append(entry.object_id)
+
+    changes = timeline_models()
+    objs = {}
+    for content_type_id, ids in ids_by_type.iteritems():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model in changes:
+            qs = changes[model].queryset().filter(history_id__in=ids)
+        elif model is Action:
+            qs = Action.objects.filter(id__in=ids)
+        else:
+            continue
+        for obj in qs:
+            objs[(content_type_id, obj.pk)] = obj
+
+    return [objs[(e.content_type_id, e.object_id)] for e in entries
+            if (e.content_type_id, e.object_id) in objs]
@@ -1,18 +1,17 @@
 import datetime
 from itertools import groupby
-from collections import defaultdict
 
 from django.http import Http404
 from django.contrib.auth.models import User
 
-from follow.models import Follow
-
 from versionutils.versioning.constants import *
 from regions.views import RegionMixin
 from localwiki.utils.urlresolvers import reverse
 from localwiki.utils.views import MultipleTypesPaginatedView
 
 from . import get_changes_classes
+from .models import TimelineEntry
+from .timeline import resolve_entries
 
 IGNORE_TYPES = [
     TYPE_DELETED_CASCADE,
@@ -21,7 +20,19 @@ IGNORE_TYPES = [
 ]
 
 
-class RegionActivity(RegionMixin, MultipleTypesPaginatedView):
+class ChangesPaginationMixin(object):
+    """
+    Pages through the changes with cursors rather than OFFSETs.
+    """
+    def get_pagination_cursor_fields(self, qs):
+        from actstream.models import Action
+
+        if issubclass(qs.model, Action):
+            return ('timestamp', 'id')
+        return ('history_date', 'history_id')
+
+
+class RegionActivity(ChangesPaginationMixin, RegionMixin, MultipleTypesPaginatedView):
     context_object_name = 'changes'
 
     def get_template_names(self):
@@ -70,89 +81,15 @@ class FollowedActivity(MultipleTypesPaginatedView):
         return ['activity/followed_activity_index.html']
 
     def get_object_lists(self):
-        from actstream.models import actor_stream, Action
-        from pages.models import Page, slugify
-
-        change_sets = []
-
-        pages_followed = Follow.objects.filter(user=self.request.user).\
-            exclude(target_page=None).\
-            select_related('target_page').\
-            only('target_page__slug', 'target_page__region__id')
+        # Filled in as changes are made, see timeline.py.
+        return [TimelineEntry.objects.filter(user=self.request.user)]
 
-        # XXX Possibily inefficient to iterate through
-        # all the regions-they-have-a-page-they-follow-in
-        # here, but alternatives seem too complex to write right
-        # now.
-        followed_by_region = defaultdict(list)
-        for f in pages_followed:
-            slug, region_id = f.target_page.slug, f.target_page.region_id
-            followed_by_region[region_id].append(slug)
-
-        for change_class in get_changes_classes():
-            change_obj = change_class()
-            change_set = change_obj.queryset().none()
-
-            ###############################################
-            # First, let's get the followed pages' changes
-            ###############################################
-            attr = change_obj.get_page_lookup_info()
-            key = "%s__in" % attr
-
-            for region, pages_followed_slugs in followed_by_region.iteritems():
-                change_obj.region = region
-                lookups = {
-                    'region': region,
-                    key: pages_followed_slugs,
-                }
-                # We use the queryset OR here so we avoid multiple queries.
-                change_set = change_set | change_obj.queryset().filter(**lookups)
-
-            ###############################################
-            # Now let's get the followed region's changes
-            ###############################################
-            regions_followed = Follow.objects.filter(user=self.request.user).\
-                exclude(target_region=None).\
-                select_related('target_region')
-
-            for follow in regions_followed:
-                change_obj.region = follow.target_region
-                change_set = change_set | change_obj.queryset().filter(region=follow.target_region)
-
-            if change_class == 'page':
-                # Special case: own user pages
-                # TODO: use users.views.get_user_page() here once we unify user pages
-                change_sets = change_set | Page.versions.filter(slug=slugify('users/%s' % self.request.user.username))
-
-            change_sets.append(change_set)
-
-        ###############################################
-        # The action (actstream) for users we follow
-        ###############################################
-        action_set = Action.objects.none()
-        for follow in Follow.objects.filter(user=self.request.user).\
-            exclude(target_user=None).\
-            exclude(target_user=self.request.user).\
-            select_related('target_user'):
-
-            action_set = action_set | actor_stream(follow.target_user)
-        change_sets.append(action_set)
+    def get_pagination_cursor_fields(self, qs):
+        return ('timestamp', 'id')
 
-
-        return change_sets
-
-    def get_pagination_merge_key(self):
-        """
-        Returns:
-            A callable that, when called, returns the value to use for the merge +
-            sort.  Default: the value inside the list itself.
-        """
-        from actstream.models import Action
-        def _f(x):
-            if isinstance(x, Action):
-                return x.timestamp
-            return x.version_info.date
-        return (_f)
+    def get_pagination_objects(self):
+        entries = super(FollowedActivity, self).get_pagination_objects()
+        return resolve_entries(entries)
 
     def get_context_data(self, *args, **kwargs):
         c = super(FollowedActivity, self).get_context_data(*args, **kwargs)
@@ -165,7 +102,7 @@ class FollowedActivity(MultipleTypesPaginatedView):
         return c
 
 
-class UserActivity(MultipleTypesPaginatedView):
+class UserActivity(ChangesPaginationMixin, MultipleTypesPaginatedView):
     context_object_name = 'changes'
 
     def get_template_names(self):
@@ -210,7 +147,7 @@ class UserActivity(MultipleTypesPaginatedView):
         return c
 
 
-class AllActivity(MultipleTypesPaginatedView):
+class AllActivity(ChangesPaginationMixin, MultipleTypesPaginatedView):
     context_object_name = 'changes'
 
     def get_template_names(self):
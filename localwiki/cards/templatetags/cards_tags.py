@@ -101,7 +101,7 @@ def render_region_card(context, region, key=False):
             _file = frontpage.cover_photo
 
     # Otherwise, try and get a map
-    if not _file and not is_meta_region and region.geom:
+    if not _file and not is_meta_region and region.centroid:
         id = (key if key != False else 'map') + '_region_id_%s' % region.id
         map_opts = map_options_for_region(region)
         map_opts['default_zoom'] -= 1
@@ -0,0 +1,40 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from regions.models import Region
+
+from dashboard.models import rebuild_rollups
+
+
+class Command(BaseCommand):
+    args = '<region_slug region_slug ...>'
+    help = ('Rebuilds the daily rollups the dashboard charts are drawn from, '
+            'from the full history of the given regions.\n' +
+            'Usage: localwiki-manage rebuild_dashboard_rollups [--all] <region_slug ...>')
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Rebuild the rollups of every region'),
+    )
+
+    def handle(self, *slugs, **options):
+        if options['all']:
+            rebuild_rollups()
+            self.stdout.write('Rebuilt the rollups of every region\n')
+            return
+        if not slugs:
+            raise CommandError("You must provide a region slug or --all.")
+
+        regions = []
+        for slug in slugs:
+            try:
+                regions.append(Region.objects.defer('geom').get(slug=slug))
+            except Region.DoesNotExist:
+                raise CommandError('Region "%s" does not exist.' % slug)
+        for region in regions:
+            rebuild_rollups([region])
+            self.stdout.write('Rebuilt the rollups of "%s"\n' % region.slug)
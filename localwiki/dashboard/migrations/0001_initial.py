@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'DailyRollup'
+        db.create_table(u'dashboard_dailyrollup', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('region', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['regions.Region'])),
+            ('object_type', self.gf('django.db.models.fields.CharField')(max_length=20)),
+            ('day', self.gf('django.db.models.fields.DateField')()),
+            ('added', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('deleted', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('edits', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('content_bytes', self.gf('django.db.models.fields.BigIntegerField')(default=0)),
+        ))
+        db.send_create_signal(u'dashboard', ['DailyRollup'])
+
+        # Adding unique constraint on 'DailyRollup', fields ['region', 'object_type', 'day']
+        db.create_unique(u'dashboard_dailyrollup', ['region_id', 'object_type', 'day'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'DailyRollup', fields ['region', 'object_type', 'day']
+        db.delete_unique(u'dashboard_dailyrollup', ['region_id', 'object_type', 'day'])
+
+        # Deleting model 'DailyRollup'
+        db.delete_table(u'dashboard_dailyrollup')
+
+
+    models = {
+        u'dashboard.dailyrollup': {
+            'Meta': {'unique_together': "(('region', 'object_type', 'day'),)", 'object_name': 'DailyRollup'},
+            'added': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'content_bytes': ('django.db.models.fields.BigIntegerField', [], {'default': '0'}),
+            'day': ('django.db.models.fields.DateField', [], {}),
+            'deleted': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'edits': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_type': ('django.db.models.fields.CharField', [], {'max_length': '20'}),
+            'region': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['regions.Region']"})
+        },
+        u'regions.region': {
+            'Meta': {'object_name': 'Region'},
+            'bbox': ('django.contrib.gis.db.models.fields.PolygonField', [], {'null': 'True', 'blank': 'True'}),
+            'centroid': ('django.contrib.gis.db.models.fields.PointField', [], {'null': 'True', 'blank': 'True'}),
+            'full_name': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'geom': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True', 'db_index': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'unique': 'True', 'max_length': '255'})
+        }
+    }
+
+    complete_apps = ['dashboard']
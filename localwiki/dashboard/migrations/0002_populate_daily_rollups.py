@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import DataMigration
+from django.db import models
+
+from dashboard.models import rebuild_rollups
+
+
+class Migration(DataMigration):
+
+    def forwards(self, orm):
+        # Page contents may be stored as deltas, which only the real
+        # historical models can put back together, so this uses
+        # rebuild_rollups() rather than the frozen orm.
+        rebuild_rollups()
+
+    def backwards(self, orm):
+        orm.DailyRollup.objects.all().delete()
+
+    models = {
+        u'dashboard.dailyrollup': {
+            'Meta': {'unique_together': "(('region', 'object_type', 'day'),)", 'object_name': 'DailyRollup'},
+            'added': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'content_bytes': ('django.db.models.fields.BigIntegerField', [], {'default': '0'}),
+            'day': ('django.db.models.fields.DateField', [], {}),
+            'deleted': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'edits': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_type': ('django.db.models.fields.CharField', [], {'max_length': '20'}),
+            'region': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['regions.Region']"})
+        },
+        u'regions.region': {
+            'Meta': {'object_name': 'Region'},
+            'bbox': ('django.contrib.gis.db.models.fields.PolygonField', [], {'null': 'True', 'blank': 'True'}),
+            'centroid': ('django.contrib.gis.db.models.fields.PointField', [], {'null': 'True', 'blank': 'True'}),
+            'full_name': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'geom': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True', 'db_index': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'unique': 'True', 'max_length': '255'})
+        }
+    }
+
+    complete_apps = ['dashboard']
+    symmetrical = True
+    depends_on = (
+        ("pages", "0007_auto__add_field_page_hist_history_version__add_field_pagefile_hist_hist"),
+        ("maps", "0005_auto__add_maplayer"),
+        ("redirects", "0005_auto__add_field_redirect_hist_history_version"),
+    )
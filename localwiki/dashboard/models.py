@@ -0,0 +1,146 @@
+from collections import defaultdict
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Count
+from django.db.models.signals import post_save
+
+from pages.models import Page, PageFile
+from maps.models import MapData
+from redirects.models import Redirect
+from regions.models import Region
+
+from versionutils.versioning.constants import ADDED_TYPES, DELETED_TYPES
+
+PAGES = 'pages'
+MAPS = 'maps'
+FILES = 'files'
+REDIRECTS = 'redirects'
+
+ROLLUP_MODELS = (
+    (PAGES, Page),
+    (MAPS, MapData),
+    (FILES, PageFile),
+    (REDIRECTS, Redirect),
+)
+
+
+class DailyRollup(models.Model):
+    """
+    What happened to one type of object in a region on one day, summed
+    from the objects' history.  The dashboard charts are drawn from
+    these.
+    """
+    region = models.ForeignKey(Region)
+    object_type = models.CharField(max_length=20,
+        choices=[(t, t) for t, m in ROLLUP_MODELS])
+    day = models.DateField()
+    added = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    edits = models.PositiveIntegerField(default=0)
+    # How much the total length of the objects' content changed.  Only
+    # pages have content.
+    content_bytes = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('region', 'object_type', 'day')
+
+    def __unicode__(self):
+        return '%s in %s on %s' % (self.object_type, self.region, self.day)
+
+
+def _counts(history_type):
+    return {
+        'added': int(history_type in ADDED_TYPES),
+        'deleted': int(history_type in DELETED_TYPES),
+        'edits': 1,
+    }
+
+
+def _content_length(hist_instance):
+    if hist_instance is None or hist_instance.history_type in DELETED_TYPES:
+        return 0
+    return len(hist_instance.content or '')
+
+
+def add_to_rollup(region_id, object_type, day, **counts):
+    """
+    Adds `counts` (of added, deleted, edits and content_bytes) to the
+    rollup for the day, creating it if need be.
+    """
+    rollups = DailyRollup.objects.filter(region=region_id,
+        object_type=object_type, day=day)
+    updates = dict((k, F(k) + v) for k, v in counts.iteritems())
+    if rollups.update(**updates):
+        return
+    sid = transaction.savepoint()
+    try:
+        DailyRollup(region_id=region_id, object_type=object_type, day=day,
+            **counts).save()
+    except IntegrityError:
+        # Someone else just created it.
+        transaction.savepoint_rollback(sid)
+        rollups.update(**updates)
+    else:
+        transaction.savepoint_commit(sid)
+
+
+def _record_history(object_type, hist_model, instance):
+    counts = _counts(instance.history_type)
+    if object_type == PAGES:
+        previous = hist_model.objects.filter(id=instance.id,
+            history_id__lt=instance.history_id).order_by('-history_date', '-history_id')[:1]
+        previous = previous[0] if previous else None
+        counts['content_bytes'] = _content_length(instance) - _content_length(previous)
+    add_to_rollup(instance.region_id, object_type, instance.history_date.date(), **counts)
+
+
+def rebuild_rollups(regions=None):
+    """
+    Rebuilds the rollups of `regions`, or of every region, from their
+    full history.
+    """
+    rollups = DailyRollup.objects.all()
+    if regions is not None:
+        rollups = rollups.filter(region__in=regions)
+    rollups.delete()
+
+    for object_type, model in ROLLUP_MODELS:
+        history = model.versions.model.objects.all()
+        if regions is not None:
+            history = history.filter(region__in=regions)
+
+        totals = defaultdict(lambda: defaultdict(int))
+        day = {'day': 'date(history_date)'}
+        for name, types in (('edits', None), ('added', ADDED_TYPES), ('deleted', DELETED_TYPES)):
+            qs = history if types is None else history.filter(history_type__in=types)
+            for row in qs.extra(select=day).values('region', 'day').annotate(n=Count('history_id')).order_by():
+                totals[(row['region'], row['day'])][name] = row['n']
+
+        if object_type == PAGES:
+            # The page contents may be stored as deltas, so their lengths
+            # have to be found one version at a time.
+            last_length = {}
+            for h in history.order_by('id', 'history_date', 'history_id').iterator():
+                length = _content_length(h)
+                key = (h.region_id, h.history_date.date())
+                totals[key]['content_bytes'] += length - last_length.get(h.id, 0)
+                last_length[h.id] = length
+
+        DailyRollup.objects.bulk_create([
+            DailyRollup(region_id=region_id, object_type=object_type, day=d, **counts)
+            for (region_id, d), counts in totals.iteritems() if region_id is not None
+        ])
+
+
+# Historical model -> object type.
+_history_models = dict((m.versions.model, t) for t, m in ROLLUP_MODELS)
+
+
+def _history_created(sender, instance, created, raw, **kws):
+    if raw or not created:
+        return
+    _record_history(_history_models[sender], sender, instance)
+
+
+for _hist_model in _history_models:
+    post_save.connect(_history_created, sender=_hist_model)
@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.test import TestCase
+
+from pages.models import Page
+from regions.models import Region
+
+from .models import DailyRollup, rebuild_rollups, PAGES
+
+
+class DailyRollupTest(TestCase):
+    def setUp(self):
+        self.region = Region(full_name='Test Region', slug='test_region')
+        self.region.save()
+
+    def rollup(self):
+        return DailyRollup.objects.get(region=self.region, object_type=PAGES,
+            day=date.today())
+
+    def test_history_updates_rollups(self):
+        p = Page(name='Rollup', content='<p>Four</p>', region=self.region)
+        p.save()
+        rollup = self.rollup()
+        self.assertEqual((rollup.added, rollup.deleted, rollup.edits), (1, 0, 1))
+        self.assertEqual(rollup.content_bytes, len('<p>Four</p>'))
+
+        p.content = '<p>Four and more</p>'
+        p.save()
+        rollup = self.rollup()
+        self.assertEqual((rollup.added, rollup.deleted, rollup.edits), (1, 0, 2))
+        self.assertEqual(rollup.content_bytes, len('<p>Four and more</p>'))
+
+        p.delete()
+        rollup = self.rollup()
+        self.assertEqual((rollup.added, rollup.deleted, rollup.edits), (1, 1, 3))
+        self.assertEqual(rollup.content_bytes, 0)
+
+    def test_rebuild_matches(self):
+        for i in range(3):
+            p = Page(name='Rollup %d' % i, content='<p>%s</p>' % ('x' * i),
+                region=self.region)
+            p.save()
+        p.content = '<p>Shorter</p>'
+        p.save()
+        Page.objects.get(name='Rollup 0').delete()
+
+        fields = ('region', 'object_type', 'day', 'added', 'deleted', 'edits', 'content_bytes')
+        before = sorted(DailyRollup.objects.values_list(*fields))
+        rebuild_rollups([self.region])
+        self.assertEqual(sorted(DailyRollup.objects.values_list(*fields)), before)
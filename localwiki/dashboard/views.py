@@ -2,7 +2,7 @@ from datetime import date, datetime, timedelta
 
 from django.core.cache import cache
 from django.contrib.auth.models import User
-from django.db.models import Max
+from django.db.models import Min, Sum
 from django.utils.translation import ugettext as _
 from django.views.generic import TemplateView
 from django.contrib.humanize.templatetags.humanize import intcomma
@@ -16,7 +16,7 @@ from maps.models import MapData
 from redirects.models import Redirect
 from utils.views import JSONView
 
-from versionutils.versioning.constants import *
+from .models import DailyRollup, PAGES, MAPS, FILES, REDIRECTS
 
 import time
 
@@ -75,14 +75,14 @@ class DashboardRenderView(JSONView):
     def get_oldest_page_date(self):
         filters = self.get_filters()
         prefix = self.cache_prefix()
-        oldest = cache.get('%s:dashboard_oldest' % prefix)
+        oldest = cache.get('%s:dashboard_oldest_day' % prefix)
         if oldest is None:
-            qs = Page.versions.filter(**filters).order_by('history_date')
-            qs = qs.filter(history_date__gte=date(2000, 1, 1))
-            if not qs.exists():
+            qs = DailyRollup.objects.filter(object_type=PAGES, **filters)
+            qs = qs.filter(day__gte=date(2000, 1, 1))
+            oldest = qs.aggregate(oldest=Min('day'))['oldest']
+            if oldest is None:
                 return None
-            oldest = qs[0].version_info.date
-            cache.set('%s:dashboard_oldest' % prefix, oldest, FOREVER_CACHE_TIME)
+            cache.set('%s:dashboard_oldest_day' % prefix, oldest, FOREVER_CACHE_TIME)
         return oldest
 
     def get_context_data_for_chart(self, function, key):
@@ -167,90 +167,65 @@ def _sum_from_add_del(added_series, deleted_series):
     return l
 
 
+ROLLUP_FIELDS = ('added', 'deleted', 'edits', 'content_bytes')
+
+
+def _rollup_series(oldest_page, filters):
+    """
+    Returns:
+        A dictionary mapping each object type to a dictionary of time
+        series, one for each of ROLLUP_FIELDS, with a point for every day
+        from `oldest_page` through today.
+    """
+    rows = DailyRollup.objects.filter(day__gte=oldest_page, **filters)
+    rows = rows.values('object_type', 'day').annotate(
+        n_added=Sum('added'), n_deleted=Sum('deleted'),
+        n_edits=Sum('edits'), n_content_bytes=Sum('content_bytes'))
+    by_day = dict(((r['object_type'], r['day']), r) for r in rows.order_by())
+
+    series = {}
+    for object_type in (PAGES, MAPS, FILES, REDIRECTS):
+        series[object_type] = dict((f, []) for f in ROLLUP_FIELDS)
+    day, today = oldest_page, date.today()
+    while day <= today:
+        d = datetime(day.year, day.month, day.day)
+        for object_type, fields in series.iteritems():
+            row = by_day.get((object_type, day), {})
+            for f in ROLLUP_FIELDS:
+                fields[f].append((d, row.get('n_%s' % f) or 0))
+        day += timedelta(days=1)
+    return series
+
+
 def items_over_time(oldest_page, filters):
     graph = pyflot.Flot()
+    series = _rollup_series(oldest_page, filters)
 
-    pages_added = qsstats.QuerySetStats(
-        Page.versions.filter(version_info__type__in=ADDED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    pages_deleted = qsstats.QuerySetStats(
-        Page.versions.filter(version_info__type__in=DELETED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    num_pages_over_time = _sum_from_add_del(pages_added, pages_deleted)
-
-    maps_added = qsstats.QuerySetStats(
-        MapData.versions.filter(version_info__type__in=ADDED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    maps_deleted = qsstats.QuerySetStats(
-        MapData.versions.filter(version_info__type__in=DELETED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    num_maps_over_time = _sum_from_add_del(maps_added, maps_deleted)
-
-    files_added = qsstats.QuerySetStats(
-        PageFile.versions.filter(version_info__type__in=ADDED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    files_deleted = qsstats.QuerySetStats(
-        PageFile.versions.filter(version_info__type__in=DELETED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    num_files_over_time = _sum_from_add_del(files_added, files_deleted)
-
-    redir_added = qsstats.QuerySetStats(
-        Redirect.versions.filter(version_info__type__in=ADDED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    redir_deleted = qsstats.QuerySetStats(
-        Redirect.versions.filter(version_info__type__in=DELETED_TYPES, **filters),
-        'history_date').time_series(oldest_page)
-    num_redirects_over_time = _sum_from_add_del(redir_added, redir_deleted)
-
-    graph.add_time_series(num_pages_over_time, label=_("pages"))
-    graph.add_time_series(num_maps_over_time, label=_("maps"))
-    graph.add_time_series(num_files_over_time, label=_("files"))
-    graph.add_time_series(num_redirects_over_time,
-        label=_("redirects"))
+    for object_type, label in ((PAGES, _("pages")), (MAPS, _("maps")),
+                               (FILES, _("files")), (REDIRECTS, _("redirects"))):
+        s = series[object_type]
+        graph.add_time_series(_sum_from_add_del(s['added'], s['deleted']),
+            label=label)
 
     return [graph.prepare_series(s) for s in graph._series]
 
 
 def edits_over_time(oldest_page, filters):
     graph = pyflot.Flot()
+    series = _rollup_series(oldest_page, filters)
 
-    qss = qsstats.QuerySetStats(Page.versions.filter(**filters), 'history_date')
-    graph.add_time_series(qss.time_series(oldest_page), label=_("pages"))
-
-    qss = qsstats.QuerySetStats(MapData.versions.filter(**filters), 'history_date')
-    graph.add_time_series(qss.time_series(oldest_page), label=_("maps"))
-
-    qss = qsstats.QuerySetStats(PageFile.versions.filter(**filters), 'history_date')
-    graph.add_time_series(qss.time_series(oldest_page), label=_("files"))
-
-    qss = qsstats.QuerySetStats(Redirect.versions.filter(**filters), 'history_date')
-    graph.add_time_series(qss.time_series(oldest_page), label=_("redirects"))
+    for object_type, label in ((PAGES, _("pages")), (MAPS, _("maps")),
+                               (FILES, _("files")), (REDIRECTS, _("redirects"))):
+        graph.add_time_series(series[object_type]['edits'], label=label)
 
     return [graph.prepare_series(s) for s in graph._series]
 
 
 def page_content_over_time(oldest_page, filters):
-    qs = Page.versions.filter(**filters).extra(
-        {'content_length': "length(content)",
-         'history_day': "date(history_date)"})
-    qs = qs.order_by('history_day')
-    qs = qs.values('content_length', 'history_day', 'slug')
-
     graph = pyflot.Flot()
-    page_dict = {}
-    page_contents = []
-    current_day = oldest_page.date()
-
-    for page in qs.iterator():
-        if page['history_day'] > current_day:
-            page_contents.append((current_day, sum(page_dict.values())))
-            current_day = page['history_day']
-        page_dict[page['slug']] = page['content_length']
-
-    if page_contents:
-        graph.add_time_series(page_contents)
-        return [graph.prepare_series(s) for s in graph._series]
-    return []
+    series = _rollup_series(oldest_page, filters)
+    graph.add_time_series(_summed_series(series[PAGES]['content_bytes']))
+    return [graph.prepare_series(s) for s in graph._series]
 
 
 def users_registered_over_time(oldest_page, filters):
@@ -0,0 +1,108 @@
+# encoding=utf-8
+"""
+The parts of a region's front page that are built from many other
+objects, cached together.
+
+The front page's map has a layer of map centroids for each of the
+region's map layers (see maps.models.map_layers_for_region()), and its
+cards show the best pages tagged with each of CARD_CATEGORIES.  Working
+these out takes many queries, so we do it once and cache the result, per
+region, until a map, a page's tags, the map layers, the front page or
+the page scores in the region change.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+CARD_CATEGORIES = [
+    {'id': 'community', 'name': u'社區'},
+    {'id': 'shelter', 'name': u'避難收容處所'},
+    {'id': 'resources', 'name': u'設備物資集結點'},
+    {'id': 'special_care', 'name': u'特殊需求機構'},
+    {'id': 'life_support', 'name': u'重要維生設施'},
+]
+
+
+def _bundle_key(region_id):
+    return 'frontpage:bundle:%s' % region_id
+
+
+def build_frontpage_bundle(region):
+    """
+    Returns:
+        A dictionary with the region's FrontPage (or None), the EWKT of
+        the centroid of every map in the region, (tag name, icon URL,
+        centroids) for each of the region's map layers, the card categories with the ids of the pages to show
+        for each and whether the region is still empty.
+    """
+    from pages.models import Page
+    from maps.models import MapData, map_layers_for_region
+    from tags.models import Tag, slugify as tag_slugify
+    from regions.initial_data import NUM_DEFAULT_PAGES
+    from .models import FrontPage
+
+    frontpage = FrontPage.objects.filter(region=region)[:1]
+    frontpage = frontpage[0] if frontpage else None
+
+    # Every map, once for each tag on its page.  Layers are matched to
+    # tags by slug, as on the region's map.
+    map_objects, layers, seen = [], defaultdict(list), set()
+    rows = MapData.objects.filter(region=region).centroid().\
+        values_list('id', 'centroid', 'page__pagetagset__tags__slug')
+    for mapdata_id, centroid, tag_slug in rows:
+        if centroid is None:
+            continue
+        if mapdata_id not in seen:
+            seen.add(mapdata_id)
+            map_objects.append(centroid.ewkt)
+        if tag_slug is not None:
+            layers[tag_slug].append(centroid.ewkt)
+
+    names = [c['name'] for c in CARD_CATEGORIES]
+    tags = {}
+    for tag in Tag.objects.filter(name__in=names):
+        tags.setdefault(tag.name, tag)
+
+    qs = Page.objects.filter(region=region, pagetagset__tags__slug__in=names)
+    # Exclude meta stuff
+    qs = qs.exclude(slug__startswith='templates/')
+    qs = qs.exclude(slug='templates')
+    qs = qs.exclude(slug='front page')
+    # Exclude ones with empty scores
+    qs = qs.exclude(score=None)
+    qs = qs.order_by('-score__score', '?').values_list('id', 'pagetagset__tags__slug')
+    card_pages = defaultdict(list)
+    for page_id, slug in qs:
+        card_pages[slug].append(page_id)
+
+    categories = []
+    for category in CARD_CATEGORIES:
+        category = dict(category)
+        if category['name'] in tags:
+            category['tag'] = tags[category['name']]
+        category['page_ids'] = card_pages[category['name']]
+        categories.append(category)
+
+    return {
+        'frontpage': frontpage,
+        'map_objects': map_objects,
+        'layers': [(name, icon, layers[tag_slugify(name)])
+                   for name, icon in map_layers_for_region(region)
+                   if layers[tag_slugify(name)]],
+        'categories': categories,
+        'is_empty': Page.objects.filter(region=region).count() == NUM_DEFAULT_PAGES,
+    }
+
+
+def frontpage_bundle(region):
+    key = _bundle_key(region.id)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_frontpage_bundle(region)
+        cache.set(key, bundle, getattr(settings, 'FRONTPAGE_BUNDLE_CACHE_TIMEOUT', 60 * 60))
+    return bundle
+
+
+def invalidate_frontpage_bundle(region_id):
+    cache.delete(_bundle_key(region_id))
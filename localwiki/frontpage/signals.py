@@ -1,10 +1,19 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.core.cache import cache
 from django.conf import settings
 from django.core.urlresolvers import set_urlconf, get_urlconf
 
+from .cache import invalidate_frontpage_bundle
+
 
 def _clear_frontpage(region):
+    from pages.cache import ban_batch
+
+    with ban_batch():
+        _do_clear_frontpage(region)
+
+
+def _do_clear_frontpage(region):
     from pages.cache import varnish_invalidate_url
     from .views import FrontPageView
 
@@ -36,16 +45,64 @@ def _clear_frontpage(region):
     set_urlconf(current_urlconf)
 
 
+def _invalidate_bundle(instance):
+    from page_scores.models import PageScore
+
+    if isinstance(instance, PageScore):
+        from pages.models import Page
+
+        region_id = Page.objects.filter(id=instance.page_id).values_list('region', flat=True)
+        region_id = region_id[0] if region_id else None
+    else:
+        region_id = instance.region_id
+    if region_id is not None:
+        invalidate_frontpage_bundle(region_id)
+
+
 def _frontpage_post_save(sender, instance, created, raw, **kwargs):
     from pages.models import Page
+    from maps.models import MapData, MapLayer
+    from page_scores.models import PageScore
     from .models import FrontPage
 
-    if sender is FrontPage:
+    if sender in (FrontPage, MapLayer):
+        _invalidate_bundle(instance)
         _clear_frontpage(instance.region)
     elif sender is Page:
+        if created:
+            # Whether the region is still empty.
+            _invalidate_bundle(instance)
         if instance.slug == 'front page':
             _clear_frontpage(instance.region)
+    elif sender in (MapData, PageScore) and not raw:
+        _invalidate_bundle(instance)
     return
 
 
+def _frontpage_post_delete(sender, instance, **kwargs):
+    from pages.models import Page
+    from maps.models import MapData, MapLayer
+    from tags.models import PageTagSet
+    from .models import FrontPage
+
+    # PageScores are only deleted along with their pages, or when they're
+    # rewritten in bulk by page_scores._score_pages().
+    if sender in (FrontPage, Page, MapData, PageTagSet):
+        _invalidate_bundle(instance)
+    elif sender is MapLayer:
+        _invalidate_bundle(instance)
+        _clear_frontpage(instance.region)
+
+
+def _frontpage_m2m_changed(sender, instance, action, reverse, **kwargs):
+    from tags.models import PageTagSet
+
+    if sender is not PageTagSet.tags.through or reverse:
+        return
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_bundle(instance)
+
+
 post_save.connect(_frontpage_post_save)
+post_delete.connect(_frontpage_post_delete)
+m2m_changed.connect(_frontpage_m2m_changed)
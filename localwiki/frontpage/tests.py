@@ -1,3 +1,4 @@
+# coding=utf-8
 """
 This file demonstrates writing tests using the unittest module. These will pass
 when you run "manage.py test".
@@ -14,3 +15,64 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class FrontPageBundleTest(TestCase):
+    def test_build_bundle(self):
+        from django.contrib.gis.geos import GEOSGeometry
+
+        from pages.models import Page
+        from maps.models import MapData, MapLayer
+        from page_scores.models import PageScore
+        from regions.models import Region
+        from tags.models import Tag, PageTagSet
+
+        from .cache import build_frontpage_bundle
+        from .models import FrontPage
+
+        region = Region(full_name='Taipei', slug='taipei')
+        region.save()
+        shelter = Tag(name=u'避難收容處所', region=region)
+        shelter.save()
+        police = Tag(name=u'警察單位', region=region)
+        police.save()
+
+        pages = []
+        for i, (tag, point) in enumerate(((shelter, 'POINT (121.5 25.0)'),
+                                          (police, 'POINT (121.6 25.1)'),
+                                          (None, 'POINT (121.7 25.2)'))):
+            page = Page(name='Place %d' % i, content='<p>Hi</p>', region=region)
+            page.save()
+            MapData(page=page, region=region, geom=GEOSGeometry(
+                'GEOMETRYCOLLECTION (%s)' % point)).save()
+            if tag:
+                pts = PageTagSet(page=page, region=region)
+                pts.save()
+                pts.tags.add(tag)
+            PageScore.objects.filter(page=page).delete()
+            PageScore(page=page, score=i, page_content_length=9).save()
+            pages.append(page)
+
+        bundle = build_frontpage_bundle(region)
+        self.assertEqual(bundle['frontpage'], FrontPage.objects.get(region=region))
+        self.assertEqual(len(bundle['map_objects']), 3)
+        self.assertEqual([name for name, icon, centroids in bundle['layers']], [u'警察單位'])
+        self.assertTrue(bundle['layers'][0][1].endswith(u'tagicon/警察單位.png'))
+        self.assertTrue('POINT (121.6' in bundle['layers'][0][2][0])
+
+        categories = dict((c['id'], c) for c in bundle['categories'])
+        self.assertEqual(categories['shelter']['tag'], shelter)
+        self.assertEqual(categories['shelter']['page_ids'], [pages[0].id])
+        self.assertEqual(categories['community']['page_ids'], [])
+        self.assertFalse(bundle['is_empty'])
+
+        # The region's own map layers replace the default ones.  They're
+        # matched to tags by slug, like on the region's map.
+        MapLayer(region=region, tag_name=u'避難收容處所', icon='/shelter.png').save()
+        MapLayer(region=region, tag_name=u'Parks', icon='/parks.png').save()
+        parks = Tag(name=u'parks', region=region)
+        parks.save()
+        PageTagSet.objects.get(page=pages[0]).tags.add(parks)
+        bundle = build_frontpage_bundle(region)
+        self.assertEqual([(name, icon) for name, icon, centroids in bundle['layers']],
+                         [(u'避難收容處所', '/shelter.png'), (u'Parks', '/parks.png')])
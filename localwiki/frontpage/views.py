@@ -13,27 +13,29 @@ from django.conf import settings
 
 from pages.models import Page
 from pages.views import PageDetailView
-from maps.models import MapData
 from maps.widgets import Map, InfoLayer, InfoMap, map_options_for_region
 from regions.views import RegionMixin, RegionAdminRequired, TemplateView, region_404_response
 from regions.models import Region
-from tags.models import Tag
 from localwiki.utils.views import Custom404Mixin, CacheMixin
 
 from .models import FrontPage
+from .cache import frontpage_bundle
 
 
 class FrontPageView(Custom404Mixin, TemplateView):
     template_name = 'frontpage/base.html'
     cache_timeout = 60 * 60  # 1 hr, and we invalidate after Front Page save
-    layer_names = [u'國道', u'省道', u'鄉道', u'鐵路', u'取水點', u'快速道路', u'指揮中心', u'消防單位', u'警察單位', u'醫療院所', u'高速鐵路', u'物資存備點', u'海嘯危險區域', u'直升機起降點',
-                   u'老人福利機構', u'適用地震災害', u'適用水災災害', u'適用海嘯災害', u'人車轉運集結點', u'室內避難收容所', u'室外避難收容所', u'救援器材放置點', u'通訊設備放置點', u'適用土石流災害', u'海嘯避難收容處所', u'身心障礙福利機構']
+
+    def get_bundle(self):
+        if not hasattr(self, '_bundle'):
+            self._bundle = frontpage_bundle(self.get_region())
+        return self._bundle
 
     def get(self, *args, **kwargs):
         # If there's no FrontPage defined, let's send the "Front Page" Page
         # object.
         region = self.get_region()
-        if not FrontPage.objects.filter(region=region).exists() or region.regionsettings.is_meta_region:
+        if self.get_bundle()['frontpage'] is None or region.regionsettings.is_meta_region:
             page_view = PageDetailView()
             page_view.kwargs = {'slug': 'front page',
                                 'region': self.get_region().slug}
@@ -42,14 +44,7 @@ class FrontPageView(Custom404Mixin, TemplateView):
         return super(FrontPageView, self).get(*args, **kwargs)
 
     def get_map_objects(self):
-        centroids = MapData.objects.filter(
-            region=self.get_region()).centroid().values('centroid')
-        return [(g['centroid'], '') for g in centroids]
-
-    def get_map_objects_by_tag(self, tag_name):
-        centroids = MapData.objects.filter(region=self.get_region()).filter(
-            page__pagetagset__tags__name=tag_name).centroid().values('centroid')
-        return [(g['centroid'], '') for g in centroids]
+        return [(g, '') for g in self.get_bundle()['map_objects']]
 
     def get_map(self, cover=False):
         olwidget_options = copy.deepcopy(getattr(settings,
@@ -82,12 +77,12 @@ class FrontPageView(Custom404Mixin, TemplateView):
             })], options=olwidget_options)
         else:
             map_objects = [InfoLayer(self.get_map_objects())]
-            for layer_name in FrontPageView.layer_names:
-                layer_objects = self.get_map_objects_by_tag(layer_name)
+            for layer_name, icon, centroids in self.get_bundle()['layers']:
+                layer_objects = [(g, '') for g in centroids]
                 if len(layer_objects) > 0:
                     map_objects.append(InfoLayer(layer_objects, {
                         'overlay_style': {
-                            'external_graphic': '/static/tagicon/%s.png' % layer_name,
+                            'external_graphic': icon,
                             'graphic_height': 32,
                             'graphic_width': 32,
                             'graphic_opacity': 1.0
@@ -95,50 +90,28 @@ class FrontPageView(Custom404Mixin, TemplateView):
                     }))
             return Map(map_objects, options=olwidget_options)
 
-    def get_categories_for_cards(self):
-        categories = [
-            {'id': 'community', 'name': u'社區'},
-            {'id': 'shelter', 'name': u'避難收容處所'},
-            {'id': 'resources', 'name': u'設備物資集結點'},
-            {'id': 'special_care', 'name': u'特殊需求機構'},
-            {'id': 'life_support', 'name': u'重要維生設施'},
-        ]
-        for category in categories:
-            if Tag.objects.filter(name=category['name']).exists():
-                category['tag'] = Tag.objects.filter(name=category['name'])[0]
-        return categories
-
     def get_pages_for_cards(self):
-        categories = self.get_categories_for_cards()
+        categories = [dict(c) for c in self.get_bundle()['categories']]
+        page_ids = set()
         for category in categories:
-            qs = Page.objects.filter(region=self.get_region(
-            ), pagetagset__tags__slug=category['name'])
-
-            # Exclude meta stuff
-            qs = qs.exclude(slug__startswith='templates/')
-            qs = qs.exclude(slug='templates')
-            qs = qs.exclude(slug='front page')
-
-            # Exclude ones with empty scores
-            qs = qs.exclude(score=None)
-
-            qs = qs.defer('content').select_related(
-                'region').order_by('-score__score', '?')
-
-            category['pages'] = qs
+            page_ids.update(category['page_ids'])
+        pages = Page.objects.filter(id__in=page_ids).defer('content').select_related('region')
+        pages = dict((p.id, p) for p in pages)
+        for category in categories:
+            category['pages'] = [pages[i] for i in category['page_ids'] if i in pages]
         return categories
 
     def get_context_data(self, *args, **kwargs):
         context = super(FrontPageView, self).get_context_data()
 
-        context['frontpage'] = FrontPage.objects.get(region=self.get_region())
-        context['no_index'] = self.get_region().is_empty
+        context['frontpage'] = self.get_bundle()['frontpage']
+        context['no_index'] = self.get_bundle()['is_empty']
         context['map'] = self.get_map()
         context['cover_map'] = self.get_map(cover=True)
         context['pages_for_cards'] = self.get_pages_for_cards()
-        if Page.objects.filter(name="Front Page", region=self.get_region()).exists():
-            context['page'] = Page.objects.get(
-                name="Front Page", region=self.get_region())
+        page = Page.objects.filter(name="Front Page", region=self.get_region())[:1]
+        if page:
+            context['page'] = page[0]
         else:
             context['page'] = Page(name="Front Page", region=self.get_region())
         return context
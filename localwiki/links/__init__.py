@@ -17,6 +17,14 @@ def _is_plugin(a):
 def _invalid(href):
     return len(href) > 255
     
+def _a_elements(html):
+    parser = html5lib.HTMLParser(
+        tree=html5lib.treebuilders.getTreeBuilder("lxml"),
+        namespaceHTMLElements=False)
+    # Wrap to make the tree lookup easier
+    tree = parser.parseFragment('<div>%s</div>' % html)[0]
+    return tree.xpath('//a')
+
 def extract_internal_links(html):
     """
     Args:
@@ -27,13 +35,9 @@ def extract_internal_links(html):
         link has been made in this HTML.  E.g.
         {'Downtown Park': 3, 'Rollercoaster': 1}
     """
-    parser = html5lib.HTMLParser(
-        tree=html5lib.treebuilders.getTreeBuilder("lxml"),
-        namespaceHTMLElements=False)
-    # Wrap to make the tree lookup easier
-    tree = parser.parseFragment('<div>%s</div>' % html)[0]
-    a_s = tree.xpath('//a')
+    return _internal_links(_a_elements(html))
 
+def _internal_links(a_s):
     # Grab the links if they're not anchors or external.
     d = {}
     for a in a_s:
@@ -70,13 +74,9 @@ def extract_included_pagenames(html):
     Returns:
         A list of the included page names.
     """
-    parser = html5lib.HTMLParser(
-        tree=html5lib.treebuilders.getTreeBuilder("lxml"),
-        namespaceHTMLElements=False)
-    # Wrap to make the tree lookup easier
-    tree = parser.parseFragment('<div>%s</div>' % html)[0]
-    a_s = tree.xpath('//a')
+    return _included_pagenames(_a_elements(html))
 
+def _included_pagenames(a_s):
     # Grab the link source if it's an included page
     l = []
     for a in a_s:
@@ -98,14 +98,10 @@ def extract_included_tags(html):
     Returns:
         A list of the included tag slugs (lowercased).
     """
-    from tags.models import slugify
+    return _included_tags(_a_elements(html))
 
-    parser = html5lib.HTMLParser(
-        tree=html5lib.treebuilders.getTreeBuilder("lxml"),
-        namespaceHTMLElements=False)
-    # Wrap to make the tree lookup easier
-    tree = parser.parseFragment('<div>%s</div>' % html)[0]
-    a_s = tree.xpath('//a')
+def _included_tags(a_s):
+    from tags.models import slugify
 
     # Grab the link source if it's an included page
     l = []
@@ -119,3 +115,19 @@ def extract_included_tags(html):
     return l
 
 import site
+
+def extract_page_references(html):
+    """
+    Parses `html` once and pulls out everything the other extract_*
+    functions do.
+
+    Args:
+        html: A string containing an HTML5 fragment.
+
+    Returns:
+        A tuple (links, included_pagenames, included_tags), as returned by
+        extract_internal_links(), extract_included_pagenames() and
+        extract_included_tags().
+    """
+    a_s = _a_elements(html)
+    return (_internal_links(a_s), _included_pagenames(a_s), _included_tags(a_s))
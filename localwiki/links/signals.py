@@ -1,51 +1,77 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.db.models.signals import post_save, pre_delete, post_delete
 
+from celery import shared_task
+
 from pages.models import Page, slugify
 from tags.models import Tag
 
-from links import extract_internal_links, extract_included_pagenames, extract_included_tags
+from links import extract_page_references
 from .models import Link, IncludedPage, IncludedTagList
 
 
-def record_page_links(page):
+def record_page_links(page, links=None):
+    """
+    Brings the Links from `page` up to date with its content, touching only
+    the rows that have changed.
+    """
     region = page.region
-    links = extract_internal_links(page.content)
-    for pagename, count in links.iteritems():
-        qs = Link.objects.filter(source=page, region=region)
-        link_exists = qs.filter(destination_slug=slugify(pagename)) | qs.filter(destination__slug=slugify(pagename))
-        if link_exists:
-            link = link_exists[0]
-            if link.count == count:
-                # No new links with this name on this page, so skip updating.
-                continue
-            link.count = count
+    if links is None:
+        links = extract_page_references(page.content)[0]
+    wanted = dict((slugify(name), (name, count)) for name, count in links.iteritems())
+
+    existing = {}
+    existing_destinations = set()
+    to_delete = []
+    for link_id, slug, dest_id, dest_slug, count in Link.objects.filter(
+            source=page, region=region).values_list(
+            'id', 'destination_slug', 'destination', 'destination__slug', 'count'):
+        # Older links may only have a matching destination page.
+        if slug not in wanted and dest_slug in wanted:
+            slug = dest_slug
+        if slug in wanted and slug not in existing:
+            existing[slug] = (link_id, count)
+            if dest_id:
+                existing_destinations.add(dest_id)
         else:
-            page_exists = Page.objects.filter(slug=slugify(pagename), region=region)
-            if page_exists:
-                destination = page_exists[0]
-            else:
-                destination = None
+            to_delete.append(link_id)
 
-            # Exists for some reason already (probably running a script that's moving between regions?)
-            if destination and Link.objects.filter(source=page, destination=destination).exists():
-                continue
+    # Links whose count has changed, grouped by their new count.
+    to_update = defaultdict(list)
+    for slug, (link_id, count) in existing.iteritems():
+        if wanted[slug][1] != count:
+            to_update[wanted[slug][1]].append(link_id)
 
-            link = Link(
-                source=page,
-                region=region,
-                destination=destination,
-                destination_name=pagename,
-                destination_slug=slugify(pagename),
-                count=count,
-            )
-        link.save()
+    new_slugs = [slug for slug in wanted if slug not in existing]
+    destinations = {}
+    if new_slugs:
+        destinations = dict(Page.objects.filter(
+            slug__in=new_slugs, region=region).values_list('slug', 'id'))
 
-def _record_page_links(sender, instance, created, raw, **kws):
-    # Don't create Links when importing via loaddata - they're already
-    # being imported.
-    if raw or getattr(instance, '_in_rename', False) or getattr(instance, '_in_move', False):
-        return
-    record_page_links(instance)
+    to_create = []
+    for slug in new_slugs:
+        name, count = wanted[slug]
+        destination_id = destinations.get(slug)
+        # Exists for some reason already (probably running a script that's moving between regions?)
+        if destination_id and destination_id in existing_destinations:
+            continue
+        to_create.append(Link(
+            source=page,
+            region=region,
+            destination_id=destination_id,
+            destination_name=name,
+            destination_slug=slug,
+            count=count,
+        ))
+
+    if to_delete:
+        Link.objects.filter(id__in=to_delete).delete()
+    for count, ids in to_update.iteritems():
+        Link.objects.filter(id__in=ids).update(count=count)
+    if to_create:
+        Link.objects.bulk_create(to_create)
 
 def _check_destination_created(sender, instance, created, raw, **kws):
     # Don't create Links when importing via loaddata - they're already
@@ -55,6 +81,10 @@ def _check_destination_created(sender, instance, created, raw, **kws):
     if not created:
         return
 
+    if getattr(instance, '_in_bulk', False):
+        # Done for the whole batch by record_pages_created()
+        return
+
     # The destination page has been created, so let's record that.
     links = Link.objects.filter(destination_slug=instance.slug, region=instance.region)
     for link in links:
@@ -69,40 +99,42 @@ def _check_destination_created(sender, instance, created, raw, **kws):
 # Now for included pages:
 ############################
 
-def record_page_includes(page):
+def record_page_includes(page, included=None):
+    """
+    Brings the IncludedPages of `page` up to date with its content.
+    """
     region = page.region
-    included = extract_included_pagenames(page.content)
-    for pagename in included:
-        included_pg_exists = IncludedPage.objects.filter(
-            source=page, region=region,
-            included_page_slug=slugify(pagename))
-        if not included_pg_exists:
-            page_exists = Page.objects.filter(slug=slugify(pagename), region=region)
-            if page_exists:
-                included_page = page_exists[0]
-            else:
-                included_page = None
-            m = IncludedPage(
+    if included is None:
+        included = extract_page_references(page.content)[1]
+    wanted = dict((slugify(pagename), pagename) for pagename in included)
+
+    existing = set()
+    to_delete = []
+    for m_id, slug in IncludedPage.objects.filter(
+            source=page, region=region).values_list('id', 'included_page_slug'):
+        if slug in wanted and slug not in existing:
+            existing.add(slug)
+        else:
+            # Remove included pages they've removed from the page
+            to_delete.append(m_id)
+
+    new_slugs = [slug for slug in wanted if slug not in existing]
+    included_pages = {}
+    if new_slugs:
+        included_pages = dict(Page.objects.filter(
+            slug__in=new_slugs, region=region).values_list('slug', 'id'))
+
+    if to_delete:
+        IncludedPage.objects.filter(id__in=to_delete).delete()
+    if new_slugs:
+        IncludedPage.objects.bulk_create([
+            IncludedPage(
                 source=page,
                 region=region,
-                included_page=included_page,
-                included_page_name=pagename,
-                included_page_slug=slugify(pagename),
-            )
-            m.save()
-
-    included = [slugify(pagename) for pagename in included]
-    # Remove included pages they've removed from the page
-    to_delete = IncludedPage.objects.filter(source=page, region=region).exclude(included_page_slug__in=included)
-    for m in to_delete:
-        m.delete()
-
-def _record_page_includes(sender, instance, created, raw, **kws):
-    # Don't create IncludedPages when importing via loaddata - they're already
-    # being imported.
-    if raw or getattr(instance, '_in_rename', False):
-        return
-    record_page_includes(instance)
+                included_page_id=included_pages.get(slug),
+                included_page_name=wanted[slug],
+                included_page_slug=slug,
+            ) for slug in new_slugs])
 
 def _check_included_page_created(sender, instance, created, raw, **kws):
     # Don't create IncludedPages when importing via loaddata - they're already
@@ -112,6 +144,10 @@ def _check_included_page_created(sender, instance, created, raw, **kws):
     if not created:
         return
 
+    if getattr(instance, '_in_bulk', False):
+        # Done for the whole batch by record_pages_created()
+        return
+
     # The included page has been created, so let's record that.
     pages_that_include_this = IncludedPage.objects.filter(
         included_page_slug=instance.slug, region=instance.region)
@@ -124,52 +160,118 @@ def _check_included_page_created(sender, instance, created, raw, **kws):
 # Now for included "list of tagged pages"
 ##########################################
 
-def record_tag_includes(page):
+def record_tag_includes(page, included=None):
+    """
+    Brings the IncludedTagLists of `page` up to date with its content.
+    """
     region = page.region
-    included = extract_included_tags(page.content)
-    
-    for tag_slug in included:
-        included_tag_exists = IncludedTagList.objects.filter(
-            source=page,
-            region=region,
-            included_tag__slug=tag_slug)
-        if not included_tag_exists:
-            tag_exists = Tag.objects.filter(slug=tag_slug, region=region)
-            if tag_exists:
-                included_tag = tag_exists[0]
-            else:
-                continue
-            m = IncludedTagList(
-                source=page,
-                region=region,
-                included_tag=included_tag,
-            )
-            m.save()
+    if included is None:
+        included = extract_page_references(page.content)[2]
+    wanted = set(included)
 
-    # Remove tag lists they've removed from the page
-    to_delete = IncludedTagList.objects.filter(source=page, region=region).exclude(included_tag__slug__in=included)
-    for m in to_delete:
-        m.delete()
+    existing = set()
+    to_delete = []
+    for m_id, tag_slug in IncludedTagList.objects.filter(
+            source=page, region=region).values_list('id', 'included_tag__slug'):
+        if tag_slug in wanted and tag_slug not in existing:
+            existing.add(tag_slug)
+        else:
+            # Remove tag lists they've removed from the page
+            to_delete.append(m_id)
 
-def _record_tag_includes(sender, instance, created, raw, **kws):
-    # Don't create IncludedTagLists when importing via loaddata - they're already
-    # being imported.
+    new_slugs = wanted.difference(existing)
+    to_create = []
+    if new_slugs:
+        # Only include lists of tags that exist.
+        to_create = [
+            IncludedTagList(source=page, region=region, included_tag_id=tag_id)
+            for tag_id in Tag.objects.filter(
+                slug__in=new_slugs, region=region).values_list('id', flat=True)
+        ]
+
+    if to_delete:
+        IncludedTagList.objects.filter(id__in=to_delete).delete()
+    if to_create:
+        IncludedTagList.objects.bulk_create(to_create)
+
+
+#####################################
+# Updating everything from one parse
+#####################################
+
+def update_page_references(page, links=True, includes=True, tag_includes=True):
+    """
+    Parses `page` once and brings its Links, IncludedPages and
+    IncludedTagLists up to date.
+    """
+    page_links, included_pages, included_tags = extract_page_references(page.content)
+    if links:
+        record_page_links(page, page_links)
+    if includes:
+        record_page_includes(page, included_pages)
+    if tag_includes:
+        record_tag_includes(page, included_tags)
+
+@shared_task(ignore_result=True)
+def _async_update_page_references(page_id, links=True, includes=True, tag_includes=True):
+    try:
+        page = Page.objects.get(id=page_id)
+    except Page.DoesNotExist:
+        # Deleted before we got to it.
+        return
+    update_page_references(page, links=links, includes=includes, tag_includes=tag_includes)
+
+def _record_page_references(sender, instance, created, raw, **kws):
+    # Don't create Links, IncludedPages or IncludedTagLists when importing
+    # via loaddata - they're already being imported.
     if raw or getattr(instance, '_in_rename', False):
         return
-    record_tag_includes(instance)
+    if getattr(instance, '_in_bulk', False):
+        # Done once the whole batch has been saved.
+        return
+    kwargs = {'links': not getattr(instance, '_in_move', False)}
+    if getattr(settings, 'LINKS_UPDATE_ASYNC', False):
+        _async_update_page_references.delay(instance.id, **kwargs)
+    else:
+        update_page_references(instance, **kwargs)
+
+def record_pages_created(pages):
+    """
+    Points the Links and IncludedPages waiting on `pages`, which have just
+    been created, at them.  Does for many pages at once what
+    _check_destination_created() and _check_included_page_created() do
+    for one.
+    """
+    by_region = defaultdict(dict)
+    for page in pages:
+        by_region[page.region_id][page.slug] = page.id
+
+    for region_id, page_ids in by_region.iteritems():
+        links = defaultdict(list)
+        for link_id, slug in Link.objects.filter(region=region_id,
+                destination_slug__in=page_ids.keys(), destination=None).\
+                values_list('id', 'destination_slug'):
+            links[page_ids[slug]].append(link_id)
+        for page_id, ids in links.iteritems():
+            Link.objects.filter(id__in=ids).update(destination=page_id)
+
+        includes = defaultdict(list)
+        for m_id, slug in IncludedPage.objects.filter(region=region_id,
+                included_page_slug__in=page_ids.keys(), included_page=None).\
+                values_list('id', 'included_page_slug'):
+            includes[page_ids[slug]].append(m_id)
+        for page_id, ids in includes.iteritems():
+            IncludedPage.objects.filter(id__in=ids).update(included_page=page_id)
+
 
 #########################
 # Attach all the signals
 #########################
 
-# TODO: make these happen in the background using a task queue.
+post_save.connect(_record_page_references, sender=Page)
+
 # Links signals
-post_save.connect(_record_page_links, sender=Page)
 post_save.connect(_check_destination_created, sender=Page)
 
 # Included page signals
-post_save.connect(_record_page_includes, sender=Page)
 post_save.connect(_check_included_page_created, sender=Page)
-
-# Included tag list signals
-post_save.connect(_record_tag_includes, sender=Page)
@@ -1,6 +1,11 @@
 from django.test import TestCase
 
-from links import extract_internal_links, extract_included_pagenames, extract_included_tags
+from pages.models import Page
+from regions.models import Region
+
+from links import (extract_internal_links, extract_included_pagenames,
+    extract_included_tags, extract_page_references)
+from links.models import Link, IncludedPage
 
 
 class ExtractLinkTest(TestCase):
@@ -120,3 +125,66 @@ class ExtractIncludedTagsTest(TestCase):
         included_tags = extract_included_tags(html)
         self.assertFalse('parks' in included_tags)
         self.assertTrue(included_tags == [])
+
+
+class ExtractPageReferencesTest(TestCase):
+    def test_extract_all(self):
+        html = """
+<p>I love <a href="Parks">awesome parks</a>.</p>
+<p>I love <a href="Parks">awesome parks</a>.</p>
+<p><a href="Cats%20and%20dogs" class="plugin includepage"></a></p>
+<p><a href="tags%2Fparks" class="plugin includetag"></a></p>
+        """
+        links, included_pagenames, included_tags = extract_page_references(html)
+        self.assertEqual(links, {'Parks': 2})
+        self.assertEqual(included_pagenames, ['Cats and dogs'])
+        self.assertEqual(included_tags, ['parks'])
+
+
+class RecordPageReferencesTest(TestCase):
+    def setUp(self):
+        self.region = Region(full_name='Test region', slug='test-region')
+        self.region.save()
+
+    def test_links_updated_in_place(self):
+        parks = Page(name='Parks', content='<p>Parks</p>', region=self.region)
+        parks.save()
+        p = Page(name='Home', region=self.region, content="""
+<p><a href="Parks">parks</a> <a href="Parks">parks</a></p>
+<p><a href="Cats">cats</a> <a href="Dogs">dogs</a></p>
+<p><a href="Bees" class="plugin includepage"></a></p>
+        """)
+        p.save()
+
+        links = dict((l.destination_slug, l) for l in Link.objects.filter(source=p))
+        self.assertEqual(set(links), set(['parks', 'cats', 'dogs']))
+        self.assertEqual(links['parks'].count, 2)
+        self.assertEqual(links['parks'].destination, parks)
+        self.assertEqual(links['cats'].destination, None)
+        self.assertEqual(IncludedPage.objects.filter(source=p).count(), 1)
+
+        cats_link_id = links['cats'].id
+        p.content = """
+<p><a href="Parks">parks</a></p>
+<p><a href="Cats">cats</a> <a href="Birds">birds</a></p>
+        """
+        p.save()
+
+        links = dict((l.destination_slug, l) for l in Link.objects.filter(source=p))
+        self.assertEqual(set(links), set(['parks', 'cats', 'birds']))
+        self.assertEqual(links['parks'].count, 1)
+        # Unchanged links are left alone.
+        self.assertEqual(links['cats'].id, cats_link_id)
+        self.assertEqual(IncludedPage.objects.filter(source=p).count(), 0)
+
+    def test_unchanged_content_only_reads(self):
+        p = Page(name='Home', region=self.region, content="""
+<p><a href="Parks">parks</a> <a href="Cats">cats</a> <a href="Dogs">dogs</a></p>
+        """)
+        p.save()
+
+        from links.signals import update_page_references
+        # One query each for the existing Links, IncludedPages and
+        # IncludedTagLists, however many links there are.
+        with self.assertNumQueries(3):
+            update_page_references(p)
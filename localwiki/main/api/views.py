@@ -1,22 +1,61 @@
+import threading
+from collections import OrderedDict
+
+from django.db.models.fields import FieldDoesNotExist
+
+# How many field-limited serializer classes we keep around.
+MAX_LIMITED_SERIALIZERS = 200
+
+
 class AllowFieldLimitingMixin(object):
     """
     A mixin for a generic APIView that will allow the serialized fields to be
     limited to a set of comma-separated values, specified via the `fields`
     query parameter.  This will only apply to GET requests.
+
+    On GET requests the queryset is also narrowed to the columns the
+    serialized fields need, and related objects the fields show are
+    fetched with `prefetch_related`.  Extra lookups to prefetch for a
+    field can be given in `prefetch_for_fields`, e.g.
+    {'tags': ('pagetagset__tags',)}.
     """
-    _serializer_class_for_fields = {}
+    prefetch_for_fields = {}
+
+    # (serializer class, fields) -> field-limited serializer class, most
+    # recently used last.
+    _serializer_class_for_fields = OrderedDict()
+    _serializer_class_lock = threading.Lock()
+
+    def get_limited_fields(self, serializer_class):
+        """
+        Returns:
+            A sorted tuple of the serializer fields requested in the `fields`
+            query parameter, or None if the fields aren't being limited.
+        """
+        fields = self.request.QUERY_PARAMS.get('fields')
+        if self.request.method != 'GET' or not fields:
+            return None
+        fields = set(f.strip() for f in fields.split(','))
+        allowed = getattr(serializer_class.Meta, 'fields', None)
+        if allowed:
+            fields = fields.intersection(allowed)
+        return tuple(sorted(fields)) or None
 
     def get_serializer_class_for_fields(self, serializer_class, fields):
-        fields = fields.strip().split(',')
-        fields.sort()
-        fields = tuple(fields)
-        if fields in self._serializer_class_for_fields:
-            return self._serializer_class_for_fields[fields]
+        key = (serializer_class, fields)
+        cache = self._serializer_class_for_fields
+        with self._serializer_class_lock:
+            if key in cache:
+                cache[key] = cache.pop(key)
+                return cache[key]
         # Doing this because a simple copy.copy() doesn't work here.
         meta = type('Meta', (serializer_class.Meta, object), {'fields': fields})
         LimitedFieldsSerializer = type('LimitedFieldsSerializer', (serializer_class,),
             {'Meta': meta})
-        self._serializer_class_for_fields[fields] = LimitedFieldsSerializer
+        with self._serializer_class_lock:
+            cache[key] = LimitedFieldsSerializer
+            while len(cache) > MAX_LIMITED_SERIALIZERS:
+                cache.popitem(last=False)
         return LimitedFieldsSerializer
 
     def get_serializer_class(self):
@@ -26,8 +65,65 @@ class AllowFieldLimitingMixin(object):
         fields.
         """
         serializer_class = super(AllowFieldLimitingMixin, self).get_serializer_class()
-        fields = self.request.QUERY_PARAMS.get('fields')
-        if self.request.method == 'GET' and fields:
+        fields = self.get_limited_fields(serializer_class)
+        if fields:
             return self.get_serializer_class_for_fields(serializer_class, fields)
         return serializer_class
 
+    def get_fields_lookups(self, serializer_class, fields):
+        """
+        Returns:
+            A tuple of (columns, related).  `columns` are the model fields
+            the serializer fields are read from, or None if we can't tell.
+            `related` are the lookups to prefetch for them.
+        """
+        model = serializer_class.Meta.model
+        declared = getattr(serializer_class, 'base_fields', {})
+        columns = set([model._meta.pk.name])
+        related = set()
+        for name in fields:
+            related.update(self.prefetch_for_fields.get(name, ()))
+            source = getattr(declared.get(name), 'source', None) or name
+            if name == 'url' or source == '*':
+                # Hyperlinks are built from the pk.  Fields built from the
+                # whole object say what they need in prefetch_for_fields.
+                continue
+            root = source.split('.')[0]
+            try:
+                field, field_model, direct, m2m = model._meta.get_field_by_name(root)
+            except FieldDoesNotExist:
+                # A property or method.  It could use any column.
+                columns = None
+                continue
+            if direct and not m2m:
+                if columns is not None:
+                    columns.add(root)
+                    # maps' CollectionFrom fields are read from their
+                    # component fields.
+                    for attr in ('points_name', 'lines_name', 'polys_name'):
+                        if getattr(field, attr, None):
+                            columns.add(getattr(field, attr))
+                if field.rel:
+                    related.add(root)
+            else:
+                related.add(root)
+        return columns, related
+
+    def get_queryset(self):
+        queryset = super(AllowFieldLimitingMixin, self).get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+
+        serializer_class = super(AllowFieldLimitingMixin, self).get_serializer_class()
+        limited_fields = self.get_limited_fields(serializer_class)
+        fields = limited_fields or getattr(serializer_class.Meta, 'fields', ())
+        columns, related = self.get_fields_lookups(serializer_class, fields)
+        if limited_fields and columns:
+            if getattr(queryset.model, '_history_delta_fields', None):
+                # Delta-stored fields are only put back together when
+                # their keyframe id has been loaded.
+                columns.add('history_delta_base')
+            queryset = queryset.only(*columns)
+        if related:
+            queryset = queryset.prefetch_related(*sorted(related))
+        return queryset
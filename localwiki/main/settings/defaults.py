@@ -1,3 +1,4 @@
+# -*- coding: utf-8 -*-
 # Django settings for localwiki project.
 import sys
 import os
@@ -262,6 +263,62 @@ CACHES = {
     }
 }
 
+# Templates compiled from page content are kept in a per-process LRU cache
+# of this size.  Set PAGE_TEMPLATE_CACHE_BACKEND to the name of one of the
+# CACHES above to also share the intermediate template text between
+# processes.
+#
+# The shared backend also holds the per-page generation that's bumped when
+# a page's files change, which is how the other processes learn their
+# templates are stale.  Without one (None), a process only clears its own
+# templates, and the rest may keep serving the old file and thumbnail
+# markup for up to PAGE_TEMPLATE_LOCAL_CACHE_TIMEOUT seconds.  Lower it for
+# fresher pages, at the cost of compiling popular pages more often; it's
+# ignored when there is a shared backend.  With several processes, set a
+# shared (e.g. memcached) backend.
+PAGE_TEMPLATE_CACHE_SIZE = 500
+PAGE_TEMPLATE_CACHE_BACKEND = None
+PAGE_TEMPLATE_CACHE_TIMEOUT = 60 * 60 * 24 * 29
+PAGE_TEMPLATE_LOCAL_CACHE_TIMEOUT = 60
+
+# Varnish bans sent outside of a ban_batch() are held for up to this many
+# seconds so they can be combined.  Each combined ban covers at most
+# VARNISH_BAN_MAX_URLS URLs.
+VARNISH_BAN_WINDOW = 0
+VARNISH_BAN_MAX_URLS = 50
+
+# Update a page's links, included pages and included tag lists in a Celery
+# task rather than during the request that saved it.
+LINKS_UPDATE_ASYNC = False
+
+# How many of the most recent followed changes we keep in each user's
+# activity timeline.
+ACTIVITY_TIMELINE_LENGTH = 1000
+
+# The map is served as tiles cut from an in-memory index of each region's
+# map objects.  How many regions' indexes each process keeps, and how long
+# (in seconds) built tiles are cached for.
+MAPS_TILE_INDEX_REGIONS = 20
+MAPS_TILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Tags shown as their own layers on the main map of regions that haven't
+# set up any map layers of their own.
+MAPS_DEFAULT_LAYERS = [
+    u'國道', u'省道', u'鄉道', u'鐵路', u'取水點', u'快速道路', u'指揮中心',
+    u'消防單位', u'警察單位', u'醫療院所', u'高速鐵路', u'物資存備點',
+    u'海嘯危險區域', u'直升機起降點', u'老人福利機構', u'適用地震災害',
+    u'適用水災災害', u'適用海嘯災害', u'人車轉運集結點', u'室內避難收容所',
+    u'室外避難收容所', u'救援器材放置點', u'通訊設備放置點', u'適用土石流災害',
+    u'海嘯避難收容處所', u'身心障礙福利機構',
+]
+
+# Looking up the geometry of an OpenStreetMap item when adding it to a map.
+# With MAPS_OSM_LOOKUP_ASYNC, lookups that aren't cached are done in a
+# Celery task that the map editor polls, rather than during the request.
+MAPS_OSM_LOOKUP_ASYNC = False
+MAPS_OSM_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+MAPS_OSM_TIMEOUT = 60
+
 JOHNNY_MIDDLEWARE_KEY_PREFIX = 'jc_lw'
 PHASED_KEEP_CONTEXT = False
 
@@ -399,6 +456,31 @@ REST_FRAMEWORK = {
     ),
 }
 
+# How long, in seconds, each process remembers which region a slug or
+# domain belongs to.  Saving a Region or RegionSettings clears this.
+REGIONS_RESOLVER_TTL = 60
+
+# How long, in seconds, the markers on the map of all regions are cached
+# for.  Saving a Region or RegionSettings clears them.
+REGIONS_MARKERS_CACHE_TIMEOUT = 60 * 60
+
+# Most pages that can be sent to the bulk pages API endpoint at once.
+PAGES_BULK_MAX_ITEMS = 500
+
+# How long, in seconds, page suggestions are cached for.
+PAGES_SUGGEST_CACHE_TIMEOUT = 60
+
+# How long, in seconds, the maps and cards of each region's front page are
+# cached for.  They're also cleared when the region's maps, tags, page
+# scores or front page change.
+FRONTPAGE_BUNDLE_CACHE_TIMEOUT = 60 * 60
+
+# How many regions' tag suggest indexes each process keeps in memory.
+TAGS_SUGGEST_INDEX_REGIONS = 200
+# How often, in seconds, at most, a process rebuilds its index of all
+# regions' tags after tags change in another process.
+TAGS_SUGGEST_GLOBAL_REBUILD_INTERVAL = 60
+
 # Allow Cross-Origin Resource Sharing headers on API urls
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'(^/api/.*$)|(^/(.+)/map/_get_osm/[^/]*$)'
@@ -455,6 +537,21 @@ LANGUAGE_DEFAULT_CENTERS = {
 DAISYDIFF_URL = 'http://localhost:8080/daisydiff/diff'
 DAISYDIFF_MERGE_URL = 'http://localhost:8080/daisydiff/merge'
 
+# Versions larger than this (combined, in characters) are compared as plain
+# text.  HTMLDIFF_TIMEOUT is how long, in seconds, we'll spend looking for
+# the smallest diff before settling for a rougher one.
+HTMLDIFF_MAX_SIZE = 500000
+HTMLDIFF_TIMEOUT = 1.0
+
+# Store page history as deltas against periodic full copies ("keyframes")
+# rather than a full copy of every version.  Existing history can be
+# rewritten with `manage.py compact_history`.
+VERSIONUTILS_DELTA_STORAGE = False
+VERSIONUTILS_DELTA_KEYFRAME_INTERVAL = 25
+# Store a version in full if its delta would be larger than this fraction
+# of its size.
+VERSIONUTILS_DELTA_MAX_RATIO = 0.5
+
 IN_API_TEST = False
 
 # list of regular expressions for white listing embedded URLs
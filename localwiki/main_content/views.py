@@ -19,7 +19,7 @@ class SplashPageView(RegionListView):
         context = super(SplashPageView, self).get_context_data(*args, **kwargs)
 
         qs = Region.objects.exclude(regionsettings__is_meta_region=True)
-        qs = qs.exclude(is_active=False)
+        qs = qs.exclude(is_active=False).defer('geom')
 
         # Exclude ones with empty scores
         qs = qs.exclude(score=None)
@@ -5,3 +5,10 @@ from django.contrib import admin
 from .models import *
 
 admin.site.register(MapData)#, admin.GeoModelAdmin)
+
+
+class MapLayerAdmin(admin.ModelAdmin):
+    list_display = ('tag_name', 'region', 'order')
+    list_filter = ('region',)
+
+admin.site.register(MapLayer, MapLayerAdmin)
@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.core.cache import cache
 from django.core.urlresolvers import set_urlconf, get_urlconf
 
@@ -6,8 +9,31 @@ from celery import shared_task
 from regions.models import Region
 
 
+def _generation_key(region_id):
+    return 'maps:generation:%s' % region_id
+
+
+def region_maps_generation(region_id):
+    """
+    Returns:
+        A token that changes whenever the region's maps change.  Things
+        built from the region's maps are cached under it.
+    """
+    key = _generation_key(region_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(key, generation)
+    return generation
+
+
+def invalidate_region_maps(region_id):
+    cache.set(_generation_key(region_id), uuid.uuid4().hex)
+
+
 @shared_task(ignore_result=True)
 def django_invalidate_region_map(region_id):
+    invalidate_region_maps(region_id)
     region = Region.objects.get(id=region_id)
 
     def _do_invalidate():
@@ -31,10 +57,16 @@ def django_invalidate_region_map(region_id):
     set_urlconf(current_urlconf)
 
 def _map_cache_post_edit(sender, instance, **kwargs):
-    django_invalidate_region_map.delay(instance.region.id)
+    if instance.region_id:
+        django_invalidate_region_map.delay(instance.region_id)
 
 def _map_cache_post_save(sender, instance, created, raw, **kwargs):
     _map_cache_post_edit(sender, instance, **kwargs)
 
 def _map_cache_pre_delete(sender, instance, **kwargs):
     _map_cache_post_edit(sender, instance, **kwargs)
+
+def _map_cache_tags_changed(sender, instance, action, **kwargs):
+    # Tags decide which layers a map object is on.
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _map_cache_post_edit(sender, instance, **kwargs)
@@ -0,0 +1,106 @@
+import random
+import time
+from optparse import make_option
+
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.test.client import RequestFactory
+
+from localwiki.utils.queries import count_queries
+from regions.models import Region
+
+from maps import tiles
+from maps.cache import invalidate_region_maps
+from maps.views import MapObjectsForBounds, MapTileView
+
+
+class Command(BaseCommand):
+    args = '<region_slug>'
+    help = ("Times random map pans in a region served by the bounding box "
+            "(_objects/) view against the same pans served as tiles.")
+    option_list = BaseCommand.option_list + (
+        make_option('--pans',
+            type='int',
+            dest='pans',
+            default=50,
+            help='Number of random pans to time'),
+        make_option('--zoom',
+            type='int',
+            dest='zoom',
+            default=14,
+            help='Zoom level to pan around at'),
+        make_option('--width',
+            type='int',
+            dest='width',
+            default=1024,
+            help='Width of the map, in pixels'),
+        make_option('--height',
+            type='int',
+            dest='height',
+            default=768,
+            help='Height of the map, in pixels'),
+    )
+
+    def handle(self, *slugs, **options):
+        if len(slugs) != 1:
+            raise CommandError("You must provide a region slug.")
+        try:
+            region = Region.objects.get(slug=slugs[0])
+        except Region.DoesNotExist:
+            raise CommandError('Region "%s" does not exist.' % slugs[0])
+        if isinstance(cache, DummyCache):
+            self.stdout.write("Warning: with the dummy cache backend, tiles "
+                              "are rebuilt on every request.\n")
+
+        extent = tiles.visible_mapdata(region).extent(field_name='geom')
+        if extent is None:
+            raise CommandError('Region "%s" has no maps.' % region.slug)
+
+        zoom = options['zoom']
+        half_width = options['width'] * tiles.pixel_size(zoom) / 2
+        half_height = options['height'] * tiles.pixel_size(zoom) / 2
+        west, south, east, north = extent
+        viewports = []
+        for i in range(options['pans']):
+            lon = random.uniform(west, east)
+            lat = random.uniform(south, north)
+            viewports.append((lon - half_width, lat - half_height,
+                              lon + half_width, lat + half_height))
+
+        factory = RequestFactory()
+        bbox_view = MapObjectsForBounds.as_view()
+        tile_view = MapTileView.as_view()
+
+        def bbox_pan(viewport):
+            # The map asks for 1.5 times its extent.
+            x0, y0, x1, y1 = viewport
+            dx, dy = (x1 - x0) / 4, (y1 - y0) / 4
+            bbox = ','.join(str(v) for v in (x0 - dx, y0 - dy, x1 + dx, y1 + dy))
+            request = factory.get('/', {'bbox': bbox, 'zoom': zoom})
+            return [bbox_view(request, region=region.slug)]
+
+        def tile_pan(viewport):
+            x0, y0 = tiles.lonlat_to_tile(viewport[0], viewport[3], zoom)
+            x1, y1 = tiles.lonlat_to_tile(viewport[2], viewport[1], zoom)
+            return [tile_view(factory.get('/'), region=region.slug,
+                              z=str(zoom), x=str(x), y=str(y))
+                    for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+        invalidate_region_maps(region.id)
+        self.time('bounding box', bbox_pan, viewports)
+        self.time('tiles, cold', tile_pan, viewports)
+        self.time('tiles, warm', tile_pan, viewports)
+
+    def time(self, name, pan, viewports):
+        queries = size = 0
+        start = time.time()
+        for viewport in viewports:
+            with count_queries() as counter:
+                size += sum(len(r.content) for r in pan(viewport))
+            queries += counter.count
+        elapsed = time.time() - start
+        n = len(viewports)
+        self.stdout.write('%s: %.1fms, %.1f queries and %dKB per pan\n' % (
+            name, elapsed * 1000 / n, float(queries) / n, size / 1024 / n))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.gis.db import models
 from django.core.urlresolvers import reverse
 
@@ -38,6 +39,45 @@ class MapData(models.Model):
 versioning.register(MapData)
 
 
+class MapLayer(models.Model):
+    """
+    A layer on a region's main map showing the pages with a tag.
+    """
+    region = models.ForeignKey(Region)
+    tag_name = models.CharField(max_length=100)
+    icon = models.CharField(max_length=255, blank=True,
+        help_text="URL of the layer's marker icon. Defaults to "
+                  "tagicon/<tag name>.png in the static files.")
+    order = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ('order', 'id')
+
+    def __unicode__(self):
+        return self.tag_name
+
+    def get_icon_url(self):
+        return self.icon or default_layer_icon(self.tag_name)
+
+
+def default_layer_icon(tag_name):
+    return '%stagicon/%s.png' % (settings.STATIC_URL, tag_name)
+
+
+def map_layers_for_region(region):
+    """
+    Returns:
+        A list of (tag name, icon URL) for the layers on the region's map:
+        its MapLayers, or the MAPS_DEFAULT_LAYERS if it has none.
+    """
+    layers = [(l.tag_name, l.get_icon_url())
+              for l in MapLayer.objects.filter(region=region)]
+    if layers:
+        return layers
+    return [(name, default_layer_icon(name))
+            for name in getattr(settings, 'MAPS_DEFAULT_LAYERS', [])]
+
+
 # For registration calls
 from . import feeds
 from . import signals
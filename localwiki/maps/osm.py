@@ -1,17 +1,23 @@
 from cStringIO import StringIO
-from subprocess import Popen, PIPE, STDOUT
 from urlparse import urljoin
-import csv
-import os
+import uuid
 
 from lxml import etree
 import requests
+from celery import shared_task
 
-from django.contrib.gis.geos import GEOSGeometry, GeometryCollection
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.gis.geos import (GeometryCollection, LineString,
+    MultiLineString, MultiPolygon, Point, Polygon)
+
+from regions.models import Region
 
 
 OSM_OVERPASS_API = 'http://overpass-api.de/api/interpreter'
 OSM_REVERSE_GEOCODE_API = 'http://nominatim.openstreetmap.org/reverse'
+# How long, in seconds, we keep track of a background lookup.
+OSM_JOB_TIMEOUT = 60 * 10
 
 
 def approx_km_to_degree(km):
@@ -61,44 +67,156 @@ def get_osm_xml(osm_id, osm_type, display_name, region):
         'w': w,
     }
     r = requests.post(OSM_OVERPASS_API,
-                      data=recursive_find_with_bbox.encode('utf-8'))
+                      data=recursive_find_with_bbox.encode('utf-8'),
+                      timeout=getattr(settings, 'MAPS_OSM_TIMEOUT', 60))
     return r.text.encode('utf-8')
 
 
-def xml_to_geom(layer, osm_xml):
-    os.environ['OSM_USE_CUSTOM_INDEXING'] = 'NO'
-    p = Popen(['ogr2ogr', '-f', 'CSV', '/vsistdout/', '/vsistdin/', layer, '-lco',
-               'GEOMETRY=AS_WKT'], stdout=PIPE, stdin=PIPE, stderr=PIPE, env=os.environ)
-    output = p.communicate(input=osm_xml)[0]
-    reader = csv.reader(StringIO(output))
-    try:
-        reader.next()
-        wkts = [r[0] for r in reader]
-        return [GEOSGeometry(wkt) for wkt in wkts]
-    except:
-        return None
+# Closed ways with one of these tags are areas rather than lines.  The
+# same list ogr2ogr's OSM driver uses.
+AREA_TAGS = ('aeroway', 'amenity', 'boundary', 'building', 'craft',
+             'geological', 'historic', 'landuse', 'leisure', 'military',
+             'natural', 'office', 'place', 'shop', 'sport', 'tourism')
+# Tags that don't make an otherwise untagged node or way worth showing.
+IGNORED_TAGS = ('created_by', 'source', 'note', 'fixme', 'FIXME')
+
+
+def parse_osm_xml(osm_xml):
+    """
+    Reads OSM XML in a single pass.
+
+    Returns:
+        A tuple of (nodes, ways, relations).  `nodes` maps node ids to
+        ((lon, lat), tags), `ways` maps way ids to (node ids, tags) and
+        `relations` is a list of (members, tags), where members are
+        (type, id, role) tuples.
+    """
+    nodes, ways, relations = {}, {}, []
+    for event, elem in etree.iterparse(StringIO(osm_xml), events=('end',)):
+        if elem.tag not in ('node', 'way', 'relation'):
+            continue
+        tags = dict((t.get('k'), t.get('v')) for t in elem.iterfind('tag'))
+        if elem.tag == 'node':
+            nodes[elem.get('id')] = (
+                (float(elem.get('lon')), float(elem.get('lat'))), tags)
+        elif elem.tag == 'way':
+            ways[elem.get('id')] = (
+                [nd.get('ref') for nd in elem.iterfind('nd')], tags)
+        else:
+            relations.append((
+                [(m.get('type'), m.get('ref'), m.get('role'))
+                 for m in elem.iterfind('member')], tags))
+        elem.clear()
+    return nodes, ways, relations
+
+
+def _is_significant(tags):
+    return any(k not in IGNORED_TAGS for k in tags)
+
+
+def _is_area(node_ids, tags):
+    if len(node_ids) < 4 or node_ids[0] != node_ids[-1]:
+        return False
+    if tags.get('area') == 'no':
+        return False
+    return tags.get('area') == 'yes' or any(k in tags for k in AREA_TAGS)
+
+
+def _join_rings(node_id_lists):
+    """
+    Joins ways end to end into closed rings.  Ways that can't be closed
+    into a ring are dropped.
+    """
+    rings = []
+    pending = [list(l) for l in node_id_lists if len(l) >= 2]
+    while pending:
+        ring = pending.pop(0)
+        while ring[0] != ring[-1]:
+            for i, other in enumerate(pending):
+                if other[0] == ring[-1]:
+                    ring.extend(other[1:])
+                    break
+                if other[-1] == ring[-1]:
+                    ring.extend(reversed(other[:-1]))
+                    break
+            else:
+                break
+            del pending[i]
+        if ring[0] == ring[-1] and len(ring) >= 4:
+            rings.append(ring)
+    return rings
 
 
 def osm_xml_to_geom(osm_xml, osm_type):
+    """
+    Converts OSM XML to a GeometryCollection: tagged nodes become points,
+    ways become lines or polygons and relations become polygons, lines or
+    their members' geometries, much like ogr2ogr's OSM layers.
+    """
+    nodes, ways, relations = parse_osm_xml(osm_xml)
+
+    def coords(node_ids):
+        try:
+            return [nodes[i][0] for i in node_ids]
+        except KeyError:
+            return None
+
+    def line(node_ids):
+        c = coords(node_ids)
+        if c and len(c) >= 2:
+            return LineString(c)
+
     geoms = []
+    in_relations = set()
+    for members, tags in relations:
+        member_ways = [(ref, role) for type, ref, role in members
+                       if type == 'way' and ref in ways]
+        in_relations.update(ref for ref, role in member_ways)
+
+        if tags.get('type') in ('multipolygon', 'boundary'):
+            outers = _join_rings([ways[ref][0] for ref, role in member_ways
+                                  if role != 'inner'])
+            inners = [c for c in map(coords, _join_rings(
+                [ways[ref][0] for ref, role in member_ways if role == 'inner']))
+                if c]
+            polys = []
+            for outer in filter(None, map(coords, outers)):
+                shell = Polygon(outer)
+                holes = [inner for inner in inners
+                         if shell.contains(Point(inner[0]))]
+                polys.append(Polygon(outer, *holes))
+            if polys:
+                geoms.append(MultiPolygon(polys))
+        elif tags.get('type') == 'route':
+            lines = filter(None, [line(ways[ref][0]) for ref, role in member_ways])
+            if lines:
+                geoms.append(MultiLineString(lines))
+        else:
+            for type, ref, role in members:
+                if type == 'node' and ref in nodes:
+                    geoms.append(Point(nodes[ref][0]))
+                elif type == 'way' and ref in ways:
+                    geom = line(ways[ref][0])
+                    if geom:
+                        geoms.append(geom)
+
+    for way_id, (node_ids, tags) in ways.iteritems():
+        if way_id in in_relations or not _is_significant(tags):
+            continue
+        if _is_area(node_ids, tags):
+            c = coords(node_ids)
+            if c:
+                geoms.append(Polygon(c))
+        else:
+            geom = line(node_ids)
+            if geom:
+                geoms.append(geom)
 
     # We don't care about points for ways.
     if osm_type != 'way':
-        points = xml_to_geom('points', osm_xml)
-        if points:
-            geoms += points
-    lines = xml_to_geom('lines', osm_xml)
-    if lines:
-        geoms += lines
-    multilinestrings = xml_to_geom('multilinestrings', osm_xml)
-    if multilinestrings:
-        geoms += multilinestrings
-    multipolygons = xml_to_geom('multipolygons', osm_xml)
-    if multipolygons:
-        geoms += multipolygons
-    other_relations = xml_to_geom('other_relations', osm_xml)
-    if other_relations:
-        geoms += other_relations
+        for (point, tags) in nodes.itervalues():
+            if _is_significant(tags):
+                geoms.append(Point(point))
 
     return GeometryCollection(geoms)
 
@@ -110,3 +228,71 @@ def osm_xml_to_tags(osm_xml, osm_type):
 def get_osm_geom(osm_id, osm_type, display_name, region):
     osm_xml = get_osm_xml(osm_id, osm_type, display_name, region)
     return osm_xml_to_geom(osm_xml, osm_type)
+
+
+def _lookup_key(osm_id, osm_type, region):
+    # The lookup is by name near the region, so the same OSM item can
+    # give different results in different regions.
+    return 'maps:osm:%s:%s:%s' % (osm_type, osm_id, region.id)
+
+
+def lookup_osm_geometry(osm_id, osm_type, display_name, region):
+    """
+    Returns:
+        A dictionary with the `geom` (as EWKT) and `tags` of the OSM item,
+        from the cache if we've looked it up recently.
+    """
+    key = _lookup_key(osm_id, osm_type, region)
+    result = cache.get(key)
+    if result is None:
+        osm_xml = get_osm_xml(osm_id, osm_type, display_name, region)
+        result = {
+            'geom': osm_xml_to_geom(osm_xml, osm_type).ewkt,
+            'tags': osm_xml_to_tags(osm_xml, osm_type)
+        }
+        cache.set(key, result,
+                  getattr(settings, 'MAPS_OSM_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+    return result
+
+
+def get_cached_osm_geometry(osm_id, osm_type, region):
+    return cache.get(_lookup_key(osm_id, osm_type, region))
+
+
+def _job_key(job_id):
+    return 'maps:osm:job:%s' % job_id
+
+
+def queue_osm_lookup(osm_id, osm_type, display_name, region):
+    """
+    Looks up the OSM item in a Celery task.
+
+    Returns:
+        The id of the job, for get_osm_lookup_job().
+    """
+    job_id = uuid.uuid4().hex
+    cache.set(_job_key(job_id), {'status': 'pending'}, OSM_JOB_TIMEOUT)
+    _lookup_osm_geometry.delay(job_id, osm_id, osm_type, display_name, region.id)
+    return job_id
+
+
+def get_osm_lookup_job(job_id):
+    """
+    Returns:
+        A dictionary with the `status` of the job ('pending', 'done' or
+        'failed') and, once it's done, its `result`.  None if there's no
+        such job.
+    """
+    return cache.get(_job_key(job_id))
+
+
+@shared_task(ignore_result=True)
+def _lookup_osm_geometry(job_id, osm_id, osm_type, display_name, region_id):
+    try:
+        region = Region.objects.get(id=region_id)
+        result = lookup_osm_geometry(osm_id, osm_type, display_name, region)
+    except Exception:
+        cache.set(_job_key(job_id), {'status': 'failed'}, OSM_JOB_TIMEOUT)
+        raise
+    cache.set(_job_key(job_id), {'status': 'done', 'result': result},
+              OSM_JOB_TIMEOUT)
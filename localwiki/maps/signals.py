@@ -1,8 +1,17 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 
-from .models import MapData
-from .cache import _map_cache_post_save, _map_cache_pre_delete
+from tags.models import PageTagSet
+
+from .models import MapData, MapLayer
+from .cache import (_map_cache_post_save, _map_cache_pre_delete,
+    _map_cache_tags_changed)
 
 
 post_save.connect(_map_cache_post_save, sender=MapData)
 post_delete.connect(_map_cache_pre_delete, sender=MapData)
+
+post_save.connect(_map_cache_post_save, sender=MapLayer)
+post_delete.connect(_map_cache_pre_delete, sender=MapLayer)
+
+m2m_changed.connect(_map_cache_tags_changed, sender=PageTagSet.tags.through)
+post_delete.connect(_map_cache_pre_delete, sender=PageTagSet)
@@ -584,21 +584,69 @@ SaplingMap = {
         return data;
     },
 
+    _tileRange: function(extent, zoom) {
+        // The web map tiles at `zoom` covering `extent` (in EPSG:4326).
+        var n = Math.pow(2, zoom);
+        var clamp = function(v) { return Math.max(0, Math.min(n - 1, v)); };
+        var tileX = function(lon) {
+            return clamp(Math.floor((lon + 180) / 360 * n));
+        };
+        var tileY = function(lat) {
+            lat = Math.max(-85.0511, Math.min(85.0511, lat)) * Math.PI / 180;
+            return clamp(Math.floor((1 - Math.log(Math.tan(lat) + 1 / Math.cos(lat)) / Math.PI) / 2 * n));
+        };
+        return { left: tileX(extent.left), right: tileX(extent.right),
+                 top: tileY(extent.top), bottom: tileY(extent.bottom) };
+    },
+
+    _tileExtent: function(range, zoom) {
+        // The EPSG:4326 bounds of a range of tiles.
+        var n = Math.pow(2, zoom);
+        var lon = function(x) { return x / n * 360 - 180; };
+        var lat = function(y) {
+            return Math.atan(0.5 * (Math.exp(Math.PI * (1 - 2 * y / n)) -
+                                    Math.exp(-Math.PI * (1 - 2 * y / n)))) * 180 / Math.PI;
+        };
+        return new OpenLayers.Bounds(lon(range.left), lat(range.bottom + 1),
+                                     lon(range.right + 1), lat(range.top));
+    },
+
     _loadObjects: function(map, layer, callback) {
         var selectedFeature = layer._selectedFeature;
-        var extent = map.getExtent().scale(1.5);
-        var bbox = extent.clone().transform(layer.projection,
-                       new OpenLayers.Projection('EPSG:4326')).toBBOX();
         var zoom = map.getZoom();
+        var range = SaplingMap._tileRange(map.getExtent().clone().transform(
+            layer.projection, new OpenLayers.Projection('EPSG:4326')), zoom);
+        var extent = SaplingMap._tileExtent(range, zoom).transform(
+            new OpenLayers.Projection('EPSG:4326'), layer.projection);
         var set_feature_alpha = SaplingMap._set_feature_alpha;
         var myDataToken = Math.random();
         layer.dataToken = myDataToken;
 
-        $.get('_objects/', { 'bbox': bbox, 'zoom': zoom }, function(data){
+        var requests = [];
+        for (var x = range.left; x <= range.right; x++) {
+            for (var y = range.top; y <= range.bottom; y++) {
+                requests.push($.getJSON('_tiles/' + zoom + '/' + x + '/' + y));
+            }
+        }
+
+        $.when.apply($, requests).done(function(){
             if(layer.dataToken != myDataToken)
             {
                 return;
             }
+            // Objects that cross tiles appear in each of them.
+            var results = requests.length == 1 ? [arguments] : arguments;
+            var data = [];
+            var seen = {};
+            for (var i=0; i<results.length; i++) {
+                var tile = results[i][0];
+                for (var j=0; j<tile.length; j++) {
+                    if (!seen[tile[j][2]]) {
+                        seen[tile[j][2]] = true;
+                        data.push(tile[j]);
+                    }
+                }
+            }
             layer.dataExtent = extent;
 
             // Turn off clustering before fiddling with the layer.
@@ -609,6 +657,11 @@ SaplingMap = {
             map.addLayer(temp);
             layer.removeAllFeatures();
 
+            // Longest first, for the correct stacking order.
+            temp.features.sort(function(a, b) {
+                return b.geometry.getLength() - a.geometry.getLength();
+            });
+
             $.each(temp.features, function(index, feature) {
                 if(selectedFeature && selectedFeature.geometry.toString() == feature.geometry.toString()) {
                     temp.features[index] = selectedFeature;
@@ -802,7 +855,8 @@ SaplingMap = {
             $('.mapwidget').prepend('<div class="loading"></div>');
             $('.mapwidget .loading').height($('.mapwidget').height());
 
-            $.get('//' + home_hostname + '/' + region_slug + '/map/_get_osm/', { 'display_name': datum.display_name, 'osm_id': datum.osm_id, 'osm_type': datum.osm_type }, function(data){
+            var osm_url = '//' + home_hostname + '/' + region_slug + '/map/_get_osm/';
+            var show_osm_geom = function(data){
                 if (data.geom == "GEOMETRYCOLLECTION EMPTY" && datum.lat && datum.lon) {
                     _add_as_point(datum);
                 }
@@ -820,7 +874,22 @@ SaplingMap = {
                   }
                   $('.mapwidget .loading').remove();
                 }
-            });
+            };
+            var get_osm_geom = function(params) {
+                $.get(osm_url, params, function(data){
+                    // Looked up in the background; check back shortly.
+                    if (data.job && data.status == 'pending') {
+                        setTimeout(function() { get_osm_geom({'job': data.job}); }, 1000);
+                    }
+                    else if (data.job) {
+                        $('.mapwidget .loading').remove();
+                    }
+                    else {
+                        show_osm_geom(data);
+                    }
+                });
+            };
+            get_osm_geom({ 'display_name': datum.display_name, 'osm_id': datum.osm_id, 'osm_type': datum.osm_type });
         });
     },
 
@@ -6,6 +6,15 @@ from utils import TestSettingsManager
 from models import *
 
 from maps.fields import *
+from django.test.client import RequestFactory
+
+from maps.models import MapData, MapLayer, map_layers_for_region
+from maps.views import MapFullRegionLayerView
+from maps.osm import osm_xml_to_geom
+from tags.models import Tag, PageTagSet
+from maps.tiles import tile_bounds, lonlat_to_tile, RegionTileIndex
+from regions.models import Region
+from pages.models import Page
 
 mgr = TestSettingsManager()
 INSTALLED_APPS = list(settings.INSTALLED_APPS)
@@ -78,3 +87,127 @@ class CollectionFromTest(TestCase):
         self.assertTrue(m.polys.contains(poly3))
         # Lines should be set to None
         self.assertEqual(m.lines, None)
+
+
+class TileTest(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name="San Francisco", slug="sf")
+        self.sf.save()
+
+        dolores_park = Page(name="Dolores Park", content="<p>Hi</p>", region=self.sf)
+        dolores_park.save()
+        MapData(page=dolores_park, region=self.sf, geom=GEOSGeometry(
+            """GEOMETRYCOLLECTION (POLYGON ((-122.4284 37.7612, -122.4256 37.7614, -122.4253 37.7580, -122.4281 37.7579, -122.4284 37.7612)))""")).save()
+
+        ferry_building = Page(name="Ferry Building", content="<p>Hi</p>", region=self.sf)
+        ferry_building.save()
+        MapData(page=ferry_building, region=self.sf, geom=GEOSGeometry(
+            """GEOMETRYCOLLECTION (POINT (-122.3937 37.7955))""")).save()
+
+        self.index = RegionTileIndex.for_region(self.sf)
+
+    def test_tile_math(self):
+        x, y = lonlat_to_tile(-122.4270, 37.7596, 14)
+        west, south, east, north = tile_bounds(14, x, y)
+        self.assertTrue(west <= -122.4270 <= east)
+        self.assertTrue(south <= 37.7596 <= north)
+
+    def test_tile_contents(self):
+        x, y = lonlat_to_tile(-122.4270, 37.7596, 14)
+        names = [o[1] for o in self.index.tile(14, x, y, self.sf)]
+        self.assertEqual(names, ['Dolores Park'])
+
+        x, y = lonlat_to_tile(-122.3937, 37.7955, 14)
+        names = [o[1] for o in self.index.tile(14, x, y, self.sf)]
+        self.assertEqual(names, ['Ferry Building'])
+
+        # Zoomed out, the small park is hidden but the point isn't.
+        x, y = lonlat_to_tile(-122.4270, 37.7596, 3)
+        names = [o[1] for o in self.index.tile(3, x, y, self.sf)]
+        self.assertEqual(names, ['Ferry Building'])
+
+
+class MapLayerTest(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name="San Francisco", slug="sf")
+        self.sf.save()
+        park = Tag(name="park", region=self.sf)
+        park.save()
+
+        for name, point in (("Dolores Park", "POINT (-122.4270 37.7596)"),
+                            ("Ferry Building", "POINT (-122.3937 37.7955)")):
+            page = Page(name=name, content="<p>Hi</p>", region=self.sf)
+            page.save()
+            MapData(page=page, region=self.sf, geom=GEOSGeometry(
+                "GEOMETRYCOLLECTION (%s)" % point)).save()
+        pts = PageTagSet(page=Page.objects.get(name="Dolores Park"), region=self.sf)
+        pts.save()
+        pts.tags.add(park)
+
+    def get_layers(self):
+        view = MapFullRegionLayerView()
+        view.request = RequestFactory().get('/sf/map/')
+        view.kwargs = {'region': 'sf'}
+        view.object_list = view.get_queryset()
+        return [(sorted(o[1] for o in objs), opts.get('overlay_style', {}).get('external_graphic'))
+                for objs, opts in view.get_layers()]
+
+    def test_default_layers(self):
+        self.assertEqual(map_layers_for_region(self.sf)[0][0],
+                         settings.MAPS_DEFAULT_LAYERS[0])
+
+    def test_layers(self):
+        MapLayer(region=self.sf, tag_name="park", icon="/park.png").save()
+        MapLayer(region=self.sf, tag_name="cafe").save()
+        layers = self.get_layers()
+        self.assertEqual(len(layers), 2)
+        self.assertEqual(len(layers[0][0]), 2)
+        self.assertEqual(len(layers[1][0]), 1)
+        self.assertTrue('Dolores Park' in layers[1][0][0])
+        self.assertEqual(layers[1][1], '/park.png')
+
+
+class OSMTest(TestCase):
+    osm_xml = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="37.0" lon="-122.0"/>
+  <node id="2" lat="37.0" lon="-121.9"/>
+  <node id="3" lat="37.1" lon="-121.9"/>
+  <node id="4" lat="37.1" lon="-122.0"/>
+  <node id="5" lat="37.02" lon="-121.98"/>
+  <node id="6" lat="37.02" lon="-121.92"/>
+  <node id="7" lat="37.08" lon="-121.92"/>
+  <node id="8" lat="37.08" lon="-121.98"/>
+  <node id="9" lat="37.5" lon="-122.5">
+    <tag k="name" v="Fountain"/>
+  </node>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="1"/></way>
+  <way id="12"><nd ref="5"/><nd ref="6"/><nd ref="7"/><nd ref="8"/><nd ref="5"/></way>
+  <way id="13">
+    <nd ref="1"/><nd ref="9"/>
+    <tag k="highway" v="path"/>
+  </way>
+  <relation id="20">
+    <member type="way" ref="10" role="outer"/>
+    <member type="way" ref="11" role="outer"/>
+    <member type="way" ref="12" role="inner"/>
+    <tag k="type" v="multipolygon"/>
+    <tag k="name" v="Park"/>
+  </relation>
+</osm>"""
+
+    def test_osm_xml_to_geom(self):
+        geom = osm_xml_to_geom(self.osm_xml, 'relation')
+        types = sorted(g.geom_type for g in geom)
+        self.assertEqual(types, ['LineString', 'MultiPolygon', 'Point'])
+
+        park = [g for g in geom if g.geom_type == 'MultiPolygon'][0]
+        self.assertEqual(len(park), 1)
+        # The inner way is a hole in the outer ring the other two make.
+        self.assertEqual(park[0].num_interior_rings, 1)
+        self.assertAlmostEqual(park.area, 0.01 - 0.0036)
+
+        # No points for ways.
+        geom = osm_xml_to_geom(self.osm_xml, 'way')
+        self.assertFalse('Point' in [g.geom_type for g in geom])
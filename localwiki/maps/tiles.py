@@ -0,0 +1,233 @@
+"""
+Map objects served as tiles.
+
+Rather than asking PostGIS which of a region's MapData fall inside the
+map's bounds on every pan, we keep an in-memory grid index of each
+region's map objects and cut it into the usual z/x/y web map tiles.  Each
+tile holds the objects it touches, simplified to a pixel's accuracy at its
+zoom level, and is kept in the cache until the region's maps change.
+"""
+import math
+import threading
+from collections import defaultdict, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import get_urlconf
+from django.contrib.gis.geos import Polygon
+
+from pages.models import page_url
+
+from .models import MapData
+from .cache import region_maps_generation
+
+
+# Objects are bucketed into the cells of this tile zoom level (about 10km
+# across at the equator).
+INDEX_ZOOM = 12
+# Objects spanning more cells than this are kept aside and checked
+# against every tile.
+MAX_CELLS_PER_OBJECT = 256
+MAX_ZOOM = 22
+MAX_LATITUDE = 85.0511287798
+
+POINT_TYPES = ('Point', 'MultiPoint')
+POLYGON_TYPES = ('Polygon', 'MultiPolygon')
+
+
+def visible_mapdata(region):
+    queryset = MapData.objects.filter(region=region)
+    # XXX TODO TEMPORARY HACK
+    queryset = queryset.exclude(page__pagetagset__tags__slug='zipcode')
+    queryset = queryset.exclude(
+        page__pagetagset__tags__slug='supervisorialdistrict')
+    return queryset
+
+
+def tile_bounds(z, x, y):
+    """
+    Returns:
+        The (west, south, east, north) bounds, in degrees, of the web
+        mercator tile at z/x/y.
+    """
+    n = 2.0 ** z
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+def lonlat_to_tile(lon, lat, z):
+    """
+    Returns:
+        The (x, y) of the tile at zoom level `z` containing the point.
+    """
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return max(min(x, n - 1), 0), max(min(y, n - 1), 0)
+
+
+def pixel_size(z, lat=0):
+    """
+    Returns:
+        Roughly how many degrees a pixel covers at zoom level `z`.
+    """
+    return 360.0 / (256 * 2 ** z) * math.cos(math.radians(lat))
+
+
+class MapObject(object):
+    __slots__ = ('geom', 'extent', 'name', 'length', 'points_only',
+                 'has_points', 'has_polys', 'simplified')
+
+    def __init__(self, geom, name, length):
+        types = set(g.geom_type for g in geom)
+        self.geom = geom
+        self.extent = geom.extent
+        self.name = name
+        self.length = length or 0
+        self.has_points = bool(types.intersection(POINT_TYPES))
+        self.points_only = bool(types) and types.issubset(POINT_TYPES)
+        self.has_polys = bool(types.intersection(POLYGON_TYPES))
+        # Zoom level -> EWKT simplified for that zoom level
+        self.simplified = {}
+
+    def ewkt(self, z, lat):
+        if z not in self.simplified:
+            if self.points_only or z >= MAX_ZOOM:
+                geom = self.geom
+            else:
+                geom = self.geom.simplify(pixel_size(z, lat),
+                                          preserve_topology=True)
+            self.simplified[z] = geom.ewkt
+        return self.simplified[z]
+
+
+class RegionTileIndex(object):
+    """
+    A grid index of a region's map objects.
+    """
+    def __init__(self, objects):
+        self.objects = objects
+        self.cells = defaultdict(list)
+        self.large = []
+        for i, obj in enumerate(objects):
+            x0, y0, x1, y1 = self._cell_range(obj.extent)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_OBJECT:
+                self.large.append(i)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells[(cx, cy)].append(i)
+
+    @classmethod
+    def for_region(cls, region):
+        objects = []
+        qs = visible_mapdata(region).values_list('geom', 'page__name', 'length')
+        for geom, name, length in qs.iterator():
+            if geom is not None and not geom.empty:
+                objects.append(MapObject(geom, name, length))
+        return cls(objects)
+
+    def _cell_range(self, extent):
+        west, south, east, north = extent
+        # Tile y grows southwards.
+        x0, y0 = lonlat_to_tile(west, north, INDEX_ZOOM)
+        x1, y1 = lonlat_to_tile(east, south, INDEX_ZOOM)
+        return x0, y0, x1, y1
+
+    def query(self, bounds):
+        """
+        Returns:
+            The objects that intersect the (west, south, east, north)
+            bounds.
+        """
+        x0, y0, x1, y1 = self._cell_range(bounds)
+        found = set(self.large)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            for (cx, cy), ids in self.cells.iteritems():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found.update(ids)
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    found.update(self.cells.get((cx, cy), ()))
+
+        west, south, east, north = bounds
+        box = Polygon.from_bbox(bounds)
+        results = []
+        for i in found:
+            obj = self.objects[i]
+            ox0, oy0, ox1, oy1 = obj.extent
+            if ox0 > east or ox1 < west or oy0 > north or oy1 < south:
+                continue
+            if obj.geom.intersects(box):
+                results.append(obj)
+        return results
+
+    def tile(self, z, x, y, region):
+        """
+        Returns:
+            A list of [ewkt, page name, page url] for the objects in the
+            tile, in the same form and order as the map's `_objects/`
+            view.
+        """
+        bounds = tile_bounds(z, x, y)
+        objs = self.query(bounds)
+        # The same rules as maps.views.filter_by_zoom
+        if z < 14 and len([o for o in objs if o.has_polys]) >= 5:
+            objs = [o for o in objs if not o.points_only]
+        min_length = 100 * pow(2, 0 - z)
+        objs = [o for o in objs if o.has_points or o.length >= min_length]
+        objs.sort(key=lambda o: -o.length)
+
+        lat = (bounds[1] + bounds[3]) / 2
+        return [[o.ewkt(z, lat), o.name, page_url(o.name, region)]
+                for o in objs]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def region_tile_index(region, generation):
+    """
+    Returns:
+        The RegionTileIndex for the region, built afresh if the region's
+        tiles were invalidated since we last built it.
+    """
+    max_regions = getattr(settings, 'MAPS_TILE_INDEX_REGIONS', 20)
+    with _indexes_lock:
+        cached = _indexes.pop(region.id, None)
+        if cached is not None:
+            _indexes[region.id] = cached
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    index = RegionTileIndex.for_region(region)
+    with _indexes_lock:
+        _indexes.pop(region.id, None)
+        _indexes[region.id] = (generation, index)
+        while len(_indexes) > max_regions:
+            _indexes.popitem(last=False)
+    return index
+
+
+def get_tile(region, z, x, y):
+    """
+    Returns:
+        The map objects in tile z/x/y of the region, from the cache if
+        we can.
+    """
+    generation = region_maps_generation(region.id)
+    urlconf = get_urlconf() or settings.ROOT_URLCONF
+    key = 'maps:tile:%s:%s:%s:%d/%d/%d' % (
+        urlconf, region.id, generation, z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = region_tile_index(region, generation).tile(z, x, y, region)
+        cache.set(key, tile,
+                  getattr(settings, 'MAPS_TILE_CACHE_TIMEOUT', 60 * 60 * 24))
+    return tile
@@ -14,6 +14,7 @@ urlpatterns = patterns('',
     url(r'^(?P<region>[^/]+?)/map/_everything_everywhere$', EverythingEverywhereAsPointsView.as_view(), name='everything-as-points'),
     url(r'^(?P<region>[^/]+?)/map/tags/(?P<tag>.+)', MapForTag.as_view(), name='tagged'),
     url(r'^(?P<region>[^/]+?)/map/_objects/$', MapObjectsForBounds.as_view(), name='objects'),
+    url(r'^(?P<region>[^/]+?)/map/_tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)$', MapTileView.as_view(), name='tile'),
     url(r'^(?P<region>[^/]+?)/map/_get_osm/$', OSMGeometryLookup.as_view(), name='osm-geom-lookup'),
     url(r'^(?P<region>[^/]+?)/map/_edit_without_page$', MapCreateWithoutPageView.as_view(),  name='edit-without-page'),
     url(r'^(?P<region>[^/]+?)/map/(?P<slug>.+)/_edit$', MapUpdateView.as_view(),  name='edit'),
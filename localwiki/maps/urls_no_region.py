@@ -13,6 +13,7 @@ urlpatterns = patterns('',
     url(r'^map/_everything_everywhere$', EverythingEverywhereAsPointsView.as_view(), name='everything-as-points'),
     url(r'^map/tags/(?P<tag>.+)', MapForTag.as_view(), name='tagged'),
     url(r'^map/_objects/$', MapObjectsForBounds.as_view(), name='objects'),
+    url(r'^map/_tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)$', MapTileView.as_view(), name='tile'),
     url(r'^map/_get_osm/$', OSMGeometryLookup.as_view(), name='osm-geom-lookup'),
     url(r'^map/_edit_without_page$', MapCreateWithoutPageView.as_view(),  name='edit-without-page'),
     url(r'^map/(?P<slug>.+)/_edit$', MapUpdateView.as_view(),  name='edit'),
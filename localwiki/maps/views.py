@@ -4,10 +4,10 @@ from dateutil.parser import parse as dateparser
 from operator import attrgetter
 
 from django.conf import settings
-from django.views.generic import DetailView, ListView
+from django.views.generic import DetailView, ListView, View
 from django.shortcuts import get_object_or_404, render
 from django.contrib import messages
-from django.http import HttpResponseNotFound
+from django.http import HttpResponseNotFound, Http404
 from django.db.models import Q
 from django.db import IntegrityError
 from django.views.generic.list import BaseListView
@@ -15,6 +15,7 @@ from olwidget.widgets import InfoMap as OLInfoMap
 from django.contrib.gis.geos.polygon import Polygon
 from django.contrib.gis.geos import Point
 from django.core.cache import cache
+from django.core.urlresolvers import get_urlconf
 from django.utils.translation import ugettext as _
 from django.contrib.gis.measure import D
 from django.utils.safestring import mark_safe
@@ -33,9 +34,12 @@ from users.views import AddContributorsMixin
 from localwiki.utils.views import CacheMixin
 
 from .widgets import Map, InfoLayer, InfoMap, map_options_for_region
-from .models import MapData
+from .models import MapData, map_layers_for_region
+from .cache import region_maps_generation
 from .forms import MapForm
-from .osm import get_osm_geom, get_osm_xml, osm_xml_to_geom, osm_xml_to_tags
+from .tiles import visible_mapdata, get_tile, MAX_ZOOM
+from .osm import (lookup_osm_geometry, get_cached_osm_geometry,
+    queue_osm_lookup, get_osm_lookup_job)
 
 
 class MapDetailView(Custom404Mixin, AddContributorsMixin, RegionMixin, DetailView):
@@ -101,10 +105,11 @@ def filter_by_zoom(queryset, zoom):
     return queryset
 
 
-def popup_html(mapdata=None, pagename=None):
+def popup_html(mapdata=None, pagename=None, region=None):
     if mapdata:
         pagename = mapdata.page.name
-    url = page_url(pagename, mapdata.region)
+        region = mapdata.region
+    url = page_url(pagename, region)
     return mark_safe('<a href="%s">%s</a>' % (url, pagename))
 
 
@@ -190,25 +195,64 @@ class MapFullRegionView(CacheMixin, BaseMapRegionView):
 
 
 class MapFullRegionLayerView(MapFullRegionView):
-    layer_names = [u'國道', u'省道', u'鄉道', u'鐵路', u'取水點', u'快速道路', u'指揮中心', u'消防單位', u'警察單位', u'醫療院所', u'高速鐵路', u'物資存備點', u'海嘯危險區域', u'直升機起降點',
-                   u'老人福利機構', u'適用地震災害', u'適用水災災害', u'適用海嘯災害', u'人車轉運集結點', u'室內避難收容所', u'室外避難收容所', u'救援器材放置點', u'通訊設備放置點', u'適用土石流災害', u'海嘯避難收容處所', u'身心障礙福利機構']
-
-    def get_map_objects_by_tag(self, tag_name):
-        return [(obj.geom, popup_html(obj)) for obj in filter_by_tags(self.object_list, tag_name)]
+    """
+    The region's main map, with an extra layer for each of the region's
+    MapLayers.
+    """
+    def get_layers(self):
+        """
+        Returns:
+            A list of (map objects, layer options) for the main layer and
+            each tag layer with something on it, built from one query.
+        """
+        from tags.models import slugify as tag_slugify
 
-    def get_map(self):
-        map_objects = [InfoLayer(self.get_map_objects())]
-        for layer_name in MapFullRegionLayerView.layer_names:
-            layer_objects = self.get_map_objects_by_tag(layer_name)
-            if len(layer_objects) > 0:
-                map_objects.append(InfoLayer(layer_objects, {
+        region = self.get_region()
+        urlconf = get_urlconf() or settings.ROOT_URLCONF
+        key = 'maps:layers:%s:%s:%s' % (
+            urlconf, region.id, region_maps_generation(region.id))
+        layers = cache.get(key)
+        if layers is not None:
+            return layers
+
+        layer_defs = map_layers_for_region(region)
+        layer_slugs = dict((tag_slugify(name), i)
+                           for i, (name, icon) in enumerate(layer_defs))
+        # The slugs of each object's tags that have a layer.
+        objs = self.object_list.extra(
+            select={'layer_tags': """ARRAY(
+                SELECT t.slug FROM tags_pagetagset ts
+                JOIN tags_pagetagset_tags tt ON tt.pagetagset_id = ts.id
+                JOIN tags_tag t ON t.id = tt.tag_id
+                WHERE ts.page_id = maps_mapdata.page_id AND t.slug = ANY(%s))"""},
+            select_params=(list(layer_slugs),)
+        ).values('geom', 'page__name', 'layer_tags')
+
+        main_layer = []
+        tag_layers = [[] for name in layer_defs]
+        for obj in objs:
+            item = (obj['geom'], popup_html(pagename=obj['page__name'], region=region))
+            main_layer.append(item)
+            for slug in obj['layer_tags'] or []:
+                tag_layers[layer_slugs[slug]].append(item)
+
+        layers = [(main_layer, {})]
+        for (name, icon), layer_objects in zip(layer_defs, tag_layers):
+            if layer_objects:
+                layers.append((layer_objects, {
                     'overlay_style': {
-                        'external_graphic': '/static/tagicon/%s.png' % layer_name,
+                        'external_graphic': icon,
                         'graphic_height': 32,
                         'graphic_width': 32,
                         'graphic_opacity': 1.0
                     }
                 }))
+        cache.set(key, layers, self.cache_timeout)
+        return layers
+
+    def get_map(self):
+        map_objects = [InfoLayer(layer_objects, layer_options)
+                       for layer_objects, layer_options in self.get_layers()]
         options = map_options_for_region(self.get_region())
         options.update({
             'dynamic': self.dynamic,
@@ -318,11 +362,7 @@ class MapObjectsForBounds(JSONResponseMixin, RegionMixin, BaseListView):
     model = MapData
 
     def get_queryset(self):
-        queryset = MapData.objects.filter(region=self.get_region())
-        # XXX TODO TEMPORARY HACK
-        queryset = queryset.exclude(page__pagetagset__tags__slug='zipcode')
-        queryset = queryset.exclude(
-            page__pagetagset__tags__slug='supervisorialdistrict')
+        queryset = visible_mapdata(self.get_region())
         bbox = self.request.GET.get('bbox', None)
         if bbox:
             bbox = Polygon.from_bbox([float(x) for x in bbox.split(',')])
@@ -345,18 +385,48 @@ class MapObjectsForBounds(JSONResponseMixin, RegionMixin, BaseListView):
         return map_objects
 
 
+class MapTileView(JSONResponseMixin, RegionMixin, View):
+    """
+    The map objects in a z/x/y tile, in the same form as
+    MapObjectsForBounds.
+    """
+    def get(self, request, *args, **kwargs):
+        z, x, y = int(kwargs['z']), int(kwargs['x']), int(kwargs['y'])
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise Http404
+        return self.render_to_response(
+            get_tile(self.get_region(), z, x, y))
+
+
 class OSMGeometryLookup(RegionMixin, JSONView):
+    """
+    The geometry and tags of an OpenStreetMap item.
 
+    With MAPS_OSM_LOOKUP_ASYNC on, items we haven't looked up recently are
+    looked up in the background and we return a `job` id instead, to be
+    polled with ?job=<id> until the result is ready.
+    """
     def get_context_data(self, **kwargs):
+        job_id = self.request.GET.get('job')
+        if job_id:
+            job = get_osm_lookup_job(job_id)
+            if job is None:
+                raise Http404
+            if job['status'] == 'done':
+                return job['result']
+            return {'job': job_id, 'status': job['status']}
+
         display_name = self.request.GET.get('display_name')
         osm_id = int(self.request.GET.get('osm_id'))
         osm_type = self.request.GET.get('osm_type')
-        osm_xml = get_osm_xml(
-            osm_id, osm_type, display_name, self.get_region())
-        return {
-            'geom': osm_xml_to_geom(osm_xml, osm_type).ewkt,
-            'tags': osm_xml_to_tags(osm_xml, osm_type)
-        }
+        region = self.get_region()
+        if getattr(settings, 'MAPS_OSM_LOOKUP_ASYNC', False):
+            result = get_cached_osm_geometry(osm_id, osm_type, region)
+            if result is None:
+                job_id = queue_osm_lookup(osm_id, osm_type, display_name, region)
+                return {'job': job_id, 'status': 'pending'}
+            return result
+        return lookup_osm_geometry(osm_id, osm_type, display_name, region)
 
 
 class MapVersionDetailView(MapDetailView):
@@ -0,0 +1,52 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from regions.models import Region
+
+from page_scores.models import rescore_region, _rescore_region, RESCORE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    args = '<region_slug region_slug ...>'
+    help = ('Recomputes the page scores of every page in the given regions.\n' +
+            'Usage: localwiki-manage rescore_region [--all] [--async] <region_slug ...>')
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Rescore every region'),
+        make_option('--async',
+            action='store_true',
+            dest='async',
+            default=False,
+            help='Queue a task for each region instead of scoring here'),
+        make_option('--chunk-size',
+            type='int',
+            dest='chunk_size',
+            default=RESCORE_CHUNK_SIZE,
+            help='Number of pages to score and write at a time'),
+    )
+
+    def handle(self, *slugs, **options):
+        if options['all']:
+            regions = Region.objects.all()
+        elif slugs:
+            regions = []
+            for slug in slugs:
+                try:
+                    regions.append(Region.objects.get(slug=slug))
+                except Region.DoesNotExist:
+                    raise CommandError('Region "%s" does not exist.' % slug)
+        else:
+            raise CommandError("You must provide a region slug or --all.")
+
+        for region in regions:
+            if options['async']:
+                _rescore_region.delay(region.id, chunk_size=options['chunk_size'])
+                self.stdout.write('Queued rescoring of "%s"\n' % region.slug)
+            else:
+                num = rescore_region(region, chunk_size=options['chunk_size'])
+                self.stdout.write('Rescored %d pages in "%s"\n' % (num, region.slug))
@@ -5,15 +5,17 @@ import urlparse
 
 from django.utils.translation import ugettext as _
 from django.utils.encoding import smart_str
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
+from django.db.models import Avg, Count
 from django.core.cache import cache
 from django.db.models.signals import post_save
 
 from pages.models import Page, slugify
 from links.models import Link
+from frontpage.cache import invalidate_frontpage_bundle
 
 SKIP_USER_PAGES_FOR_PAGESCORE = True
+RESCORE_CHUNK_SIZE = 500
 
 
 class PageScore(models.Model):
@@ -73,13 +75,49 @@ def avg_page_length(region):
     cache.set('avg_page_length:%s' % region.slug, avg, 60 * 15)
     return avg
 
-def _compute_score(page):
+class RegionScoreStats(object):
+    """
+    The region-wide numbers that go into each page's score, loaded once
+    so they can be shared while scoring many pages.
+
+    If `load_slugs` is set we also keep the slugs of every page in the
+    region around, so that link targets can be checked without querying.
+    """
+    def __init__(self, region, load_slugs=False):
+        self.region = region
+        self.avg_page_length = avg_page_length(region)
+        self.avg_incoming_links = avg_incoming_links_for_region(region)
+        self.slugs = None
+        if load_slugs:
+            self.slugs = set(Page.objects.filter(region=region).values_list('slug', flat=True))
+
+    def existing_slugs(self, slugs):
+        """
+        Returns:
+            The subset of `slugs` that belong to pages in the region.
+        """
+        slugs = set(slugs)
+        if not slugs:
+            return slugs
+        if self.slugs is not None:
+            return slugs.intersection(self.slugs)
+        return set(Page.objects.filter(
+            region=self.region, slug__in=slugs).values_list('slug', flat=True))
+
+def _compute_score(page, stats=None, has_map=None, num_links_to_here=None):
+    """
+    Args:
+        page: The Page to score.
+        stats: A RegionScoreStats for the page's region.
+        has_map: Whether or not the page has a map, if already known.
+        num_links_to_here: The number of links to the page, if already known.
+    """
     from maps.models import MapData
     from pages.plugins import _files_url
 
     score = 0
     num_images = 0
-    link_num = 0
+    link_slugs = []
 
     # XXX TODO remove this once all
     # /User/ pages are moved to a single global namespace
@@ -87,8 +125,13 @@ def _compute_score(page):
         if page.slug.startswith('users/'):
             return 0
 
+    if stats is None:
+        stats = RegionScoreStats(page.region)
+
     # 1 point for having a map
-    if MapData.objects.filter(page=page).exists():
+    if has_map is None:
+        has_map = MapData.objects.filter(page=page).exists()
+    if has_map:
         score += 1
 
     # Parse the page HTML and look for good stuff
@@ -102,10 +145,11 @@ def _compute_score(page):
         for i in e.iter('a'):
             src = i.attrib.get('href', '')
             if is_internal(src) and not is_plugin(i):
-                slug = slugify(unicode(urllib.unquote(src), 'utf-8', errors='ignore'))
-                # Only count links to pages that exist
-                if Page.objects.filter(slug=slug, region=page.region).exists():
-                    link_num += 1
+                link_slugs.append(slugify(unicode(urllib.unquote(src), 'utf-8', errors='ignore')))
+
+    # Only count links to pages that exist
+    existing = stats.existing_slugs(link_slugs)
+    link_num = len([slug for slug in link_slugs if slug in existing])
 
     # One point for each image, up to three points
     score += min(num_images, 3)
@@ -118,14 +162,14 @@ def _compute_score(page):
         score += 1
 
     # 1 point for a page length >= average page length
-    avg_page_length = Page.objects.filter(region=page.region).aggregate(
-        avg=Avg('score__page_content_length'))
-    if len(page.content) >= avg_page_length:
-        score += min(int((len(page.content) * 1.0) / avg_page_length), 3)
+    avg_length = stats.avg_page_length
+    if avg_length and len(page.content) >= avg_length:
+        score += min(int((len(page.content) * 1.0) / avg_length), 3)
 
     # Use # of incoming links in the page score
-    avg_links_to = avg_incoming_links_for_region(page.region)
-    num_links_to_here = page.links_to_here.count()
+    avg_links_to = stats.avg_incoming_links
+    if num_links_to_here is None:
+        num_links_to_here = page.links_to_here.count()
     if num_links_to_here >= avg_links_to:
         if avg_links_to > 0:
             score += min(int((num_links_to_here * 1.0) / avg_links_to), 5)
@@ -135,6 +179,57 @@ def _compute_score(page):
 
     return score
 
+def _score_pages(pages, stats):
+    """
+    Scores `pages`, which all belong to `stats.region`, and writes out
+    their PageScores in bulk.
+    """
+    from maps.models import MapData
+
+    page_ids = [p.id for p in pages]
+    with_maps = set(MapData.objects.filter(page__in=page_ids).values_list('page', flat=True))
+    links_to_here = dict(Link.objects.filter(destination__in=page_ids).
+        values_list('destination').annotate(num=Count('id')))
+
+    scores = [
+        PageScore(
+            page_id=p.id,
+            score=_compute_score(p, stats,
+                has_map=(p.id in with_maps),
+                num_links_to_here=links_to_here.get(p.id, 0)),
+            page_content_length=len(p.content),
+        ) for p in pages
+    ]
+    with transaction.commit_on_success():
+        PageScore.objects.filter(page__in=page_ids).delete()
+        PageScore.objects.bulk_create(scores)
+    # The front page shows the best scoring pages.
+    invalidate_frontpage_bundle(stats.region.id)
+
+def rescore_region(region, chunk_size=RESCORE_CHUNK_SIZE):
+    """
+    Recomputes the score of every page in `region`, `chunk_size` pages at
+    a time.
+
+    Returns:
+        The number of pages scored.
+    """
+    stats = RegionScoreStats(region, load_slugs=True)
+    page_ids = list(Page.objects.filter(region=region).order_by('id').values_list('id', flat=True))
+    for i in range(0, len(page_ids), chunk_size):
+        pages = list(Page.objects.filter(id__in=page_ids[i:i + chunk_size]))
+        _score_pages(pages, stats)
+    return len(page_ids)
+
+@shared_task(ignore_result=True)
+def _rescore_region(region_id, chunk_size=RESCORE_CHUNK_SIZE):
+    from regions.models import Region
+
+    region = Region.objects.filter(id=region_id)
+    if not region.exists():
+        return
+    rescore_region(region[0], chunk_size=chunk_size)
+
 @shared_task(ignore_result=True)
 def _calculate_page_score(page_id):
     page = Page.objects.filter(id=page_id)
@@ -143,7 +238,8 @@ def _calculate_page_score(page_id):
     else:
         return
 
-    score = _compute_score(page)
+    # Uses the cached region averages, so this stays cheap.
+    score = _compute_score(page, RegionScoreStats(page.region))
     
     score_obj = PageScore.objects.filter(page=page)
     if not score_obj.exists():
@@ -160,7 +256,7 @@ def _handle_page_score(sender, instance, created, raw, **kws):
     if raw:
         return
     if sender == Page:
-        if getattr(instance, '_in_rename', False):
+        if getattr(instance, '_in_rename', False) or getattr(instance, '_in_bulk', False):
             return
 
         _calculate_page_score.delay(instance.id)
@@ -0,0 +1,55 @@
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.gis.geos import GEOSGeometry
+
+from pages.models import Page
+from maps.models import MapData
+from regions.models import Region
+
+from .models import PageScore, rescore_region, _calculate_page_score
+
+
+class RescoreRegionTest(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name='San Francisco', slug='sf')
+        self.sf.save()
+
+        for name in ('Parks', 'Dolores Park', 'Cafes', 'Mission'):
+            Page(name=name, content='<p>Hi</p>', region=self.sf).save()
+        Page(name='Valencia Street', region=self.sf, content=(
+            '<p><a href="Parks">Parks</a>, <a href="Cafes">Cafes</a> and '
+            '<a href="Mission">the Mission</a>, but not '
+            '<a href="Nowhere">Nowhere</a>.</p>')).save()
+        Page(name='Bernal Heights', region=self.sf,
+             content='<p>%s</p>' % ('A long page. ' * 50)).save()
+        Page(name='Users/someone', region=self.sf, content='<p>Me</p>').save()
+
+        dolores = Page.objects.get(slug='dolores park', region=self.sf)
+        MapData(page=dolores, region=self.sf, geom=GEOSGeometry(
+            'GEOMETRYCOLLECTION (POINT (-122.427 37.759))')).save()
+
+        # The region's average page length comes from the stored scores,
+        # so give every page one before comparing.
+        rescore_region(self.sf)
+
+    def test_rescore_matches_single_page_scores(self):
+        out = StringIO()
+        call_command('rescore_region', 'sf', chunk_size=2, stdout=out)
+        self.assertEqual(out.getvalue(), 'Rescored 7 pages in "sf"\n')
+
+        rescored = dict(PageScore.objects.filter(page__region=self.sf).
+            values_list('page', 'score'))
+        self.assertEqual(len(rescored), 7)
+        # Make sure we're comparing more than zeros.
+        self.assertTrue(len(set(rescored.values())) > 1)
+
+        for page_id in rescored:
+            _calculate_page_score(page_id)
+        single = dict(PageScore.objects.filter(page__region=self.sf).
+            values_list('page', 'score'))
+        self.assertEqual(rescored, single)
+
+        for score in PageScore.objects.filter(page__region=self.sf).select_related('page'):
+            self.assertEqual(score.page_content_length, len(score.page.content))
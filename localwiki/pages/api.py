@@ -1,7 +1,15 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction, DatabaseError
 from django import forms
 
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework_filters import FilterSet, filters
 from rest_framework_gis.filters import GeoFilterSet
 
@@ -14,6 +22,9 @@ from regions.api import RegionFilter
 from users.api import UserFilter
 
 from .models import Page, PageFile, slugify
+from .bulk import get_or_create_tags, set_page_tags, _async_pages_saved_in_bulk
+from .cache import django_invalidate_page
+from .signals import _maybe_follow_region
 from .serializers import (PageSerializer, HistoricalPageSerializer,
     FileSerializer, HistoricalFileSerializer)
 
@@ -145,6 +156,7 @@ class PageViewSet(AllowFieldLimitingMixin, viewsets.ModelViewSet):
     serializer_class = PageSerializer
     filter_class = PageFilter
     ordering_fields = ('slug',)
+    prefetch_for_fields = {'tags': ('pagetagset__tags',)}
 
     def post_save(self, page, *args, **kwargs):
         if not hasattr(page, '_tags'):
@@ -165,6 +177,155 @@ class PageViewSet(AllowFieldLimitingMixin, viewsets.ModelViewSet):
             pts.tags = tags
 
 
+class PageBulkViewSet(viewsets.ViewSet):
+    """
+    API endpoint that allows many pages to be created and updated at once.
+
+    `POST` a list of pages here, each in the same form as on the
+    [page resource](../pages/), e.g.:
+
+        [{"name": "Dolores Park", "content": "<p>A park.</p>",
+          "region": "https://localwiki.org/api/v4/regions/1/",
+          "tags": ["park", "dogs"]},
+         {"name": "Duboce Park", "content": "<p>Another park.</p>",
+          "region": "https://localwiki.org/api/v4/regions/1/"}]
+
+    If a page with the same name already exists in the region it's updated,
+    otherwise it's created.  Leave out `tags` to leave a page's tags as
+    they are.
+
+    The pages are saved together in one transaction.  You'll get back one
+    result for each page, in the order they were sent, with:
+
+      * `status` -- `201` if the page was created, `200` if it was updated
+        or unchanged, `400` if it wasn't valid and `403` if you can't edit
+        it.
+      * `url` -- The page's URL, if it was saved.
+      * `errors` -- What was wrong, if it wasn't.
+
+    Up to 500 pages can be sent in one request.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_serializer_context(self):
+        return {
+            'request': self.request,
+            'format': self.format_kwarg,
+            'view': self,
+        }
+
+    def create(self, request, *args, **kwargs):
+        items = request.DATA
+        if type(items) is not list:
+            raise ParseError("expected a list of pages")
+        max_items = getattr(settings, 'PAGES_BULK_MAX_ITEMS', 500)
+        if len(items) > max_items:
+            raise ParseError("at most %d pages can be saved at once" % max_items)
+
+        results = [None] * len(items)
+        valid = []
+        for i, data in enumerate(items):
+            serializer = PageSerializer(data=data, context=self.get_serializer_context())
+            if not serializer.is_valid():
+                results[i] = {'status': status.HTTP_400_BAD_REQUEST,
+                              'errors': serializer.errors}
+                continue
+            page = serializer.object
+            if page._tags and not all(tag_slugify(w) for w in page._tags):
+                results[i] = {'status': status.HTTP_400_BAD_REQUEST,
+                              'errors': {'tags': ['Invalid tag name.']}}
+                continue
+            valid.append((i, page))
+
+        # Look up the pages we'll be updating in one go.
+        slugs = defaultdict(set)
+        for i, page in valid:
+            slugs[page.region].add(slugify(page.name))
+        existing = {}
+        for region, region_slugs in slugs.iteritems():
+            for page in Page.objects.filter(region=region, slug__in=region_slugs).\
+                    prefetch_related('pagetagset__tags'):
+                existing[(region.id, page.slug)] = page
+
+        saved, created_ids, changed_tags = [], [], set()
+        with transaction.commit_on_success():
+            words = defaultdict(set)
+            for i, page in valid:
+                words[page.region].update(page._tags or [])
+            tags = dict((region, get_or_create_tags(region_words, region))
+                        for region, region_words in words.iteritems())
+
+            for i, page in valid:
+                key = (page.region.id, slugify(page.name))
+                old = existing.get(key)
+                if old:
+                    allowed = request.user.has_perm('pages.change_page', old)
+                else:
+                    allowed = request.user.has_perm('pages.add_page', page)
+                if not allowed:
+                    results[i] = {'status': status.HTTP_403_FORBIDDEN,
+                        'errors': {'non_field_errors': [
+                            'You do not have permission to edit this page.']}}
+                    continue
+
+                if old:
+                    changed = (old.name, old.content) != (page.name, page.content)
+                    old.name, old.content = page.name, page.content
+                    page_tags, page = page._tags, old
+                else:
+                    changed = True
+                    page_tags = page._tags
+
+                sid = transaction.savepoint()
+                try:
+                    page._in_bulk = True
+                    if changed:
+                        page.save()
+                    tags_changed = set()
+                    if page_tags is not None:
+                        region_tags = tags[page.region]
+                        tags_changed = set_page_tags(page, [
+                            region_tags[tag_slugify(w)] for w in page_tags])
+                except DatabaseError as e:
+                    transaction.savepoint_rollback(sid)
+                    results[i] = {'status': status.HTTP_400_BAD_REQUEST,
+                                  'errors': {'non_field_errors': [unicode(e)]}}
+                    continue
+                transaction.savepoint_commit(sid)
+
+                # Later items with the same name update this page.
+                existing[key] = page
+                if changed or tags_changed:
+                    saved.append(page)
+                    changed_tags.update((page.region.id, t) for t in tags_changed)
+                if not old:
+                    created_ids.append(page.id)
+                results[i] = {
+                    'status': status.HTTP_200_OK if old else status.HTTP_201_CREATED,
+                    'url': page_api_url(page, request),
+                }
+
+        if saved:
+            # Clear the page caches now, so the changes show up right away,
+            # and hand the rest of the derived work off in one batch.
+            for page in saved:
+                django_invalidate_page(page)
+            if not settings.IN_API_TEST and not settings.DISABLE_FOLLOW_SIGNALS:
+                # Once for each region, rather than for each page.
+                by_region = {}
+                for page in saved:
+                    by_region.setdefault(page.region_id, page)
+                for page in by_region.values():
+                    _maybe_follow_region.delay(page)
+            _async_pages_saved_in_bulk.delay(
+                list(set(p.id for p in saved)), created_ids, list(changed_tags))
+        return Response(results)
+
+
+def page_api_url(page, request):
+    return reverse('page-detail', kwargs={'pk': page.pk}, request=request)
+
+
 class HistoricalPageViewSet(AllowFieldLimitingMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing page history.
@@ -289,5 +450,6 @@ class HistoricalFileViewSet(AllowFieldLimitingMixin, viewsets.ReadOnlyModelViewS
 
 router.register(u'pages', PageViewSet)
 router.register(u'pages_history', HistoricalPageViewSet)
+router.register(u'pages_bulk', PageBulkViewSet, base_name='pages_bulk')
 router.register(u'files', FileViewSet)
 router.register(u'files_history', HistoricalFileViewSet)
@@ -0,0 +1,228 @@
+"""
+Coalescing queue for Varnish ban commands.
+
+Editing a page can invalidate thousands of URLs at once (every page that
+links to it, every page that includes it, tag views in nearby regions..).
+Rather than sending one ban per URL, each over a fresh connection to the
+Varnish management port, we queue up (url, hostname) pairs, drop
+duplicates and send a few combined regex bans per host over one
+persistent connection per management server.
+
+Bans queued inside a ``with ban_batch():`` block are held until the block
+exits.  Outside of a batch, bans are sent once VARNISH_BAN_WINDOW seconds
+have passed since the oldest queued ban (by default, right away).
+"""
+import logging
+import socket
+import threading
+import time
+import urllib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from varnish import VarnishHandler
+
+logger = logging.getLogger(__name__)
+
+rfc_3986_reserved = """!*'();:@&=+$,/?#[]"""
+rfc_3986_unreserved = """ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~"""
+VARNISH_SAFE = rfc_3986_reserved + rfc_3986_unreserved
+
+# Characters that mean something inside a regular expression.
+REGEX_SPECIAL = set(""".^$*+?()[]{}|\\""")
+
+BAN_TEMPLATE = r'obj.http.x-url ~ ^(?i)(%(urls)s(/*)(\\?.*)?)$ && obj.http.x-host ~ ^((?i)(.*\\.)?%(host)s(:[0-9]*)?)$'
+
+
+def quote_url(url):
+    # Varnish needs it quoted, but has a wonky way of encoding URLs :/
+    url = urllib.unquote(url)
+    url = urllib.quote(url, safe=VARNISH_SAFE)
+    if type(url) != unicode:
+        url = url.decode('utf-8')
+    return url
+
+
+def escape_regex(s):
+    # The management port un-escapes backslashes once, so we double them.
+    return u''.join([(u'\\\\' + c) if c in REGEX_SPECIAL else c for c in s])
+
+
+def ban_expression(urls, host):
+    """
+    Returns:
+        A ban expression matching any of the quoted `urls` on `host`.
+    """
+    if len(urls) == 1:
+        urls_re = escape_regex(urls[0])
+    else:
+        urls_re = u'(%s)' % u'|'.join([escape_regex(u) for u in urls])
+    return (BAN_TEMPLATE % {'urls': urls_re, 'host': host}).encode('utf-8')
+
+
+class BanQueue(object):
+    """
+    Collects Varnish bans and sends them, combined, over persistent
+    management connections.
+
+    Attrs:
+        stats: Counters for the `queued` (url, hostname) pairs, the `issued`
+            ban commands, the pairs that were `coalesced` into another ban
+            and the pairs `dropped` because no server would accept them.
+    """
+    def __init__(self, servers=None, secret=None, window=None, max_urls=None):
+        self.servers = servers
+        self.secret = secret
+        self.window = window
+        self.max_urls = max_urls
+        self._pending = {}
+        self._n_added = 0
+        self._oldest = None
+        self._batch_depth = 0
+        self._timer = None
+        self._connections = {}
+        self._lock = threading.RLock()
+        self.stats = {'queued': 0, 'issued': 0, 'coalesced': 0, 'dropped': 0}
+
+    def get_servers(self):
+        if self.servers is not None:
+            return self.servers
+        return getattr(settings, 'VARNISH_MANAGEMENT_SERVERS', ())
+
+    def get_secret(self):
+        if self.secret is not None:
+            return self.secret
+        return getattr(settings, 'VARNISH_SECRET', None)
+
+    def get_window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'VARNISH_BAN_WINDOW', 0)
+
+    def get_max_urls(self):
+        if self.max_urls is not None:
+            return self.max_urls
+        return getattr(settings, 'VARNISH_BAN_MAX_URLS', 50)
+
+    def add(self, url, hostname):
+        url = quote_url(url)
+        with self._lock:
+            self.stats['queued'] += 1
+            self._n_added += 1
+            urls = self._pending.setdefault(hostname.lower(), {})
+            # Bans are case-insensitive, so are our duplicates.
+            urls.setdefault(url.lower(), url)
+            if self._oldest is None:
+                self._oldest = time.time()
+            if self._batch_depth:
+                return
+            window = self.get_window()
+            if time.time() - self._oldest >= window:
+                self.flush()
+            elif self._timer is None:
+                # Make sure we send these even if nothing else is queued.
+                self._timer = threading.Timer(window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @contextmanager
+    def batch(self):
+        """
+        Holds on to all bans queued inside the block and sends them when
+        the (outermost) block exits.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def flush(self):
+        """
+        Sends all queued bans.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            n_added, self._n_added = self._n_added, 0
+            self._oldest = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            n_issued = 0
+            n_dropped = 0
+            for host, urls in pending.items():
+                chunk_size = self.get_max_urls()
+                urls = sorted(urls.values())
+                for i in range(0, len(urls), chunk_size):
+                    chunk = urls[i:i + chunk_size]
+                    if self._send(ban_expression(chunk, host)):
+                        n_issued += 1
+                    else:
+                        n_dropped += len(chunk)
+
+            self.stats['issued'] += n_issued
+            self.stats['dropped'] += n_dropped
+            self.stats['coalesced'] += n_added - n_issued - n_dropped
+            if n_added:
+                logger.info('Varnish bans: %d queued, %d issued, %d dropped',
+                            n_added, n_issued, n_dropped)
+
+    def _connect(self, server):
+        handler = self._connections.get(server)
+        if handler is None:
+            handler = VarnishHandler(server, secret=self.get_secret())
+            self._connections[server] = handler
+        return handler
+
+    def _disconnect(self, server):
+        handler = self._connections.pop(server, None)
+        if handler is not None:
+            try:
+                handler.close()
+            except Exception:
+                pass
+
+    def _send(self, expression):
+        sent = True
+        for server in self.get_servers():
+            # Retry once on a fresh connection, in case the old one went
+            # away while idle.
+            for attempt in range(2):
+                try:
+                    self._connect(server).ban(expression)
+                    break
+                except (socket.error, EOFError, AssertionError, ValueError):
+                    self._disconnect(server)
+            else:
+                logger.error('Unable to send ban to Varnish at %s', server)
+                sent = False
+        return sent
+
+    def close(self):
+        with self._lock:
+            for server in self._connections.keys():
+                self._disconnect(server)
+
+
+_queue = BanQueue()
+
+
+def get_ban_queue():
+    return _queue
+
+
+def ban_batch():
+    """
+    Context manager that coalesces all Varnish bans issued inside of it.
+    """
+    return _queue.batch()
+
+
+def ban_stats():
+    return dict(_queue.stats)
@@ -0,0 +1,135 @@
+"""
+Saving many pages at once.
+
+Each page save sets off a good deal of derived work: the page's links are
+re-parsed, its score is recomputed, caches are cleared and the search
+index is updated.  When we save many pages together we mark each of them
+with `_in_bulk`, which the signal handlers doing this work skip, and then
+do the work for all of the pages in one pass once they're committed.
+"""
+from collections import defaultdict
+
+from celery import shared_task
+
+from tags.models import Tag, PageTagSet, slugify as tag_slugify
+
+from .models import Page
+from .cache import (django_invalidate_page, varnish_invalidate_page,
+    _cache_post_edit, invalidate_region_tag_views, invalidate_global_tag_view)
+from .ban_queue import ban_batch
+
+
+def get_or_create_tags(words, region):
+    """
+    Returns:
+        A dictionary mapping the slug of each of `words` to its Tag in
+        `region`, creating the tags that don't exist yet.
+    """
+    names = {}
+    for word in words:
+        names.setdefault(tag_slugify(word), word)
+    tags = dict((t.slug, t) for t in
+        Tag.objects.filter(region=region, slug__in=names.keys()))
+    for slug, name in names.iteritems():
+        if slug not in tags:
+            # Saved one at a time so that they get their history.  New tags
+            # are rare once a region has been tagged for a while.
+            tag = Tag(name=name, region=region)
+            tag.save()
+            tags[slug] = tag
+    return tags
+
+
+def set_page_tags(page, tags):
+    """
+    Sets the tags of `page` to `tags`, saving a new version of its tag
+    set only if they've changed.
+
+    Returns:
+        The set of tag slugs added or removed.
+    """
+    try:
+        pts = page.pagetagset
+        current = set(t.slug for t in pts.tags.all())
+    except PageTagSet.DoesNotExist:
+        pts = PageTagSet(page=page, region=page.region)
+        current = set()
+    wanted = set(t.slug for t in tags)
+    if pts.id and wanted == current:
+        return set()
+
+    pts._in_bulk = True
+    pts.save()
+    pts.tags = tags
+    return current.symmetric_difference(wanted)
+
+
+def pages_saved_in_bulk(page_ids, created_ids=(), changed_tags=()):
+    """
+    Does the work we skipped while saving pages in bulk: records their
+    links and the links waiting on the new pages, scores them, clears the
+    caches that show them and updates their search index entries.
+
+    Args:
+        page_ids: The ids of the pages saved.
+        created_ids: Which of `page_ids` were created.
+        changed_tags: (region id, tag slug) pairs of the tags added to or
+            removed from the pages.
+    """
+    from links.models import IncludedTagList
+    from links.signals import update_page_references, record_pages_created
+    from page_scores.models import RegionScoreStats, _score_pages
+
+    pages = list(Page.objects.filter(id__in=page_ids).select_related('region'))
+    created_ids = set(created_ids)
+    by_region = defaultdict(list)
+    for page in pages:
+        by_region[page.region].append(page)
+
+    # The link graph.  Pages that have just been created may be the
+    # destination of existing links, including ones from this batch.
+    record_pages_created([p for p in pages if p.id in created_ids])
+    for page in pages:
+        update_page_references(page)
+
+    for region, region_pages in by_region.iteritems():
+        _score_pages(region_pages, RegionScoreStats(region))
+
+    with ban_batch():
+        for page in pages:
+            _cache_post_edit(page, created=(page.id in created_ids))
+
+        if changed_tags:
+            regions = dict((r.id, r) for r in by_region)
+            tag_slugs = set()
+            for region_id, slug in set(map(tuple, changed_tags)):
+                invalidate_region_tag_views(slug, regions[region_id])
+                tag_slugs.add(slug)
+            for slug in tag_slugs:
+                invalidate_global_tag_view(slug)
+            # Pages that include a list of the tagged pages.
+            including = Page.objects.filter(
+                id__in=IncludedTagList.objects.filter(
+                    included_tag__slug__in=tag_slugs).values('source')
+            ).select_related('region')
+            for page in including:
+                varnish_invalidate_page(page)
+                django_invalidate_page(page)
+
+    index_pages(pages)
+
+
+def index_pages(pages):
+    """
+    Updates the search index entries of `pages` in one go.
+    """
+    from haystack import connections
+
+    connection = connections['default']
+    index = connection.get_unified_index().get_index(Page)
+    connection.get_backend().update(index, pages)
+
+
+@shared_task(ignore_result=True)
+def _async_pages_saved_in_bulk(page_ids, created_ids=(), changed_tags=()):
+    pages_saved_in_bulk(page_ids, created_ids=created_ids, changed_tags=changed_tags)
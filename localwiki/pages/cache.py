@@ -1,33 +1,22 @@
-import urllib
-
 from django.conf import settings
 from django.core.urlresolvers import set_urlconf, get_urlconf
 from django.core.cache import cache
 
 from celery import shared_task
-from varnish import VarnishManager
 
-from regions.models import Region
+from regions.nearby import region_centers_within
 
-rfc_3986_reserved = """!*'();:@&=+$,/?#[]"""
-rfc_3986_unreserved = """ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~"""
-VARNISH_SAFE = rfc_3986_reserved + rfc_3986_unreserved
+from .ban_queue import get_ban_queue, ban_batch
 
 
 def varnish_invalidate_url(url, hostname=None):
+    """
+    Queues a Varnish ban for `url` on `hostname`.  Bans are coalesced if
+    this is called inside of a ban_batch() block.
+    """
     if not hostname:
         hostname = settings.MAIN_HOSTNAME
-
-    ban_path = r'obj.http.x-url ~ ^(?i)(%(url)s(/*)(\\?.*)?)$ && obj.http.x-host ~ ^((?i)(.*\\.)?%(host)s(:[0-9]*)?)$'
-
-    # Varnish needs it quoted, but has a wonky way of encoding URLs :/
-    url = urllib.unquote(url)
-    url = urllib.quote(url, safe=VARNISH_SAFE)
-    if type(url) != unicode:
-        url = url.decode('utf-8')
-    ban_cmd = (ban_path % {'url': url, 'host': hostname}).encode('utf-8')
-    manager = VarnishManager(settings.VARNISH_MANAGEMENT_SERVERS)
-    manager.run('ban', ban_cmd, secret=settings.VARNISH_SECRET)
+    get_ban_queue().add(url, hostname)
 
 def varnish_invalidate_page(p):
     current_urlconf = get_urlconf() or settings.ROOT_URLCONF
@@ -74,13 +63,10 @@ def invalidate_region_tag_views(slug, region):
     django_invalidate_tag_view(slug, region)
 
     # Clear on nearby regions
-    center = region.regionsettings.region_center
-    if not center:
-        return
-    nearby_regions = Region.objects.filter(regionsettings__region_center__dwithin=(center, 0.5))
-    for region in nearby_regions:
-        varnish_invalidate_tag_view(slug, region)
-        django_invalidate_tag_view(slug, region)
+    nearby = region_centers_within(region, 0.5).select_related('nearby')
+    for n in nearby:
+        varnish_invalidate_tag_view(slug, n.nearby)
+        django_invalidate_tag_view(slug, n.nearby)
 
 def invalidate_global_tag_view(slug):
     from tags.cache import django_invalidate_global_tag_view, varnish_invalidate_global_tag_view
@@ -90,6 +76,11 @@ def invalidate_global_tag_view(slug):
 
 @shared_task(ignore_result=True)
 def _async_cache_post_edit(instance, created=False, deleted=False, raw=False):
+    # An edit can fan out to a great many URLs, so send the bans together.
+    with ban_batch():
+        _cache_post_edit(instance, created=created, deleted=deleted, raw=raw)
+
+def _cache_post_edit(instance, created=False, deleted=False, raw=False):
     from pages.models import Page
     from maps.models import MapData
     from tags.models import PageTagSet
@@ -161,6 +152,10 @@ def _page_cache_post_edit(sender, instance, created=False, deleted=False, raw=Fa
     from maps.models import MapData
     from tags.models import PageTagSet
 
+    if getattr(instance, '_in_bulk', False):
+        # Pages saved in bulk are cleared together once they're committed.
+        return
+
     if isinstance(instance, Page):
         django_invalidate_page(instance)
     elif isinstance(instance, MapData):
@@ -172,6 +167,10 @@ def _page_cache_post_edit(sender, instance, created=False, deleted=False, raw=Fa
 
 @shared_task(ignore_result=True)
 def _async_pagetagset_m2m_changed(instance):
+    with ban_batch():
+        _pagetagset_changed(instance)
+
+def _pagetagset_changed(instance):
     from links.models import IncludedTagList
     from versionutils.diff import diff
 
@@ -212,6 +211,8 @@ def _pagetagset_m2m_changed(sender, instance, action, reverse, model, pk_set, *a
     if action == 'post_clear' and not pk_set:
         # No information, so skip this.
         return
+    if getattr(instance, '_in_bulk', False):
+        return
 
     if action == 'post_add' or action == 'post_remove' or action == 'post_clear':
         # Get the tags in this transaction before handing off to celery
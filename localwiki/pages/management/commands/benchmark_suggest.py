@@ -0,0 +1,77 @@
+import random
+import time
+from optparse import make_option
+
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.test.client import RequestFactory
+
+from localwiki.utils.queries import count_queries
+from regions.models import Region
+
+from pages.models import Page
+from pages.views import suggest, suggest_cache_key
+
+
+class Command(BaseCommand):
+    args = '<region_slug>'
+    help = ("Times page suggest as someone types the names of random pages "
+            "in a region, with the cache cold and then warm.")
+    option_list = BaseCommand.option_list + (
+        make_option('--pages',
+            type='int',
+            dest='pages',
+            default=50,
+            help='Number of page names to type'),
+        make_option('--max-length',
+            type='int',
+            dest='max_length',
+            default=8,
+            help='Type at most this many characters of each name'),
+    )
+
+    def handle(self, *slugs, **options):
+        if len(slugs) != 1:
+            raise CommandError("You must provide a region slug.")
+        try:
+            region = Region.objects.get(slug=slugs[0])
+        except Region.DoesNotExist:
+            raise CommandError('Region "%s" does not exist.' % slugs[0])
+        if isinstance(cache, DummyCache):
+            self.stdout.write("Warning: with the dummy cache backend, the "
+                              "warm run isn't cached either.\n")
+
+        names = list(Page.objects.filter(region=region).values_list('name', flat=True))
+        if not names:
+            raise CommandError('Region "%s" has no pages.' % region.slug)
+        names = random.sample(names, min(options['pages'], len(names)))
+        # Every keystroke sends a request.
+        terms = []
+        for name in names:
+            for i in range(1, min(len(name), options['max_length']) + 1):
+                terms.append(name[:i])
+
+        for term in terms:
+            cache.delete(suggest_cache_key(term, region.id))
+        self.time('cold', terms, region)
+        self.time('warm', terms, region)
+
+    def time(self, name, terms, region):
+        factory = RequestFactory()
+        queries = 0
+        latencies = []
+        for term in terms:
+            request = factory.get('/', {'term': term, 'region_id': region.id})
+            start = time.time()
+            with count_queries() as counter:
+                suggest(request)
+            latencies.append(time.time() - start)
+            queries += counter.count
+        latencies.sort()
+        n = len(latencies)
+        self.stdout.write('%s: %.1fms mean, %.1fms median, %.1fms 95th percentile, '
+                          '%.1f queries per request\n' % (
+            name, sum(latencies) * 1000 / n, latencies[n / 2] * 1000,
+            latencies[int(n * 0.95)] * 1000, float(queries) / n))
@@ -273,7 +273,7 @@ class PageDiff(diff.BaseModelDiff):
 
 
 diff.register(Page, PageDiff)
-versioning.register(Page)
+versioning.register(Page, delta_fields=['content'])
 
 
 class PageFile(models.Model):
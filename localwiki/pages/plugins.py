@@ -332,11 +332,123 @@ def html_to_template_text(unsafe_html, context=None, render_plugins=True):
     return template_text.decode('utf-8')
 
 
+def is_relative_link(url):
+    url_parts = urlparse(url)
+    return (not url_parts.scheme and not url_parts.netloc)
+
+
+class LinkTargets(object):
+    """
+    Resolves the pages, redirects and files that links in rendered content
+    point at.
+
+    Call prefetch() with a template's nodelist before rendering it to look
+    up every link target with a handful of queries, rather than a few
+    queries per LinkNode.  Anything that wasn't prefetched is looked up
+    (and remembered) one at a time.
+    """
+    def __init__(self, region):
+        self.region = region
+        # slug -> page name, or None if there's no such page.
+        self.pages = {}
+        # slug -> True if there's a redirect from slug.
+        self.redirects = {}
+        # (page slug, file name) -> rough file type, or None if missing.
+        self.files = {}
+
+    def prefetch(self, nodelist, page=None):
+        slugs = set()
+        filenames = set()
+        for node in nodelist.get_nodes_by_type(LinkNode):
+            url = node.href
+            if isinstance(url, Variable) or not is_relative_link(url):
+                continue
+            if url.startswith(_files_url):
+                filenames.add(file_url_to_name(url))
+            elif unquote_plus(url).startswith('tags/'):
+                continue
+            else:
+                path = urlparse(name_to_url(url_to_name(url))).path
+                if path.strip():
+                    slugs.add(slugify(path))
+
+        slugs = slugs.difference(self.pages)
+        if slugs:
+            for slug, name in Page.objects.filter(region=self.region,
+                    slug__in=slugs).values_list('slug', 'name'):
+                self.pages[slug] = name
+            missing = [slug for slug in slugs if slug not in self.pages]
+            for slug in missing:
+                self.pages[slug] = None
+                self.redirects[slug] = False
+            if missing:
+                for source in Redirect.objects.filter(region=self.region,
+                        source__in=missing).values_list('source', flat=True):
+                    self.redirects[source] = True
+
+        if page is not None:
+            filenames = [f for f in filenames
+                         if (page.slug, f) not in self.files]
+        if page is not None and filenames:
+            for name in filenames:
+                self.files[(page.slug, name)] = None
+            for name in PageFile.objects.filter(region=self.region,
+                    slug__exact=page.slug, name__in=filenames).values_list(
+                    'name', flat=True):
+                self.files[(page.slug, name)] = PageFile(name=name).rough_type
+
+    def page_name(self, slug):
+        if slug not in self.pages:
+            try:
+                self.pages[slug] = Page.objects.get(
+                    slug__exact=slug, region=self.region).name
+            except Page.DoesNotExist:
+                self.pages[slug] = None
+        return self.pages[slug]
+
+    def has_redirect(self, slug):
+        if slug not in self.redirects:
+            self.redirects[slug] = Redirect.objects.filter(
+                source=slug, region=self.region).exists()
+        return self.redirects[slug]
+
+    def file_type(self, page_slug, filename):
+        key = (page_slug, filename)
+        if key not in self.files:
+            try:
+                self.files[key] = PageFile.objects.get(slug__exact=page_slug,
+                    region=self.region, name__exact=filename).rough_type
+            except PageFile.DoesNotExist:
+                self.files[key] = None
+        return self.files[key]
+
+
+def prefetch_link_targets(nodelist, context):
+    """
+    Resolves the targets of all links in `nodelist` and stores them in
+    `context` for LinkNode to use.
+    """
+    region = context.get('region')
+    if region is None:
+        return
+    targets = context.get('_link_targets')
+    if targets is None or targets.region != region:
+        targets = LinkTargets(region)
+        context['_link_targets'] = targets
+    targets.prefetch(nodelist, context.get('page'))
+
+
 class LinkNode(Node):
     def __init__(self, href, nodelist):
         self.href = href
         self.nodelist = nodelist
 
+    def get_link_targets(self, context):
+        targets = context.get('_link_targets')
+        if targets is None or targets.region != context['region']:
+            targets = LinkTargets(context['region'])
+        return targets
+
     def render(self, context):
         region = context['region']
         nofollow = context.get('_render_nofollow', False)
@@ -347,6 +459,7 @@ class LinkNode(Node):
                 url = url.resolve(context)
             page = context['page']
             if self.is_relative_link(url):
+                targets = self.get_link_targets(context)
                 if url.startswith('_files/'):
                     filename = file_url_to_name(url)
                     url = reverse('pages:file-info',
@@ -355,11 +468,10 @@ class LinkNode(Node):
                                 'slug': page.pretty_slug,
                                 'file': filename}
                     )
-                    try:
-                        file = PageFile.objects.get(
-                            slug__exact=page.slug, region=region, name__exact=filename)
-                        cls = ' class="file_%s"' % file.rough_type
-                    except PageFile.DoesNotExist:
+                    rough_type = targets.file_type(page.slug, filename)
+                    if rough_type:
+                        cls = ' class="file_%s"' % rough_type
+                    else:
                         cls = ' class="missing_link"'
                 elif unquote_plus(url).startswith('tags/'):
                     cls = ' class="tag_link"'
@@ -376,12 +488,13 @@ class LinkNode(Node):
                     if fragment and not path.strip():
                         url = fragment
                     else:
-                        try:
-                            page = Page.objects.get(slug__exact=slugify(path), region=region)
-                            url = reverse('pages:show', kwargs={'region': region.slug, 'slug': page.pretty_slug}) + fragment
-                        except Page.DoesNotExist:
+                        slug = slugify(path)
+                        name = targets.page_name(slug)
+                        if name is not None:
+                            url = reverse('pages:show', kwargs={'region': region.slug, 'slug': name_to_url(name)}) + fragment
+                        else:
                             # Check if Redirect exists.
-                            if not Redirect.objects.filter(source=slugify(path), region=region):
+                            if not targets.has_redirect(slug):
                                 cls = ' class="missing_link"'
                             url = reverse('pages:show', kwargs={'region': region.slug, 'slug': path}) + fragment
             # External links + nofollow flag (e.g. on User pages) => render as nofollow:
@@ -394,8 +507,7 @@ class LinkNode(Node):
             return ''
 
     def is_relative_link(self, url):
-        url_parts = urlparse(url)
-        return (not url_parts.scheme and not url_parts.netloc)
+        return is_relative_link(url)
 
 
 class EmbedCodeNode(Node):
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.core.urlresolvers import set_urlconf, get_urlconf
+
 from haystack import indexes
 from celery_haystack.indexes import CelerySearchIndex
 
@@ -12,10 +15,25 @@ class PageIndex(CelerySearchIndex, indexes.Indexable):
     # We add this for autocomplete.
     name_auto = indexes.EdgeNgramField(model_attr='name')
     tags = indexes.MultiValueField(boost=1.25)
+    # Stored so that page suggest needn't load the pages.
+    region_slug = indexes.CharField(model_attr='region__slug', indexed=False, null=True)
+    url = indexes.CharField(indexed=False, null=True)
 
     def get_model(self):
         return Page
 
+    def should_update(self, instance, **kwargs):
+        # Pages saved in bulk are indexed together once they're committed.
+        return not getattr(instance, '_in_bulk', False)
+
+    def prepare_url(self, obj):
+        # Always the URL on the main site.
+        current_urlconf = get_urlconf() or settings.ROOT_URLCONF
+        set_urlconf(settings.ROOT_URLCONF)
+        url = obj.get_absolute_url()
+        set_urlconf(current_urlconf)
+        return url
+
     def prepare_tags(self, obj):
         from tags.models import PageTagSet
         try:
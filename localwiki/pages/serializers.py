@@ -25,6 +25,7 @@ class TagSetSerializer(serializers.WritableField):
     def to_native(self, obj):
         if type(obj) is list:
             return obj
+        # List views prefetch pagetagset__tags, so these don't query.
         if not hasattr(obj, 'pagetagset'):
             return []
         return [tag.slug for tag in obj.pagetagset.tags.all()]
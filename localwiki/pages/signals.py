@@ -1,4 +1,4 @@
-from django.db.models.signals import pre_save, post_save, pre_delete, m2m_changed
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.utils.translation import ugettext as _
 from django.conf import settings
 
@@ -6,11 +6,13 @@ from celery import shared_task
 from actstream import action
 
 from redirects.models import Redirect
+from regions.nearby import page_count_changed
 from tags.models import PageTagSet
 from maps.models import MapData
 
-from .models import Page
+from .models import Page, PageFile
 from .cache import _page_cache_post_save, _page_cache_pre_delete, _pagetagset_m2m_changed
+from .template_cache import invalidate_page_templates
 
 
 def _delete_page(sender, instance, raw, **kws):
@@ -76,9 +78,31 @@ def _post_save_maybe_follow(sender, instance, created, raw, **kws):
         # we have to skip signals here :/
         return
 
+    if getattr(instance, '_in_bulk', False):
+        # Done once for the whole batch.
+        return
+
     _maybe_follow_region.delay(instance)
 
 
+def _page_created_count(sender, instance, created, raw, **kws):
+    if raw or not created:
+        return
+    page_count_changed(instance.region_id, 1)
+
+
+def _page_deleted_count(sender, instance, **kws):
+    page_count_changed(instance.region_id, -1)
+
+
+def _pagefile_invalidate_templates(sender, instance, **kws):
+    """
+    Cached page templates embed attached file URLs, so drop them when a
+    file changes.
+    """
+    invalidate_page_templates(instance.region_id, instance.slug)
+
+
 # When a Redirect is created we want to delete the source Page if it
 # exists.  This is so the redirect (which works via 404 fall-through)
 # will be immediately functional.
@@ -110,3 +134,11 @@ m2m_changed.connect(_pagetagset_m2m_changed, sender=PageTagSet.tags.through)
 
 post_save.connect(_page_cache_post_save, sender=MapData)
 pre_delete.connect(_page_cache_pre_delete, sender=MapData)
+
+# Nearby regions are shown with their page counts.
+post_save.connect(_page_created_count, sender=Page)
+post_delete.connect(_page_deleted_count, sender=Page)
+
+# Cached page templates refer to the page's files.
+post_save.connect(_pagefile_invalidate_templates, sender=PageFile)
+pre_delete.connect(_pagefile_invalidate_templates, sender=PageFile)
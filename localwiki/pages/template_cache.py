@@ -0,0 +1,133 @@
+"""
+Caching of the template text and compiled templates made from page content.
+
+Turning page HTML into a template (see html_to_template_text() in
+pages/plugins.py) means parsing, walking and re-serializing the HTML, and
+then compiling the result.  That only needs to happen when the content
+itself changes, so we keep the compiled Template in an in-process LRU
+cache and, optionally, the intermediate template text in a shared cache
+backend (set PAGE_TEMPLATE_CACHE_BACKEND to a CACHES alias).
+
+Template text can also depend on the files attached to a page (resized
+images are turned into thumbnail tags), so entries are additionally keyed
+on a per-page generation that's bumped whenever a PageFile changes.  The
+generation lives in the shared backend, so every process sees the bump.
+Without a shared backend a process can only clear its own templates, so
+the others' are kept for at most PAGE_TEMPLATE_LOCAL_CACHE_TIMEOUT
+seconds instead.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.template import Template
+from django.utils.encoding import force_bytes
+
+from localwiki.utils.lru import LRUCache
+
+from .plugins import html_to_template_text
+
+_compiled_templates = LRUCache(
+    max_size=getattr(settings, 'PAGE_TEMPLATE_CACHE_SIZE', 500))
+
+
+def _get_shared_cache():
+    alias = getattr(settings, 'PAGE_TEMPLATE_CACHE_BACKEND', None)
+    if not alias:
+        return None
+    return get_cache(alias)
+
+
+def _page_ident(context):
+    page = context.get('page') if context else None
+    if page is None:
+        return ('', '')
+    return (getattr(page, 'region_id', '') or '', page.slug or '')
+
+
+def _generation_key(region_id, slug):
+    ident = force_bytes(u'%s:%s' % (region_id, slug))
+    return 'pages:tmplgen:%s' % hashlib.md5(ident).hexdigest()
+
+
+def _generation(shared, region_id, slug):
+    if shared is None:
+        return 0
+    return shared.get(_generation_key(region_id, slug), 0)
+
+
+def template_cache_key(html, context=None, render_plugins=True, shared=None):
+    region_id, slug = _page_ident(context)
+    generation = _generation(shared, region_id, slug)
+    h = hashlib.md5()
+    h.update(force_bytes(u'%s:%s:%s:%s:' % (region_id, slug, generation,
+        int(bool(render_plugins)))))
+    h.update(force_bytes(html))
+    return 'pages:tmpl:%s' % h.hexdigest()
+
+
+def _cache_timeout():
+    return getattr(settings, 'PAGE_TEMPLATE_CACHE_TIMEOUT', 60 * 60 * 24 * 29)
+
+
+def _local_cache_timeout(shared):
+    if shared is not None:
+        # Invalidated everywhere through the generation.
+        return None
+    return getattr(settings, 'PAGE_TEMPLATE_LOCAL_CACHE_TIMEOUT', 60)
+
+
+def _cached_template_text(shared, key, html, context, render_plugins):
+    if shared is None:
+        return html_to_template_text(html, context, render_plugins)
+
+    template_text = shared.get(key)
+    if template_text is None:
+        template_text = html_to_template_text(html, context, render_plugins)
+        shared.set(key, template_text, _cache_timeout())
+    return template_text
+
+
+def get_template_text(html, context=None, render_plugins=True):
+    """
+    Like html_to_template_text(), but only converts `html` if we haven't
+    already done so.
+    """
+    shared = _get_shared_cache()
+    key = template_cache_key(html, context, render_plugins, shared=shared)
+    return _cached_template_text(shared, key, html, context, render_plugins)
+
+
+def get_template(html, context=None, render_plugins=True):
+    """
+    Returns:
+        A compiled Template for the page content `html`, parsing and
+        compiling only if it's not already cached.
+    """
+    shared = _get_shared_cache()
+    key = template_cache_key(html, context, render_plugins, shared=shared)
+    t = _compiled_templates.get(key)
+    if t is None:
+        t = Template(_cached_template_text(
+            shared, key, html, context, render_plugins))
+        _compiled_templates.set(key, t, _local_cache_timeout(shared))
+    return t
+
+
+def invalidate_page_templates(region_id, slug):
+    """
+    Drops the cached templates for the page with `slug` in the region with
+    id `region_id`.
+    """
+    shared = _get_shared_cache()
+    if shared is not None:
+        key = _generation_key(region_id, slug)
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, 1, _cache_timeout())
+    else:
+        # No per-page generation without a shared backend, so start over.
+        # Other processes' templates expire on their own, see
+        # _local_cache_timeout().
+        _compiled_templates.clear()
@@ -8,9 +8,10 @@ from django.utils.text import unescape_string_literal
 
 from localwiki.utils.urlresolvers import reverse
 
-from pages.plugins import html_to_template_text, SearchBoxNode
-from pages.plugins import LinkNode, EmbedCodeNode
+from pages.plugins import SearchBoxNode
+from pages.plugins import LinkNode, EmbedCodeNode, prefetch_link_targets
 from pages import models
+from pages.template_cache import get_template, get_template_text
 from pages.models import Page, slugify
 
 import mwparserfromhell
@@ -37,7 +38,8 @@ class PageContentNode(BaseIncludeNode):
             render_context = context
             if self.nofollow:
                 context['_render_nofollow'] = True
-            t = Template(html_to_template_text(html, context, self.render_plugins))
+            t = get_template(html, context, self.render_plugins)
+            prefetch_link_targets(t.nodelist, context)
             html = self.render_template(t, context)
             if self.nofollow:
                 del context['_render_nofollow']
@@ -56,12 +58,9 @@ class PageWikicodeNode(BaseIncludeNode):
         self.html_var = template.Variable(html_var)
         self.render_plugins = render_plugins
 
-    def process_context(self, context):
-        self.region = context.get('region', None)
-
-    def render_wiki_template(self, name, params):
+    def render_wiki_template(self, name, params, region):
         try:
-            template = Page.objects.get(slug__exact=slugify(u"templates/%s" % name), region=self.region)
+            template = Page.objects.get(slug__exact=slugify(u"templates/%s" % name), region=region)
         except Page.DoesNotExist:
             return ""
         text = unicode(template.content)
@@ -71,16 +70,19 @@ class PageWikicodeNode(BaseIncludeNode):
         return text
 
     def render(self, context):
-        self.process_context(context)
+        # Nodes are shared by every render of a cached template, so
+        # nothing about this render is kept on self.
+        region = context.get('region', None)
         try:
             html = unicode(self.html_var.resolve(context))
             wiki = mwparserfromhell.parse(html)
             for ft in wiki.filter_templates():
-                wiki.replace(ft, self.render_wiki_template(ft.name, ft.params))
+                wiki.replace(ft, self.render_wiki_template(ft.name, ft.params, region))
             html = unicode(wiki)
             if self.nofollow:
                 context['_render_nofollow'] = True
-            t = Template(html_to_template_text(html, context, self.render_plugins))
+            t = get_template(html, context, self.render_plugins)
+            prefetch_link_targets(t.nodelist, context)
             html = self.render_template(t, context)
             if self.nofollow:
                 del context['_render_nofollow']
@@ -102,6 +104,10 @@ class IncludeContentNode(BaseIncludeNode):
     Subclass and override get_content() and get_title() to return HTML or None.
     The name of the content to include is stored in self.name
     All other parameters are stored in self.args, without quotes (if any).
+
+    The node may be shared by concurrent renders of a cached template, so
+    anything looked up for one render goes in context.render_context[self],
+    never on the node itself.
     """
     def __init__(self, parser, token, *args, **kwargs):
         super(IncludeContentNode, self).__init__(*args, **kwargs)
@@ -125,7 +131,7 @@ class IncludeContentNode(BaseIncludeNode):
         return self.name
 
     def process_context(self, context):
-        self.region = context.get('region', None)
+        context.render_context[self] = {'region': context.get('region', None)}
 
     def render(self, context):
         self.process_context(context)
@@ -137,6 +143,7 @@ class IncludeContentNode(BaseIncludeNode):
                     template_text += '<h2>%s</h2>' % title
             template_text += self.get_content(context)
             template = Template(template_text)
+            prefetch_link_targets(template.nodelist, context)
             return self.render_template(template, context)
         except:
             if settings.TEMPLATE_DEBUG:
@@ -147,46 +154,51 @@ class IncludeContentNode(BaseIncludeNode):
 class IncludePageNode(IncludeContentNode):
     def process_context(self, context):
         super(IncludePageNode, self).process_context(context)
+        state = context.render_context[self]
         try:
-            self.page = Page.objects.get(
-                slug__exact=slugify(self.name), region=self.region)
+            page = Page.objects.get(
+                slug__exact=slugify(self.name), region=state['region'])
             # Keep track of the fact this page was included (for caching purposes)
             if 'request' in context:
                 _depends_on = getattr(context['request'], '_depends_on_header', [])
-                _depends_on.append(self.page.id)
+                _depends_on.append(page.id)
                 context['request']._depends_on = _depends_on
         except Page.DoesNotExist:
-            self.page = None
+            page = None
+        state['page'] = page
 
     def get_title(self, context):
-        if not self.page:
+        page = context.render_context[self]['page']
+        if not page:
             return None
         return ('<a href="%s">%s</a>'
-                % (self.get_page_url(), self.page.name))
+                % (self.get_page_url(context), page.name))
 
-    def get_page_url(self):
-        if self.page:
-            slug = self.page.pretty_slug
+    def get_page_url(self, context):
+        state = context.render_context[self]
+        if state['page']:
+            slug = state['page'].pretty_slug
         else:
             slug = name_to_url(self.name)
-        return reverse('pages:show', kwargs={'region': self.region.slug, 'slug': slug})
+        return reverse('pages:show', kwargs={'region': state['region'].slug, 'slug': slug})
 
     def get_content(self, context):
-        if not self.page:
+        page = context.render_context[self]['page']
+        if not page:
             return (('<p class="plugin includepage">' + _('Unable to include '
                     '<a href="%(page_url)s" class="missing_link">%(page_name)s</a>') + '</p>')
-                    % {'page_url': self.get_page_url(), 'page_name': self.name})
+                    % {'page_url': self.get_page_url(context), 'page_name': self.name})
         # prevent endless loops
         context_page = context['page']
         include_stack = context.get('_include_stack', [])
         include_stack.append(context_page.name)
-        if self.page.name in include_stack:
+        if page.name in include_stack:
             return (('<p class="plugin includepage">' + _('Unable to'
                     ' include <a href="%(page_url)s">%(page_name)s</a>: endless include'
-                    ' loop.') + '</p>') % {'page_url': self.get_page_url(), 'page_name': self.page.name})
+                    ' loop.') + '</p>') % {'page_url': self.get_page_url(context), 'page_name': page.name})
         context['_include_stack'] = include_stack
-        context['page'] = self.page
-        template_text = html_to_template_text(self.page.content, context)
+        context['page'] = page
+        template_text = get_template_text(page.content, context)
         # restore context
         context['_include_stack'].pop()
         context['page'] = context_page
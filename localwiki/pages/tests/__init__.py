@@ -1,2 +1,3 @@
 from .test_main import *
 from .test_api import *
+from .test_cache import *
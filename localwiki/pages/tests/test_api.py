@@ -5,6 +5,7 @@ from django.contrib.auth.models import User, Group
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.db import IntegrityError, DatabaseError
+from django.test.utils import override_settings
 
 from guardian.shortcuts import assign_perm, remove_perm
 
@@ -75,6 +76,73 @@ class PageAPITests(APITestCase):
         jresp = json.loads(response.content)
         self.assertEqual(len(jresp['results']), 3)
 
+    def test_limit_fields(self):
+        response = self.client.get('%s/pages/?fields=slug,name' % self.API_ROOT)
+        jresp = json.loads(response.content)
+        self.assertEqual(len(jresp['results']), 3)
+        for result in jresp['results']:
+            self.assertEqual(sorted(result.keys()), ['name', 'slug'])
+
+        # Unknown fields are ignored.
+        response = self.client.get('%s/pages/?fields=name,nope' % self.API_ROOT)
+        jresp = json.loads(response.content)
+        self.assertEqual(jresp['results'][0].keys(), ['name'])
+
+        response = self.client.get('%s/pages/?fields=name,region,tags&slug=duboce%%20park' % self.API_ROOT)
+        jresp = json.loads(response.content)
+        self.assertEqual(jresp['results'][0]['tags'], ['lake', 'water'])
+        self.assertTrue(jresp['results'][0]['region'])
+
+    def test_page_list_queries(self):
+        # Listing pages shouldn't cost queries per page or per tag.
+        from localwiki.utils.queries import count_queries
+
+        def num_queries(url):
+            with count_queries() as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return queries.count
+
+        url = '%s/pages/' % self.API_ROOT
+        num_queries(url)
+        before = num_queries(url)
+
+        t1 = Tag.objects.get(slug='lake')
+        for i in range(10):
+            p = Page(region=self.oak_region, name='Lake %d' % i, content='<p>Lake</p>')
+            p.save()
+            pts = PageTagSet(page=p, region=self.oak_region)
+            pts.save()
+            pts.tags = [t1, Tag.objects.create(name='pond %d' % i, region=self.oak_region)]
+        self.assertEqual(num_queries(url), before)
+
+    @override_settings(VERSIONUTILS_DELTA_STORAGE=True)
+    def test_limit_fields_history_deltas(self):
+        text = u'<p>A long enough paragraph to be worth storing as a delta.</p>' * 10
+        p = Page(region=self.sf_region, name='Mission Dolores', content=text)
+        p.save()
+        p.content = text + u'<p>Edited.</p>'
+        p.save()
+        stored = Page.versions.filter(slug='mission dolores').order_by('history_id')
+        self.assertFalse(stored.values('history_delta_base')[1]['history_delta_base'] is None)
+
+        response = self.client.get('%s/pages_history/?fields=content&slug=mission%%20dolores'
+                                   '&ordering=history_date' % self.API_ROOT)
+        jresp = json.loads(response.content)
+        self.assertEqual([r['content'] for r in jresp['results']],
+                         [text, text + u'<p>Edited.</p>'])
+
+    def test_limited_serializers_bounded(self):
+        from main.api import views
+        from ..api import PageViewSet
+        from ..serializers import PageSerializer
+
+        view = PageViewSet()
+        for i in range(views.MAX_LIMITED_SERIALIZERS + 10):
+            view.get_serializer_class_for_fields(PageSerializer, ('name', str(i)))
+        self.assertEqual(len(view._serializer_class_for_fields),
+                         views.MAX_LIMITED_SERIALIZERS)
+
     def test_basic_page_detail(self):
         response = self.client.get('%s/pages/?slug=dolores%%20park' % self.API_ROOT)
         jresp = json.loads(response.content)
@@ -119,6 +187,57 @@ class PageAPITests(APITestCase):
         jresp = json.loads(resp.content)
         self.assertEqual(set(jresp['tags']), set(['park', 'fun']))
 
+    def test_bulk_pages(self):
+        from links.models import Link
+
+        self.client.force_authenticate(user=self.edit_user)
+
+        region = 'http://testserver%s/regions/%s/' % (self.API_ROOT, self.sf_region.id)
+        data = [
+            {'name': 'Mission Dolores', 'content': '<p>Near <a href="Bulk%20Page">Bulk Page</a></p>',
+             'region': region, 'tags': ['church', 'mission']},
+            {'name': 'Bulk Page', 'content': '<p>hi</p>', 'region': region, 'tags': ['church']},
+            {'name': 'Duboce Park', 'content': '<p>Duboce Park updated</p>', 'region': region},
+            {'name': 'No region', 'content': '<p>hi</p>'},
+        ]
+        resp = self.client.post('%s/pages_bulk/' % self.API_ROOT, data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        jresp = json.loads(resp.content)
+        self.assertEqual([r['status'] for r in jresp], [201, 201, 200, 400])
+        self.assertIn('region', jresp[3]['errors'])
+
+        mission = Page.objects.get(slug='mission dolores', region=self.sf_region)
+        bulk_page = Page.objects.get(slug='bulk page', region=self.sf_region)
+        self.assertEqual(set(t.slug for t in mission.pagetagset.tags.all()), set(['church', 'mission']))
+        self.assertEqual(Tag.objects.filter(slug='church', region=self.sf_region).count(), 1)
+
+        # Tags left alone if not provided
+        duboce = Page.objects.get(id=self.duboce_park.id)
+        self.assertEqual(duboce.content, '<p>Duboce Park updated</p>')
+        self.assertEqual(set(t.slug for t in duboce.pagetagset.tags.all()), set(['lake', 'water']))
+
+        # The link graph is brought up to date after the batch is saved,
+        # including links to pages created in the same batch.
+        self.assertEqual(Link.objects.get(source=mission).destination, bulk_page)
+
+        # Unchanged pages aren't saved again.
+        resp = self.client.post('%s/pages_bulk/' % self.API_ROOT, data[:1], format='json')
+        self.assertEqual(json.loads(resp.content)[0]['status'], 200)
+        self.assertEqual(mission.versions.all().count(), 1)
+
+    def test_bulk_pages_permissions(self):
+        region = 'http://testserver%s/regions/%s/' % (self.API_ROOT, self.sf_region.id)
+        data = [{'name': 'Dolores Park', 'content': '<p>hi new content</p>', 'region': region}]
+
+        resp = self.client.post('%s/pages_bulk/' % self.API_ROOT, data, format='json')
+        self.assertIn(resp.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+        self.client.force_authenticate(user=self.edit_user)
+        assign_perm('change_page', self.edit_user_2, self.dolores_park)
+        resp = self.client.post('%s/pages_bulk/' % self.API_ROOT, data, format='json')
+        self.assertEqual(json.loads(resp.content)[0]['status'], 403)
+        self.assertEqual(Page.objects.get(id=self.dolores_park.id).content, '<p>Dolores Park here</p>')
+
     def test_post_no_region(self):
         self.client.force_authenticate(user=self.edit_user)
 
@@ -0,0 +1,100 @@
+import SocketServer
+import threading
+
+from django.test import TestCase
+
+from ..ban_queue import BanQueue, ban_expression, quote_url
+
+
+class FakeVarnishAdmin(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """
+    Just enough of the Varnish management protocol to accept bans.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        SocketServer.TCPServer.__init__(self, ('127.0.0.1', 0),
+                                        FakeVarnishAdminHandler)
+        self.commands = []
+        self.connections = 0
+
+    @property
+    def address(self):
+        return '%s:%s' % self.server_address
+
+
+class FakeVarnishAdminHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write('200 2\nhi\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            self.server.commands.append(line.strip())
+            self.wfile.write('200 0\n\n')
+
+
+class BanQueueTest(TestCase):
+    def setUp(self):
+        self.varnish = FakeVarnishAdmin()
+        self.thread = threading.Thread(target=self.varnish.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.queue = BanQueue(servers=[self.varnish.address], secret='s',
+                              window=0, max_urls=2)
+
+    def tearDown(self):
+        self.queue.close()
+        self.varnish.shutdown()
+        self.varnish.server_close()
+
+    def wait_for_commands(self, n):
+        for i in range(100):
+            if len(self.varnish.commands) >= n:
+                break
+            threading.Event().wait(0.01)
+
+    def test_unbatched_sends_right_away(self):
+        self.queue.add('/main/Front_Page', 'localwiki.org')
+        self.wait_for_commands(1)
+        self.assertEqual(self.varnish.commands,
+            ['ban ' + ban_expression([u'/main/Front_Page'], 'localwiki.org')])
+        self.assertEqual(self.queue.stats['issued'], 1)
+
+    def test_batch_coalesces(self):
+        with self.queue.batch():
+            self.queue.add('/main/Front_Page', 'localwiki.org')
+            self.queue.add('/main/Front_Page', 'localwiki.org')
+            self.queue.add('/main/front_page', 'localwiki.org')
+            self.queue.add('/main/Other', 'localwiki.org')
+            self.queue.add('/main/Third', 'localwiki.org')
+            self.queue.add('/Front_Page', 'example.org')
+            self.assertEqual(self.varnish.commands, [])
+        self.wait_for_commands(3)
+
+        # Two bans on localwiki.org (max two URLs each), one on example.org,
+        # all over a single connection.
+        self.assertEqual(len(self.varnish.commands), 3)
+        self.assertEqual(self.varnish.connections, 1)
+        self.assertEqual(self.queue.stats,
+            {'queued': 6, 'issued': 3, 'coalesced': 3, 'dropped': 0})
+
+    def test_connection_reused(self):
+        self.queue.add('/main/A', 'localwiki.org')
+        self.queue.add('/main/B', 'localwiki.org')
+        self.wait_for_commands(2)
+        self.assertEqual(self.varnish.connections, 1)
+
+    def test_dropped_when_unreachable(self):
+        closed = FakeVarnishAdmin()
+        address = closed.address
+        closed.server_close()
+        queue = BanQueue(servers=[address], window=0)
+        queue.add('/main/A', 'localwiki.org')
+        self.assertEqual(queue.stats['dropped'], 1)
+        self.assertEqual(queue.stats['issued'], 0)
+
+    def test_regex_escaped(self):
+        expr = ban_expression([quote_url('/main/Foo_(bar)')], 'localwiki.org')
+        self.assertTrue(r'/main/Foo_\\(bar\\)' in expr)
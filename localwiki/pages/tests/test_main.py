@@ -6,6 +6,7 @@ from lxml.html import fragments_fromstring
 from django.test import TestCase
 from django.db import models
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 from django import forms
 from django.template.base import Template
 from django.template.context import Context
@@ -24,6 +25,7 @@ from ..models import (Page, PageFile, slugify,
     url_to_name, clean_name, name_to_url)
 from ..plugins import html_to_template_text
 from ..plugins import tag_imports
+from ..template_cache import get_template, get_template_text
 from .. import exceptions
 
 from .xsstests import xss_exploits
@@ -365,6 +367,21 @@ class PageTest(TestCase):
         self.assertEqual(new_p.links.all()[0].destination, dogs_p)
 
 
+class PageIndexTest(TestCase):
+    def test_stored_suggest_fields(self):
+        from ..search_indexes import PageIndex
+
+        region = Region(full_name='Test region', slug='test-region')
+        region.save()
+        p = Page(name="Ben & Jerry's", content='<p>Ice cream</p>', region=region)
+        p.save()
+
+        # Page suggest answers from these rather than loading the page.
+        data = PageIndex().full_prepare(p)
+        self.assertEqual(data['region_slug'], 'test-region')
+        self.assertEqual(data['url'], p.get_absolute_url())
+
+
 class TestModel(models.Model):
     save_time = models.DateTimeField(auto_now=True)
     contents = models.TextField()
@@ -624,6 +641,32 @@ class PluginTest(TestCase):
         self.assertEqual(html,
                     '<div class="included_page_wrapper"><p>Some text</p></div>')
 
+    def test_include_plugin_shared_template(self):
+        other = Region(full_name='Other region', slug='other-region')
+        other.save()
+        pages = []
+        for region in (self.region, other):
+            a = Page(name='Front Page', region=region)
+            a.content = '<a class="plugin includepage" href="Explore">dummy</a>'
+            a.save()
+            pages.append(a)
+            b = Page(name='Explore', region=region)
+            b.content = '<p>In %s</p>' % region.slug
+            b.save()
+
+        # One compiled template, as when it's cached, rendered in both
+        # regions.
+        template = Template(html_to_template_text(pages[0].content,
+            Context({'page': pages[0], 'region': self.region})))
+        for page in pages:
+            html = template.render(Context({'page': page, 'region': page.region}))
+            self.assertEqual(html, '<div class="included_page_wrapper">'
+                             '<p>In %s</p></div>' % page.region.slug)
+        # Nothing from the renders is left on the nodes.
+        for node in template.nodelist:
+            self.assertFalse(hasattr(node, 'page'))
+            self.assertFalse(hasattr(node, 'region'))
+
     def test_include_plugin_utf8(self):
         a = Page(name='Front Page', region=self.region)
         a.content = (u'<a class="plugin includepage" '
@@ -799,6 +842,85 @@ class PluginTest(TestCase):
         self.assertTrue('nofollow' in rendered)
 
 
+class LinkTargetsTest(TestCase):
+    def setUp(self):
+        self.region = Region(full_name='Test region', slug='test-region')
+        self.region.save()
+
+    def test_links_resolved_in_bulk(self):
+        names = ['Page %d' % i for i in range(10)]
+        for name in names:
+            Page(name=name, content='<p>hi</p>', region=self.region).save()
+        Redirect(source='old page', destination=Page.objects.get(name='Page 0'),
+            region=self.region).save()
+
+        links = ''.join(['<a href="%s">%s</a>' % (n, n) for n in names])
+        links += '<a href="Old page">old</a><a href="Missing">missing</a>'
+        page = Page(name='Hub', content='<p>%s</p>' % links, region=self.region)
+        page.save()
+
+        template = Template("""{% load pages_tags %}{% render_plugins page.content %}""")
+        context = Context({'region': self.region, 'page': page})
+        # One query for the pages, one for redirects.
+        with self.assertNumQueries(2):
+            rendered = template.render(context)
+
+        self.assertTrue('<a href="/test-region/Page_3">Page 3</a>' in rendered)
+        self.assertTrue('<a href="/test-region/Old_page">old</a>' in rendered)
+        self.assertTrue('<a href="/test-region/Missing" class="missing_link">missing</a>' in rendered)
+
+
+class TemplateCacheTest(TestCase):
+    def setUp(self):
+        self.region = Region(full_name='Test region', slug='test-region')
+        self.region.save()
+        self.page = Page(name='Front Page', region=self.region)
+        self.page.content = '<p><a href="Explore">Explore</a></p>'
+        self.page.save()
+
+    def test_compiles_once(self):
+        context = Context({'page': self.page, 'region': self.region})
+        t1 = get_template(self.page.content, context)
+        t2 = get_template(self.page.content, context)
+        self.assertTrue(t1 is t2)
+        self.assertEqual(t1.render(context),
+            '<p><a href="/test-region/Explore" class="missing_link">Explore</a></p>')
+
+    def test_key_includes_content_and_flags(self):
+        context = Context({'page': self.page, 'region': self.region})
+        t1 = get_template(self.page.content, context)
+        self.assertFalse(t1 is get_template(self.page.content, context,
+                                            render_plugins=False))
+
+        self.page.content = '<p>Changed</p>'
+        self.page.save()
+        t2 = get_template(self.page.content, context)
+        self.assertFalse(t1 is t2)
+        self.assertEqual(t2.render(context), '<p>Changed</p>')
+
+    def test_template_text_matches(self):
+        context = Context({'page': self.page, 'region': self.region})
+        self.assertEqual(get_template_text(self.page.content, context),
+                         html_to_template_text(self.page.content, context))
+
+    def test_file_change_invalidates(self):
+        context = Context({'page': self.page, 'region': self.region})
+        t1 = get_template(self.page.content, context)
+
+        pf = PageFile(name='file.txt', slug=self.page.slug, region=self.region)
+        pf.file.save('file.txt', ContentFile('foo'))
+
+        self.assertFalse(t1 is get_template(self.page.content, context))
+
+    @override_settings(PAGE_TEMPLATE_LOCAL_CACHE_TIMEOUT=0)
+    def test_local_entries_expire(self):
+        # Without a shared backend, other processes can't tell us to drop
+        # our templates, so they expire.
+        context = Context({'page': self.page, 'region': self.region})
+        t1 = get_template(self.page.content, context)
+        self.assertFalse(t1 is get_template(self.page.content, context))
+
+
 class XSSTest(TestCase):
     """ Test for tricky attempts to inject scripts into a page
     Exploits adapted from http://ha.ckers.org/xss.html
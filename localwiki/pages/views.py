@@ -2,8 +2,11 @@ from dateutil.parser import parse as dateparser
 import time
 import urllib
 import copy
+import hashlib
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import get_urlconf
 from django.views.generic.base import RedirectView
 from django.contrib.auth.models import User
 from django.template import Template
@@ -36,7 +39,7 @@ from regions.views import RegionMixin, region_404_response
 from maps.widgets import InfoMap
 from users.views import SetPermissionsView, AddContributorsMixin
 
-from .models import slugify, clean_name, Page, PageFile, url_to_name
+from .models import slugify, clean_name, Page, PageFile, url_to_name, page_url
 from .forms import PageForm, PageFileForm, _has_blacklist_title
 from .utils import is_user_page
 from .exceptions import PageExistsError
@@ -715,12 +718,58 @@ class PageContentInUsersNamespaceView(PageDetailView):
         return PageDetailView.get_cache_key(*args, **kwargs)
 
 
+def normalize_suggest_term(term):
+    return ' '.join(term.lower().split())
+
+
+def suggest_cache_key(term, region_id=None):
+    urlconf = get_urlconf() or settings.ROOT_URLCONF
+    return 'pages:suggest:%s:%s:%s' % (urlconf, region_id,
+        hashlib.md5(normalize_suggest_term(term).encode('utf-8')).hexdigest())
+
+
+def suggest_pages(term, region_id=None):
+    """
+    Returns:
+        A list of up to 20 suggestions for pages whose names start with
+        `term`, answered from the fields stored in the search index and
+        cached for PAGES_SUGGEST_CACHE_TIMEOUT seconds.
+    """
+    from haystack.query import SearchQuerySet
+
+    key = suggest_cache_key(term, region_id)
+    results = cache.get(key)
+    if results is not None:
+        return results
+
+    urlconf = get_urlconf() or settings.ROOT_URLCONF
+    sqs = SearchQuerySet().models(Page).autocomplete(
+        name_auto=normalize_suggest_term(term))
+    if region_id is not None:
+        sqs = sqs.filter_and(region_id=region_id)
+
+    results = []
+    # Set a sane limit
+    for p in sqs[:20]:
+        region_slug, url = p.region_slug, p.url
+        if region_slug is None:
+            # Indexed before we stored these.
+            region_slug = p.object.region.slug
+            url = p.object.get_absolute_url()
+        elif urlconf != settings.ROOT_URLCONF:
+            # The stored URL is the main site's.
+            url = page_url(p.name, Region(slug=region_slug))
+        results.append({'value': p.name, 'region': region_slug, 'url': url})
+
+    cache.set(key, results, getattr(settings, 'PAGES_SUGGEST_CACHE_TIMEOUT', 60))
+    return results
+
+
 def suggest(request, *args, **kwargs):
     """
     Simple page suggest.
     """
     # XXX TODO: Break this out when doing the API work.
-    from haystack.query import SearchQuerySet
     import json
 
     term = request.GET.get('term', None)
@@ -728,16 +777,7 @@ def suggest(request, *args, **kwargs):
         region_id = int(request.GET.get('region_id'))
     else:
         region_id = None
-    if not term:
+    if not term or not term.strip():
         return HttpResponse('')
 
-    if region_id is not None:
-        results = SearchQuerySet().models(Page).autocomplete(name_auto=term).filter_and(region_id=region_id)
-    else:
-        results = SearchQuerySet().models(Page).autocomplete(name_auto=term)
-
-    # Set a sane limit
-    results = results[:20]
-
-    results = [{'value': p.name, 'region': p.object.region.slug, 'url': p.object.get_absolute_url()} for p in results]
-    return HttpResponse(json.dumps(results))
+    return HttpResponse(json.dumps(suggest_pages(term, region_id)))
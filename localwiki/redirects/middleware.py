@@ -4,7 +4,7 @@ from django.http import HttpResponseRedirect
 from django.conf import settings
 
 from pages.models import slugify
-from regions.models import Region
+from regions.resolver import resolve_region_slug, resolve_region_domain
 
 from models import Redirect
 
@@ -50,13 +50,12 @@ class RedirectFallbackMiddleware(object):
 
         if request.META['HTTP_HOST'].endswith(settings.MAIN_HOSTNAME):
             region_slug = re_match.group('region')
-            region = Region.objects.filter(slug=region_slug)
+            region = resolve_region_slug(region_slug, request)
         else:
-            region = Region.objects.filter(regionsettings__domain=request.META['HTTP_HOST'])
+            region = resolve_region_domain(request.META['HTTP_HOST'], request)
 
-        if not region:
+        if region is None:
             return response
-        region = region[0]
 
         try:
             r = Redirect.objects.get(source=slug, region=region)
@@ -0,0 +1,55 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import get_urlconf
+
+from localwiki.utils.urlresolvers import reverse
+
+from .models import Region
+
+MARKERS_GENERATION_KEY = 'regions:markers:generation'
+
+
+def region_markers_generation():
+    """
+    Returns:
+        A token that changes whenever any region is changed.  The region
+        markers are cached under it.
+    """
+    generation = cache.get(MARKERS_GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(MARKERS_GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_region_markers(*args, **kwargs):
+    """
+    Connected to the Region and RegionSettings save and delete signals.
+    """
+    cache.set(MARKERS_GENERATION_KEY, uuid.uuid4().hex)
+
+
+def region_markers():
+    """
+    Returns:
+        A list of (EWKT of the region's centroid, popup HTML) for every
+        active region, ready to be given to an InfoMap.  Built from the
+        stored centroids, so the regions' boundaries are never loaded.
+    """
+    urlconf = get_urlconf() or settings.ROOT_URLCONF
+    key = 'regions:markers:%s:%s' % (urlconf, region_markers_generation())
+    markers = cache.get(key)
+    if markers is not None:
+        return markers
+
+    regions = Region.objects.filter(is_active=True).\
+        exclude(regionsettings__is_meta_region=True).exclude(centroid=None).\
+        values_list('slug', 'full_name', 'centroid')
+    markers = []
+    for slug, full_name, centroid in regions:
+        url = reverse('frontpage', kwargs={'region': slug})
+        markers.append((centroid.ewkt, '<a href="%s">%s</a>' % (url, full_name)))
+    cache.set(key, markers, getattr(settings, 'REGIONS_MARKERS_CACHE_TIMEOUT', 60 * 60))
+    return markers
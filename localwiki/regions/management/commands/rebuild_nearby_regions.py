@@ -0,0 +1,40 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from regions.models import Region
+
+from regions.nearby import rebuild_nearby_regions, _update_nearby_regions
+
+
+class Command(BaseCommand):
+    args = '<region_slug region_slug ...>'
+    help = ('Recomputes the regions near the given regions, or near every region.\n' +
+            'Usage: localwiki-manage rebuild_nearby_regions [--async] [<region_slug ...>]')
+    option_list = BaseCommand.option_list + (
+        make_option('--async',
+            action='store_true',
+            dest='async',
+            default=False,
+            help='Queue a task for each region instead of computing here'),
+    )
+
+    def handle(self, *slugs, **options):
+        if slugs:
+            regions = []
+            for slug in slugs:
+                try:
+                    regions.append(Region.objects.select_related('regionsettings').get(slug=slug))
+                except Region.DoesNotExist:
+                    raise CommandError('Region "%s" does not exist.' % slug)
+        else:
+            regions = Region.objects.all().select_related('regionsettings')
+
+        if options['async']:
+            for region in regions:
+                _update_nearby_regions.delay(region.id)
+            self.stdout.write('Queued %d regions\n' % len(regions))
+        else:
+            num = rebuild_nearby_regions(regions)
+            self.stdout.write('Computed the nearby regions of %d regions\n' % num)
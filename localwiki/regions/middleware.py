@@ -4,7 +4,7 @@ from django.http import HttpResponsePermanentRedirect
 from django.conf import settings
 from django.utils.http import urlquote
 
-from models import Region
+from resolver import resolve_region_slug
 
 region_routing_pattern = re.compile(
     '^/(?P<region>[^/]+?)(/(?P<rest>.*))?$'
@@ -25,10 +25,9 @@ class RedirectToLanguageSubdomainMiddleware(object):
             return
 
         region_slug = re_match.group('region')
-        rs = Region.objects.filter(slug=region_slug)
-        if not rs:
+        region = resolve_region_slug(region_slug, request)
+        if region is None:
             return
-        region = rs[0]
 
         if not hasattr(region, 'regionsettings'):
             region_lang = settings.LANGUAGE_CODE
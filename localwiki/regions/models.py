@@ -3,7 +3,6 @@ import unicodedata
 from urllib import unquote_plus
 
 from django.db import IntegrityError
-from django.db.models import Count
 from django.conf import settings
 from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_lazy
@@ -23,6 +22,10 @@ class Region(models.Model):
         help_text=ugettext_lazy("A very short name for this region that will appear in URLs, e.g. 'sf'. "
             "Keep it short and memorable!"))
     geom = models.MultiPolygonField(null=True, blank=True)
+    # Kept from `geom` so that maps of many regions needn't load their
+    # full boundaries.
+    centroid = models.PointField(null=True, blank=True, editable=False)
+    bbox = models.PolygonField(null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True, db_index=True)
 
     objects = models.GeoManager()
@@ -32,6 +35,11 @@ class Region(models.Model):
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.slug)
+        if self.geom:
+            self.centroid = self.geom.centroid
+            self.bbox = self.geom.envelope
+        else:
+            self.centroid = self.bbox = None
         super(Region, self).save(*args, **kwargs)
 
     def populate_region(self, *args, **kwargs):
@@ -43,27 +51,16 @@ class Region(models.Model):
         populate_region(self)
 
     def get_nearby_regions(self, limit=6, show_emptyish_regions=False):
-        # XXX CACHE
-        if not self.geom:
+        if not self.centroid:
             return
-        center = self.geom.centroid
-        rgs = Region.objects.exclude(geom__isnull=True).exclude(id=self.id).exclude(regionsettings__is_meta_region=True).exclude(is_active=False).distance(center).order_by('distance')
-        # Return 6 nearest now. TODO: Rank by page count?
+        # Precomputed by regions.nearby
+        nearby = NearbyRegion.objects.filter(region=self, distance__isnull=False).\
+            exclude(nearby__regionsettings__is_meta_region=True).\
+            exclude(nearby__is_active=False).select_related('nearby')
         if limit is not None:
-            # Buffer by 10 to allow the num_pages filter to drop some, if needed
-            rgs_ids = [r.id for r in rgs[:limit+10]]
-            rgs = Region.objects.filter(id__in=rgs_ids).annotate(num_pages=Count('page'))
             # Region must have at least 5 pages to show up here
-            rgs = rgs.filter(num_pages__gte=5)
-    
-            # Preserve original distance order
-            good_regions_ids = [r.id for r in rgs]
-            ids = [i for i in rgs_ids if i in good_regions_ids]
-    
-            rgs = [Region.objects.get(id=i) for i in ids]
-            rgs = rgs[:limit]
-    
-        return rgs
+            nearby = nearby.filter(num_pages__gte=5)[:limit]
+        return [n.nearby for n in nearby]
 
     def is_admin(self, user):
         """
@@ -118,6 +115,27 @@ class BannedFromRegion(models.Model):
         return 'banned users on %s' % str(self.region)
 
 
+class NearbyRegion(models.Model):
+    """
+    A region near `region`.  Kept up to date by regions.nearby.
+    """
+    region = models.ForeignKey(Region, related_name='nearby_set')
+    nearby = models.ForeignKey(Region, related_name='+')
+    # How far `nearby` is from the center of `region`'s geometry, in meters.
+    distance = models.FloatField(null=True)
+    # How far apart the two regions' centers are, in degrees.
+    center_distance = models.FloatField(null=True)
+    # How many pages `nearby` has.
+    num_pages = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('region', 'nearby')
+        ordering = ('region', 'distance')
+
+    def __unicode__(self):
+        return '%s near %s' % (self.nearby, self.region)
+
+
 SLUGIFY_KEEP = r"\.-"
 SLUGIFY_MISC_CHARS = re.compile(('[^\w\s%s]' % SLUGIFY_KEEP), re.UNICODE)
 def slugify(value):
@@ -0,0 +1,142 @@
+"""
+The regions near each region.
+
+Rather than sorting every region by distance each time we show a region's
+neighbours, we keep a table of each region's nearest regions, and of every
+region whose center is within RADIUS degrees of its center, along with how
+far away and how big they are.  A region's rows are recomputed when its
+geometry or settings change, page counts are kept current as pages come
+and go.  The table is first filled in by a migration, and rebuilt
+periodically with the rebuild_nearby_regions management command.
+"""
+from celery import shared_task
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Region, RegionSettings, NearbyRegion
+
+# How many of the nearest regions, by geometry, we keep for each region.
+NEAREST = 20
+# Every region whose center is within this many degrees of a region's
+# center is kept, too.  This is the largest radius any caller uses.
+RADIUS = 0.5
+
+
+def _center(region):
+    try:
+        return region.regionsettings.region_center
+    except RegionSettings.DoesNotExist:
+        return None
+
+
+def compute_nearby_regions(region):
+    """
+    Returns:
+        A list of unsaved NearbyRegions for `region`.
+    """
+    from pages.models import Page
+
+    ids = set()
+    centroid = region.centroid
+    if centroid:
+        nearest = Region.objects.exclude(geom__isnull=True).exclude(id=region.id).\
+            exclude(regionsettings__is_meta_region=True).exclude(is_active=False).\
+            defer('geom').distance(centroid).order_by('distance')[:NEAREST]
+        ids.update(r.id for r in nearest)
+    center = _center(region)
+    if center:
+        ids.update(RegionSettings.objects.exclude(region=region).
+            filter(region_center__dwithin=(center, RADIUS)).
+            values_list('region', flat=True))
+    if not ids:
+        return []
+
+    distances = {}
+    if centroid:
+        for r in Region.objects.filter(id__in=ids).exclude(geom__isnull=True).\
+                defer('geom').distance(centroid):
+            distances[r.id] = r.distance.m
+    center_distances = {}
+    if center:
+        for region_id, other_center in RegionSettings.objects.filter(region__in=ids).\
+                exclude(region_center=None).values_list('region', 'region_center'):
+            center_distances[region_id] = center.distance(other_center)
+    num_pages = dict(Page.objects.filter(region__in=ids).values_list('region').
+        annotate(n=Count('id')))
+
+    return [
+        NearbyRegion(region=region, nearby_id=i, distance=distances.get(i),
+            center_distance=center_distances.get(i), num_pages=num_pages.get(i, 0))
+        for i in ids
+    ]
+
+
+def save_nearby_regions(region):
+    """
+    Recomputes the regions near `region`.
+
+    Returns:
+        The new NearbyRegions.
+    """
+    rows = compute_nearby_regions(region)
+    with transaction.commit_on_success():
+        NearbyRegion.objects.filter(region=region).delete()
+        NearbyRegion.objects.bulk_create(rows)
+    return rows
+
+
+def update_nearby_regions(region):
+    """
+    Recomputes the regions near `region`, and near the regions it was or
+    now is near, after its geometry or settings have changed.
+    """
+    affected = set(NearbyRegion.objects.filter(nearby=region).
+        values_list('region', flat=True))
+    affected.update(row.nearby_id for row in save_nearby_regions(region))
+    for other in Region.objects.filter(id__in=affected).defer('geom').\
+            select_related('regionsettings'):
+        save_nearby_regions(other)
+
+
+def rebuild_nearby_regions(regions=None):
+    """
+    Recomputes the regions near each of `regions`, or every region.
+
+    Returns:
+        The number of regions done.
+    """
+    if regions is None:
+        regions = Region.objects.defer('geom').select_related('regionsettings')
+    n = 0
+    for region in regions:
+        save_nearby_regions(region)
+        n += 1
+    return n
+
+
+def page_count_changed(region_id, delta):
+    NearbyRegion.objects.filter(nearby=region_id).update(num_pages=F('num_pages') + delta)
+
+
+def region_centers_within(region, degrees):
+    """
+    Returns:
+        A queryset of the NearbyRegions of `region` whose centers are
+        within `degrees` (at most RADIUS) of the center of `region`.
+    """
+    return NearbyRegion.objects.filter(region=region, center_distance__lte=degrees)
+
+
+@shared_task(ignore_result=True)
+def _update_nearby_regions(region_id):
+    region = Region.objects.filter(id=region_id).defer('geom').\
+        select_related('regionsettings')
+    if not region:
+        return
+    update_nearby_regions(region[0])
+
+
+@shared_task(ignore_result=True)
+def _rebuild_nearby_regions():
+    rebuild_nearby_regions()
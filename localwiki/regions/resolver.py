@@ -0,0 +1,96 @@
+"""
+Looking up Regions by slug and by domain.
+
+A single request looks up its region many times over: in middleware, in
+the view, in its cache key.  resolve_region_slug() and
+resolve_region_domain() remember what they found for the rest of the
+request.  Behind that is a process-wide map of slugs and domains to
+regions, which is dropped whenever a Region or RegionSettings is saved or
+deleted, and otherwise kept for REGIONS_RESOLVER_TTL seconds.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Region
+
+SLUG = 'slug'
+DOMAIN = 'domain'
+
+# (SLUG or DOMAIN, value) -> (expiry time, Region or None)
+_regions = {}
+_regions_lock = threading.Lock()
+
+
+def clear_resolved_regions(*args, **kwargs):
+    """
+    Forgets every region we've looked up in this process.  Connected to
+    the Region and RegionSettings save and delete signals.
+    """
+    with _regions_lock:
+        _regions.clear()
+
+
+def _lookup(kind, value):
+    key = (kind, value)
+    now = time.time()
+    cached = _regions.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    qs = Region.objects.select_related('regionsettings')
+    if kind == SLUG:
+        qs = qs.filter(slug=value)
+    else:
+        qs = qs.filter(regionsettings__domain=value)
+    found = list(qs[:1])
+    region = found[0] if found else None
+
+    ttl = getattr(settings, 'REGIONS_RESOLVER_TTL', 60)
+    max_size = getattr(settings, 'REGIONS_RESOLVER_SIZE', 10000)
+    with _regions_lock:
+        # Misses are remembered too, so a flood of made-up URLs could
+        # otherwise grow this without end.
+        if len(_regions) >= max_size:
+            _regions.clear()
+        _regions[key] = (now + ttl, region)
+    return region
+
+
+def _resolve(kind, value, request):
+    memo = None
+    if request is not None:
+        memo = getattr(request, '_resolved_regions', None)
+        if memo is None:
+            memo = request._resolved_regions = {}
+        if (kind, value) in memo:
+            return memo[(kind, value)]
+
+    region = _lookup(kind, value)
+    if region is not None:
+        # The shared instance mustn't be changed, so each request gets
+        # its own.
+        region = copy.deepcopy(region)
+    if memo is not None:
+        memo[(kind, value)] = region
+    return region
+
+
+def resolve_region_slug(slug, request=None):
+    """
+    Returns:
+        The Region with the slug `slug`, or None.  The same Region object
+        is returned for the rest of `request`.
+    """
+    return _resolve(SLUG, slug, request)
+
+
+def resolve_region_domain(domain, request=None):
+    """
+    Returns:
+        The Region whose RegionSettings have the domain `domain`, or None.
+        The same Region object is returned for the rest of `request`.
+    """
+    return _resolve(DOMAIN, domain, request)
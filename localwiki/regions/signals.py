@@ -1,9 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 
 from frontpage.models import FrontPage
 
 from .models import Region, RegionSettings
 from .map_utils import get_zoom_for_extent
+from .resolver import clear_resolved_regions
+from .nearby import _update_nearby_regions
+from .cache import invalidate_region_markers
 
 
 def setup_region_settings(sender, instance, created, raw, **kwargs):
@@ -17,9 +20,9 @@ def setup_region_settings(sender, instance, created, raw, **kwargs):
     else:
         region_settings = RegionSettings(region=instance)
     
-    if instance.geom:
-        region_settings.region_center = instance.geom.centroid
-        region_settings.region_zoom_level = get_zoom_for_extent(instance.geom.envelope)
+    if instance.centroid:
+        region_settings.region_center = instance.centroid
+        region_settings.region_zoom_level = get_zoom_for_extent(instance.bbox)
 
     region_settings.save()
 
@@ -37,3 +40,24 @@ def create_front_page(sender, instance, created, raw, **kwargs):
 
 post_save.connect(setup_region_settings, sender=Region)
 post_save.connect(create_front_page, sender=Region)
+
+def update_nearby_regions(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    # Saving a Region always saves its RegionSettings, so this covers
+    # changes to the region's geometry, too.
+    _update_nearby_regions.delay(instance.region_id)
+
+
+post_save.connect(update_nearby_regions, sender=RegionSettings)
+
+# Regions are looked up through regions.resolver, which remembers them.
+post_save.connect(clear_resolved_regions, sender=Region)
+post_delete.connect(clear_resolved_regions, sender=Region)
+post_save.connect(clear_resolved_regions, sender=RegionSettings)
+post_delete.connect(clear_resolved_regions, sender=RegionSettings)
+
+# The region markers on the explore map.
+post_save.connect(invalidate_region_markers, sender=Region)
+post_delete.connect(invalidate_region_markers, sender=Region)
+post_save.connect(invalidate_region_markers, sender=RegionSettings)
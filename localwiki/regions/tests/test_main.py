@@ -207,3 +207,107 @@ class RegionPermissionTests(TestCase):
 
         redirect = Redirect(source="testsource", destination=p, region=self.sf)
         self.assertFalse(self.marina.has_perm('redirects.change_redirect', redirect))
+
+
+class RegionResolverTests(TestCase):
+    def setUp(self):
+        self.sf = Region(full_name="San Francisco", slug="sf")
+        self.sf.save()
+        self.sf.regionsettings.domain = 'sf.example.org'
+        self.sf.regionsettings.save()
+
+    def test_resolve(self):
+        from django.test.client import RequestFactory
+        from ..resolver import resolve_region_slug, resolve_region_domain
+
+        request = RequestFactory().get('/sf/')
+        region = resolve_region_slug('sf', request)
+        self.assertEqual(region.id, self.sf.id)
+        self.assertEqual(resolve_region_domain('sf.example.org').id, self.sf.id)
+        self.assertEqual(resolve_region_slug('nowhere'), None)
+
+        # No more queries, and the same object for the rest of the request.
+        with self.assertNumQueries(0):
+            self.assertTrue(resolve_region_slug('sf', request) is region)
+            self.assertEqual(resolve_region_slug('sf').regionsettings.domain, 'sf.example.org')
+            self.assertEqual(resolve_region_slug('nowhere'), None)
+
+        # Other requests get their own copy.
+        self.assertFalse(resolve_region_slug('sf', RequestFactory().get('/sf/')) is region)
+
+        # Saving forgets what we looked up.
+        self.sf.regionsettings.domain = 'sanfrancisco.example.org'
+        self.sf.regionsettings.save()
+        self.assertEqual(resolve_region_domain('sf.example.org'), None)
+        self.assertEqual(resolve_region_domain('sanfrancisco.example.org').id, self.sf.id)
+
+        self.sf.is_active = False
+        self.sf.save()
+        self.assertFalse(resolve_region_slug('sf').is_active)
+
+
+class NearbyRegionTests(TestCase):
+    def make_region(self, slug, x, y):
+        geom = GEOSGeometry('MULTIPOLYGON(((%s %s, %s %s, %s %s, %s %s, %s %s)))' % (
+            x, y, x + 0.01, y, x + 0.01, y + 0.01, x, y + 0.01, x, y))
+        region = Region(full_name=slug, slug=slug, geom=geom)
+        region.save()
+        region.populate_region()
+        return region
+
+    def test_nearby_regions(self):
+        from ..nearby import rebuild_nearby_regions, update_nearby_regions, region_centers_within
+
+        sf = self.make_region('sf', -122.42, 37.77)
+        oakland = self.make_region('oakland', -122.27, 37.80)
+        davis = self.make_region('davis', -121.74, 38.54)
+        rebuild_nearby_regions()
+
+        sf = Region.objects.get(slug='sf')
+        self.assertEqual([r.slug for r in sf.get_nearby_regions()], ['oakland', 'davis'])
+        self.assertEqual([n.nearby.slug for n in region_centers_within(sf, 0.5)], ['oakland'])
+        self.assertEqual(list(region_centers_within(sf, 0.02)), [])
+
+        # Inactive regions aren't shown.
+        oakland.is_active = False
+        oakland.save()
+        self.assertEqual([r.slug for r in sf.get_nearby_regions()], ['davis'])
+
+        # Moving a region updates the regions it was near.
+        oakland.is_active = True
+        oakland.save()
+        oakland.geom = GEOSGeometry('MULTIPOLYGON(((10 10, 10.01 10, 10.01 10.01, 10 10.01, 10 10)))')
+        oakland.save()
+        update_nearby_regions(Region.objects.get(slug='oakland'))
+        self.assertEqual([r.slug for r in sf.get_nearby_regions()], ['davis', 'oakland'])
+        self.assertEqual(list(region_centers_within(sf, 0.5)), [])
+
+
+class RegionMarkerTests(TestCase):
+    def test_centroid_and_bbox(self):
+        from ..cache import region_markers
+
+        sf = Region(full_name="San Francisco", slug="sf",
+            geom=GEOSGeometry('MULTIPOLYGON(((0 0, 2 0, 2 1, 0 1, 0 0)))'))
+        sf.save()
+        self.assertEqual(sf.centroid.coords, (1, 0.5))
+        self.assertEqual(sf.bbox.extent, (0, 0, 2, 1))
+        self.assertEqual(sf.regionsettings.region_center.coords, (1, 0.5))
+
+        markers = region_markers()
+        self.assertEqual(len(markers), 1)
+        self.assertTrue('POINT (1' in markers[0][0])
+        self.assertTrue('San Francisco' in markers[0][1])
+
+        # Markers are rebuilt after a region changes.
+        sf.geom = GEOSGeometry('MULTIPOLYGON(((10 10, 12 10, 12 11, 10 11, 10 10)))')
+        sf.save()
+        self.assertTrue('POINT (11' in region_markers()[0][0])
+        sf.is_active = False
+        sf.save()
+        self.assertEqual(region_markers(), [])
+
+        sf.geom = None
+        sf.save()
+        self.assertEqual(sf.centroid, None)
+        self.assertEqual(sf.bbox, None)
@@ -29,6 +29,8 @@ from localwiki.utils.models import MultiQuerySet
 from localwiki.utils.urlresolvers import reverse
 
 from .models import Region, RegionSettings, BannedFromRegion, slugify
+from .resolver import resolve_region_slug, resolve_region_domain
+from .cache import region_markers
 from .forms import RegionForm, RegionSettingsForm, AdminSetForm, BannedSetForm
 
 
@@ -101,7 +103,8 @@ class RegionMixin(object):
 
     def get_region(self, request=None, kwargs=None):
         """
-        Returns the Region associated with this view.
+        Returns the Region associated with this view.  It's only looked
+        up once per request.
         """
         if kwargs is None:
             kwargs = self.kwargs
@@ -110,17 +113,13 @@ class RegionMixin(object):
 
         if kwargs.get('region'):
             region_slug = kwargs.get('region')
-            r = get_object_or_404(Region, slug=slugify(region_slug))
+            r = resolve_region_slug(slugify(region_slug), request)
+            if r is None:
+                raise Http404
         else:
-            if self.region_required:
-                rs = get_object_or_404(RegionSettings, domain=request.META['HTTP_HOST'])
-                r = rs.region
-            else:
-                if RegionSettings.objects.filter(domain=request.META['HTTP_HOST']).exists():
-                    rs = get_object_or_404(RegionSettings, domain=request.META['HTTP_HOST'])
-                    r = rs.region
-                else:
-                    r = None
+            r = resolve_region_domain(request.META['HTTP_HOST'], request)
+            if r is None and self.region_required:
+                raise Http404
 
         if self.region_required and not r.is_active:
             raise Http404(_("Region '%s' was deleted." % r.slug))
@@ -131,7 +130,7 @@ class RegionMixin(object):
         qs = super(RegionMixin, self).get_queryset()
         r = self.get_region()
         if r:
-            return qs.filter(region=self.get_region(), region__is_active=True)
+            return qs.filter(region=r, region__is_active=True)
         else:
             return qs.filter(region__is_active=True)
 
@@ -174,19 +173,14 @@ class RegionListView(ListView):
     zoom_to_data = False
 
     def get_queryset(self):
-        return Region.objects.filter(is_active=True).exclude(regionsettings__is_meta_region=True).order_by('full_name')
+        return Region.objects.filter(is_active=True).exclude(regionsettings__is_meta_region=True).\
+            defer('geom').order_by('full_name')
 
     def get_context_data(self, *args, **kwargs):
         from maps.widgets import InfoMap
 
-        def popup_html(obj):
-            url = reverse('frontpage', kwargs={'region': obj.slug})
-            return '<a href="%s">%s</a>' % (url, obj.full_name)
-
         context = super(RegionListView, self).get_context_data(*args, **kwargs)
-        map_objects = [(obj.geom.centroid, popup_html(obj)) for obj in self.get_queryset() if obj.geom]
-
-        context['map'] = InfoMap(map_objects, options=self.get_map_options())
+        context['map'] = InfoMap(region_markers(), options=self.get_map_options())
         return context
 
     def get_map_options(self):
@@ -251,7 +245,8 @@ class RegionExploreView(MultipleTypesPaginatedView):
 
     def get_object_lists(self):
         # Get the list of regions, ordered by score
-        qs = Region.objects.filter(is_active=True).exclude(regionsettings__is_meta_region=True)
+        qs = Region.objects.filter(is_active=True).exclude(regionsettings__is_meta_region=True).\
+            defer('geom')
 
         # Exclude those with empty scores
         qs = qs.exclude(score=None)
@@ -281,15 +276,10 @@ class RegionExploreView(MultipleTypesPaginatedView):
     def get_context_data(self, *args, **kwargs):
         from maps.widgets import InfoMap
 
-        def popup_html(obj):
-            url = reverse('frontpage', kwargs={'region': obj.slug})
-            return '<a href="%s">%s</a>' % (url, obj.full_name)
-
         context = super(RegionExploreView, self).get_context_data(*args, **kwargs)
 
         # Add a map of every single region:
-        all_regions = Region.objects.filter(is_active=True).exclude(regionsettings__is_meta_region=True)
-        map_objects = [(obj.geom.centroid, popup_html(obj)) for obj in all_regions if obj.geom]
+        map_objects = region_markers()
 
         olwidget_options = copy.deepcopy(getattr(settings,
             'OLWIDGET_DEFAULT_OPTIONS', {}))
@@ -0,0 +1,74 @@
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from localwiki.utils.queries import count_queries
+from regions.models import Region
+
+from tags.models import Tag, slugify
+from tags.suggest import suggest_tags, tag_index
+
+
+def suggest_tags_from_db(term, region_id):
+    # How tags were suggested before we kept them in memory.
+    def _query(**kwargs):
+        return Tag.objects.filter(slug__startswith=slugify(term), **kwargs).\
+            exclude(pagetagset=None).values('slug').distinct().\
+            values('slug', 'name').order_by('slug')[:20]
+
+    results = list(_query(region__id=region_id))
+    if len(results) < 5:
+        seen = set(t['slug'] for t in results)
+        results += [t for t in _query() if t['slug'] not in seen]
+    return [t['name'] for t in results[:20]]
+
+
+class Command(BaseCommand):
+    args = '<region_slug>'
+    help = ("Times tag suggest, from the database and from the in-memory "
+            "index, as someone types the names of random tags in a region.")
+    option_list = BaseCommand.option_list + (
+        make_option('--tags',
+            type='int',
+            dest='tags',
+            default=50,
+            help='Number of tag names to type'),
+    )
+
+    def handle(self, *slugs, **options):
+        if len(slugs) != 1:
+            raise CommandError("You must provide a region slug.")
+        try:
+            region = Region.objects.get(slug=slugs[0])
+        except Region.DoesNotExist:
+            raise CommandError('Region "%s" does not exist.' % slugs[0])
+
+        names = list(Tag.objects.filter(region=region).exclude(pagetagset=None).
+            values_list('name', flat=True))
+        if not names:
+            raise CommandError('Region "%s" has no tags.' % region.slug)
+        terms = []
+        for name in random.sample(names, min(options['tags'], len(names))):
+            for i in range(1, len(name) + 1):
+                terms.append(name[:i])
+
+        # Build the indexes up front.
+        tag_index(region.id)
+        tag_index()
+        self.time('database', suggest_tags_from_db, terms, region)
+        self.time('index', suggest_tags, terms, region)
+
+    def time(self, name, suggest, terms, region):
+        queries = 0
+        start = time.time()
+        for term in terms:
+            with count_queries() as counter:
+                suggest(term, region.id)
+            queries += counter.count
+        elapsed = time.time() - start
+        n = len(terms)
+        self.stdout.write('%s: %.3fms and %.1f queries per keystroke\n' % (
+            name, elapsed * 1000 / n, float(queries) / n))
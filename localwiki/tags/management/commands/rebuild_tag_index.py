@@ -0,0 +1,48 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from regions.models import Region
+
+from tags.suggest import GLOBAL, invalidate_tag_index, tag_index
+
+
+class Command(BaseCommand):
+    args = '<region_slug region_slug ...>'
+    help = ("Makes every process rebuild the in-memory tag suggest indexes "
+            "of the given regions, and the global one.\n"
+            "Usage: localwiki-manage rebuild_tag_index [--all] <region_slug ...>")
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Rebuild the index of every region'),
+    )
+
+    def handle(self, *slugs, **options):
+        if options['all']:
+            regions = Region.objects.all()
+        elif slugs:
+            regions = []
+            for slug in slugs:
+                try:
+                    regions.append(Region.objects.get(slug=slug))
+                except Region.DoesNotExist:
+                    raise CommandError('Region "%s" does not exist.' % slug)
+        else:
+            raise CommandError("You must provide a region slug or --all.")
+
+        for region in regions:
+            invalidate_tag_index(region.id)
+            start = time.time()
+            index = tag_index(region.id)
+            self.stdout.write('"%s": %d tags in %.1fms\n' % (
+                region.slug, len(index), (time.time() - start) * 1000))
+
+        start = time.time()
+        index = tag_index(GLOBAL)
+        self.stdout.write('All regions: %d tags in %.1fms\n' % (
+            len(index), (time.time() - start) * 1000))
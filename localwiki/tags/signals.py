@@ -1,8 +1,12 @@
+from collections import defaultdict
+
 from django.db import models
 from pages.search_indexes import PageIndex
-from tags.models import PageTagSet
+from tags.models import Tag, PageTagSet
 from pages.models import Page
 
+from .suggest import _tags_changed, _invalidate_tag_index
+
 
 def reindex_page(sender, **kwargs):
     # Not sure if a way around the 'post_clear' here. We need to reindex
@@ -11,4 +15,57 @@ def reindex_page(sender, **kwargs):
     if kwargs['action'] in ['post_add', 'post_remove', 'post_clear']:
         PageIndex().update_object(kwargs['instance'].page)
 
+
+def _update_tag_suggest(tags):
+    by_region = defaultdict(set)
+    for region_id, slug in tags:
+        by_region[region_id].add(slug)
+    for region_id, slugs in by_region.iteritems():
+        _tags_changed.delay(region_id, list(slugs))
+
+
+def _tag_suggest_m2m_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if reverse:
+        # Changed from the Tag's side.
+        if action in ['post_add', 'post_remove', 'post_clear']:
+            _tags_changed.delay(instance.region_id, [instance.slug])
+        return
+
+    if action == 'pre_clear':
+        # We can't tell which tags were removed after the fact.
+        instance._tags_before_clear = list(instance.tags.values_list('region', 'slug'))
+    elif action == 'post_clear':
+        _update_tag_suggest(getattr(instance, '_tags_before_clear', []))
+    elif action in ['post_add', 'post_remove'] and pk_set:
+        _update_tag_suggest(Tag.objects.filter(pk__in=pk_set).values_list('region', 'slug'))
+
+
+def _tag_suggest_pagetagset_pre_delete(sender, instance, **kwargs):
+    instance._tags_before_delete = list(instance.tags.values_list('region', 'slug'))
+
+
+def _tag_suggest_pagetagset_post_delete(sender, instance, **kwargs):
+    _update_tag_suggest(getattr(instance, '_tags_before_delete', []))
+
+
+def _tag_suggest_tag_saved(sender, instance, created, raw, **kwargs):
+    if created or raw:
+        return
+    # The slug may have changed, and we don't know what it was.
+    _invalidate_tag_index.delay(instance.region_id)
+
+
+def _tag_suggest_tag_deleted(sender, instance, **kwargs):
+    _tags_changed.delay(instance.region_id, [instance.slug])
+
+
 models.signals.m2m_changed.connect(reindex_page, sender=PageTagSet.tags.through)
+
+# Keep the in-memory tag suggest indexes current.  The indexes are
+# updated in tasks, after the change is committed, so that no process can
+# rebuild an index from the old rows under the new generation.
+models.signals.m2m_changed.connect(_tag_suggest_m2m_changed, sender=PageTagSet.tags.through)
+models.signals.pre_delete.connect(_tag_suggest_pagetagset_pre_delete, sender=PageTagSet)
+models.signals.post_delete.connect(_tag_suggest_pagetagset_post_delete, sender=PageTagSet)
+models.signals.post_save.connect(_tag_suggest_tag_saved, sender=Tag)
+models.signals.post_delete.connect(_tag_suggest_tag_deleted, sender=Tag)
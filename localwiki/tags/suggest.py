@@ -0,0 +1,221 @@
+"""
+Tag suggestions served from memory.
+
+We keep a sorted array of the slugs of the tags in use in each region, and
+one for all regions, and answer prefix lookups from it with a binary
+search.  The indexes are built lazily and kept current by the
+PageTagSet signals in tags.signals, which queue tasks so that the
+indexes are only updated once the change has been committed.  Each index
+is cached under a generation token that changes whenever its tags change,
+so that other processes know to rebuild theirs.  The global index is rebuilt at most
+every TAGS_SUGGEST_GLOBAL_REBUILD_INTERVAL seconds in other processes.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+
+from celery import shared_task
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import PageTagSet, slugify
+
+GLOBAL = 'global'
+
+
+def _generation_key(region_id):
+    return 'tags:suggest:generation:%s' % region_id
+
+
+def tags_generation(region_id):
+    """
+    Returns:
+        A token that changes whenever the tags in use in the region (or in
+        any region, for GLOBAL) change.
+    """
+    key = _generation_key(region_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(key, generation)
+    return generation
+
+
+def _new_generation(region_id):
+    generation = uuid.uuid4().hex
+    cache.set(_generation_key(region_id), generation)
+    return generation
+
+
+def used_tags(region_id=None, slugs=None):
+    """
+    Returns:
+        A list of (slug, name, number of pages tagged) for the tags in use
+        in the region, or in any region if `region_id` is None.
+    """
+    qs = PageTagSet.tags.through.objects.all()
+    if region_id is not None:
+        qs = qs.filter(tag__region=region_id)
+    if slugs is not None:
+        qs = qs.filter(tag__slug__in=list(slugs))
+    return list(qs.values_list('tag__slug', 'tag__name').annotate(n=Count('id')))
+
+
+class TagPrefixIndex(object):
+    """
+    A sorted array of tag slugs, with their names, for prefix lookups.
+    """
+    def __init__(self, tags=()):
+        self.counts = {}
+        self.names = {}
+        for slug, name, count in tags:
+            self.counts[slug] = self.counts.get(slug, 0) + count
+            self.names.setdefault(slug, name)
+        self.slugs = sorted(self.counts)
+        self.built = time.time()
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def update(self, slugs, tags):
+        """
+        Brings the index up to date for `slugs`, given the (slug, name,
+        count) of the ones still in use.
+        """
+        counts, names = {}, {}
+        for slug, name, count in tags:
+            counts[slug] = counts.get(slug, 0) + count
+            names.setdefault(slug, name)
+        for slug in set(slugs).union(counts):
+            i = bisect_left(self.slugs, slug)
+            present = i < len(self.slugs) and self.slugs[i] == slug
+            if counts.get(slug):
+                if not present:
+                    self.slugs.insert(i, slug)
+                self.counts[slug] = counts[slug]
+                self.names.setdefault(slug, names[slug])
+            elif present:
+                del self.slugs[i]
+                del self.counts[slug]
+                del self.names[slug]
+
+    def complete(self, prefix, limit=20):
+        """
+        Returns:
+            Up to `limit` (slug, name) pairs for the tags whose slugs start
+            with `prefix`, in slug order.
+        """
+        results = []
+        i = bisect_left(self.slugs, prefix)
+        while i < len(self.slugs) and len(results) < limit:
+            slug = self.slugs[i]
+            if not slug.startswith(prefix):
+                break
+            results.append((slug, self.names[slug]))
+            i += 1
+        return results
+
+
+# Region id (or GLOBAL) -> (generation, TagPrefixIndex), most recently
+# used last.
+_indexes = OrderedDict()
+_indexes_lock = threading.RLock()
+
+
+def tag_index(region_id=GLOBAL):
+    """
+    Returns:
+        The TagPrefixIndex for the region, or for all regions, built
+        afresh if its tags changed since we last built it.
+    """
+    generation = tags_generation(region_id)
+    with _indexes_lock:
+        cached = _indexes.pop(region_id, None)
+        if cached is not None:
+            _indexes[region_id] = cached
+    if cached is not None:
+        cached_generation, index = cached
+        if cached_generation == generation:
+            return index
+        interval = getattr(settings, 'TAGS_SUGGEST_GLOBAL_REBUILD_INTERVAL', 60)
+        if region_id == GLOBAL and time.time() - index.built < interval:
+            # Rebuilding the global index is costly, so it's allowed to
+            # lag behind a little.
+            return index
+
+    index = TagPrefixIndex(used_tags(None if region_id == GLOBAL else region_id))
+    max_regions = getattr(settings, 'TAGS_SUGGEST_INDEX_REGIONS', 200)
+    with _indexes_lock:
+        _indexes.pop(region_id, None)
+        _indexes[region_id] = (generation, index)
+        while len(_indexes) > max_regions + 1:
+            # The global index is never evicted.
+            del _indexes[next(k for k in _indexes if k != GLOBAL)]
+    return index
+
+
+def tags_changed(region_id, slugs):
+    """
+    Updates the tag indexes after the pages tagged with `slugs` in the
+    region have changed.
+    """
+    slugs = set(slugs)
+    if not slugs:
+        return
+    for index_region_id in (region_id, GLOBAL):
+        generation = _new_generation(index_region_id)
+        with _indexes_lock:
+            cached = _indexes.get(index_region_id)
+            if cached is None:
+                continue
+            index = cached[1]
+            index.update(slugs, used_tags(
+                None if index_region_id == GLOBAL else region_id, slugs))
+            # Ours is current, so no need to rebuild it.
+            _indexes[index_region_id] = (generation, index)
+
+
+def invalidate_tag_index(region_id):
+    """
+    Makes every process rebuild the region's tag index, and the global
+    one, the next time they're used.
+    """
+    _new_generation(region_id)
+    _new_generation(GLOBAL)
+    with _indexes_lock:
+        _indexes.pop(region_id, None)
+        _indexes.pop(GLOBAL, None)
+
+
+@shared_task(ignore_result=True)
+def _tags_changed(region_id, slugs):
+    tags_changed(region_id, slugs)
+
+
+@shared_task(ignore_result=True)
+def _invalidate_tag_index(region_id):
+    invalidate_tag_index(region_id)
+
+
+def suggest_tags(term, region_id=None, limit=20):
+    """
+    Returns:
+        The names of up to `limit` tags in use whose slugs start with
+        `term`.  With `region_id`, the region's tags come first, and tags
+        from other regions are added if there are fewer than five.
+    """
+    prefix = slugify(term)
+    if region_id is None:
+        results = tag_index().complete(prefix, limit)
+    else:
+        results = tag_index(region_id).complete(prefix, limit)
+        if len(results) < 5:
+            seen = set(slug for slug, name in results)
+            results += [r for r in tag_index().complete(prefix, limit)
+                        if r[0] not in seen]
+            results = results[:limit]
+    return [name for slug, name in results]
@@ -54,7 +54,7 @@ class IncludeTagNode(IncludeContentNode):
     def get_content(self, context):
         region = context['region']
         try:
-            self.tag = Tag.objects.get(slug=slugify(self.name), region=region)
+            Tag.objects.get(slug=slugify(self.name), region=region)
         except Tag.DoesNotExist:
             context['tag_name'] = self.name
         else:
@@ -99,3 +99,62 @@ class TagTest(TestCase):
         # Check that this is fixed in historical versions as well
         for pts_h in pts.versions.all():
             self.assertFalse(pts_h.tags.filter(region=mission).exists())
+
+
+class TagSuggestTest(TestCase):
+    def setUp(self):
+        from pages.models import Page
+        from tags import suggest
+
+        # The indexes outlive each test's transaction.
+        suggest._indexes.clear()
+
+        self.sf = Region(full_name='San Francisco', slug='sf')
+        self.sf.save()
+        self.oak = Region(full_name='Oakland', slug='oak')
+        self.oak.save()
+
+        self.page = Page(name='Dolores Park', content='<p>Park.</p>', region=self.sf)
+        self.page.save()
+        self.pts = PageTagSet(page=self.page, region=self.sf)
+        self.pts.save()
+        self.pts.tags = [Tag.objects.create(name=name, region=self.sf)
+                         for name in ('park', 'parking', 'dogs')]
+
+        oak_page = Page(name='Lake Merritt', content='<p>Lake.</p>', region=self.oak)
+        oak_page.save()
+        oak_pts = PageTagSet(page=oak_page, region=self.oak)
+        oak_pts.save()
+        oak_pts.tags = [Tag.objects.create(name='Parade', region=self.oak)]
+
+        # Not used on any page
+        Tag.objects.create(name='parks', region=self.sf)
+
+    def test_suggest(self):
+        from tags.suggest import suggest_tags, tag_index
+
+        self.assertEqual(suggest_tags('par', self.sf.id), ['park', 'parking', 'Parade'])
+        self.assertEqual(suggest_tags('Par'), ['Parade', 'park', 'parking'])
+        self.assertEqual(suggest_tags('dogs', self.oak.id), ['dogs'])
+        self.assertEqual(suggest_tags('xyz', self.sf.id), [])
+
+        # Served without the database, once the indexes are built.
+        index = tag_index(self.sf.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(index.complete('park'), [('park', 'park'), ('parking', 'parking')])
+
+    def test_kept_current(self):
+        from tags.suggest import suggest_tags
+
+        self.assertEqual(suggest_tags('park', self.sf.id), ['park', 'parking'])
+
+        self.pts.tags.remove(Tag.objects.get(slug='parking', region=self.sf))
+        self.pts.tags.add(Tag.objects.get(slug='parks', region=self.sf))
+        self.assertEqual(suggest_tags('park', self.sf.id), ['park', 'parks'])
+        self.assertEqual(suggest_tags('park'), ['park', 'parks'])
+
+        self.pts.tags = []
+        self.assertEqual(suggest_tags('park', self.sf.id), [])
+
+        Tag.objects.get(slug='parade').delete()
+        self.assertEqual(suggest_tags('par'), [])
@@ -20,7 +20,9 @@ from versionutils.versioning.views import VersionsList, UpdateView
 from versionutils.diff.views import CompareView
 from regions.models import Region
 from regions.views import RegionMixin
+from regions.nearby import region_centers_within
 from models import PageTagSet, Tag, slugify
+import suggest
 from forms import PageTagSetForm, SingleTagForm
 from pages.plugins import html_to_template_text
 from pages.models import Page
@@ -85,20 +87,12 @@ class TaggedList(CacheMixin, Custom404Mixin, RegionMixin, ListView):
             self.nearby_pagetagset_list = []
             return []
 
-        # __dwithin=(center, 0.02) means: all objects within
-        # 0.02 degree to the center. This is roughly 2 km. This will vary slightly as we move around the earth,
+        # Regions whose centers are within 0.02 degrees of this one's. This
+        # is roughly 2 km. This will vary slightly as we move around the earth,
         # but the complexity of fixing this here is too great. Not a huge deal
-        # for this particular case. The real fix here is to:
-        #
-        #   1.) Use a geometry column instead of the default geography column type or
-        #   2.) Figure out how to case to a geometry column for this query, or
-        #   3.) Write a method that, given a point, finds the correct UTM_N projection,
-        #       then projects the center point into that UTM_N, then buffers by meters
-        #       around the point, and then finally does a __within= on the queryset. Whew.
-        #
-        nearby_pts = PageTagSet.objects.exclude(region=region).\
-            exclude(region__regionsettings=None).exclude(region__regionsettings__region_center=None).\
-            filter(region__regionsettings__region_center__dwithin=(center, 0.02))
+        # for this particular case.
+        nearby_regions = region_centers_within(region, 0.02).values_list('nearby', flat=True)
+        nearby_pts = PageTagSet.objects.filter(region__in=list(nearby_regions))
         nearby_pts = nearby_pts.filter(tags__slug=self.tag.slug)
         nearby_pts = nearby_pts.select_related('page__mapdata')
 
@@ -442,16 +436,6 @@ def suggest_tags(request):
     """
     Simple tag suggest.
     """
-    def _make_unique(l):
-        d = {}
-        ll = []
-        for m in l:
-            if m['slug'] in d:
-                continue
-            ll.append(m)
-            d[m['slug']] = True
-        return ll
-
     # XXX TODO: Break this out when doing the API work.
     import json
 
@@ -460,22 +444,8 @@ def suggest_tags(request):
         return HttpResponse('')
     region_id = request.GET.get('region_id', None)
     if region_id is not None:
-        results = Tag.objects.filter(
-            slug__startswith=slugify(term),
-            region__id=int(region_id)).exclude(pagetagset=None)
-
-        if len(results) < 5:
-            # Set a sane limit before adding
-            results = results.values('slug').distinct().values('slug', 'name').order_by('slug')[:20]
-            global_results = Tag.objects.filter(
-                slug__startswith=slugify(term)).exclude(pagetagset=None).values('slug').distinct().values('slug', 'name').order_by('slug')[:20]
-            results = _make_unique(list(results) + list(global_results))[:20]
-        else:
-            results = results.values('slug').distinct().values('slug', 'name').order_by('slug')[:20]
-
-    else:
-        results = Tag.objects.filter(
-            slug__startswith=slugify(term)).exclude(pagetagset=None).values('slug').distinct().values('slug', 'name').order_by('slug')[:20]
+        region_id = int(region_id)
 
-    results = [t['name'] for t in results]
+    # Served from in-memory indexes of the tags in use.
+    results = suggest.suggest_tags(term, region_id)
     return HttpResponse(json.dumps(results))
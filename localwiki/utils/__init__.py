@@ -1,3 +1,5 @@
+import base64
+import heapq
 import itertools
 import threading
 from collections import Counter, defaultdict
@@ -79,6 +81,86 @@ def take_n_from(lists_with_indexes, n, merge_key=None):
     return (items, indexes, has_more_left)
 
 
+def encode_cursor(date, id):
+    """
+    Returns:
+        An opaque, URL-safe cursor for the item with the given date and id.
+    """
+    return base64.urlsafe_b64encode('%s|%s' % (date.isoformat(), id)).rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        The (date, id) tuple from a cursor made by encode_cursor().
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    from dateutil.parser import parse as dateparser
+
+    try:
+        s = base64.urlsafe_b64decode(str(cursor) + '=' * (-len(cursor) % 4))
+        date, id = s.rsplit('|', 1)
+        return (dateparser(date), int(id))
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError("Invalid cursor: %r" % cursor)
+
+
+class _Newest(object):
+    """
+    Wraps a sort key so that heapq, a min-heap, hands out the largest
+    (newest) keys first.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def take_n_newest(lists, n, key):
+    """
+    Merges lists that are each sorted newest first, like take_n_from(), but
+    lazily: each list is only read as far as is needed.
+
+    Args:
+        lists: Iterables, each sorted by `key`, newest first.
+
+        n: Number of items to take.
+
+        key: Returns the sort key, e.g. (date, id), of an item.
+
+    Returns:
+        A tuple, (items, last_keys, has_more_left), where `items` are the n
+        newest items across all the lists and `last_keys` holds, for each
+        list, the key of the last item taken from it, or None if none were.
+        `has_more_left` indicates whether there are more items left.
+    """
+    iterators = [iter(l) for l in lists]
+    heap = []
+
+    def _push_next(list_num):
+        for item in iterators[list_num]:
+            heapq.heappush(heap, (_Newest(key(item)), list_num, item))
+            return
+
+    for list_num in range(len(iterators)):
+        _push_next(list_num)
+
+    items = []
+    last_keys = [None] * len(iterators)
+    while heap and len(items) < n:
+        item_key, list_num, item = heapq.heappop(heap)
+        items.append(item)
+        last_keys[list_num] = item_key.value
+        _push_next(list_num)
+    return (items, last_keys, bool(heap))
+
+
 def get_base_uri():
     from .middleware import _threadlocal
     return getattr(_threadlocal, 'base_uri', '')
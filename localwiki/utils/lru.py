@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A small, thread-safe, in-process least-recently-used cache.
+
+    Once more than `max_size` items are stored, the least recently
+    used item is evicted.  Items set with a `timeout` also expire after
+    that many seconds.
+    """
+    def __init__(self, max_size=500):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.time():
+                return default
+            # Re-insert to mark as most recently used.
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = None
+        if timeout is not None:
+            expires = time.time() + timeout
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._data:
+                return False
+            expires = self._data[key][1]
+            return expires is None or expires > time.time()
+
+    def __len__(self):
+        return len(self._data)
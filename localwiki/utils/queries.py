@@ -0,0 +1,27 @@
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+class count_queries(object):
+    """
+    Counts the database queries run inside a `with` block, whether or not
+    DEBUG is on::
+
+        with count_queries() as queries:
+            do_something()
+        print queries.count
+
+    For tests that expect an exact number, use assertNumQueries() instead.
+    """
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.count = 0
+
+    def __enter__(self):
+        self.old_debug_cursor = self.connection.use_debug_cursor
+        self.connection.use_debug_cursor = True
+        self.start = len(self.connection.queries)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.count = len(self.connection.queries) - self.start
+        self.connection.use_debug_cursor = self.old_debug_cursor
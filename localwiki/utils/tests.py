@@ -1,3 +1,4 @@
+import datetime
 from contextlib import contextmanager
 
 from lxml.html import document_fromstring
@@ -11,7 +12,7 @@ from django.contrib.auth.models import User
 
 from users.models import UserProfile
 
-from . import take_n_from
+from . import take_n_from, take_n_newest, encode_cursor, decode_cursor
 
 
 class TakeNFromTests(TestCase):
@@ -50,6 +51,35 @@ class TakeNFromTests(TestCase):
         self.assertEqual(len(items), len(all_sorted))
 
 
+class TakeNNewestTests(TestCase):
+    def setUp(self):
+        self.pages = sorted([(datetime.datetime(2013, 1, d), d) for d in (1, 4, 5, 9)], reverse=True)
+        self.maps = sorted([(datetime.datetime(2013, 1, d), 10 + d) for d in (2, 5, 8)], reverse=True)
+        self.files = []
+
+    def test_take_general(self):
+        all_sorted = sorted(self.pages + self.maps, reverse=True)
+        for i in range(0, len(all_sorted) + 2):
+            items, last_keys, more_left = take_n_newest(
+                (self.pages, self.maps, self.files), i, key=(lambda x: x))
+            self.assertEqual(items, all_sorted[:i])
+            self.assertEqual(more_left, i < len(all_sorted))
+
+    def test_last_keys(self):
+        items, last_keys, more_left = take_n_newest(
+            (self.pages, self.maps, self.files), 3, key=(lambda x: x))
+        # 9th, 8th, then the map from the 5th beats the page by id.
+        self.assertEqual(items, [self.pages[0], self.maps[0], self.maps[1]])
+        self.assertEqual(last_keys, [self.pages[0], self.maps[1], None])
+
+    def test_cursor(self):
+        date = datetime.datetime(2013, 5, 6, 7, 8, 9, 123)
+        cursor = encode_cursor(date, 42)
+        self.assertFalse(cursor.isdigit())
+        self.assertEqual(decode_cursor(cursor), (date, 42))
+        self.assertRaises(ValueError, decode_cursor, 'not a cursor')
+
+
 class CanonicalURLTests(TestCase):
     def has_canonical_url(self, url, request, response):
         from phased.middleware import PhasedRenderMiddleware
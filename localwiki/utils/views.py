@@ -21,7 +21,9 @@ from django.template.context import RequestContext
 
 from versionutils.versioning.views import RevertView, DeleteView
 
-from . import take_n_from
+from django.db.models import Q
+
+from . import take_n_from, take_n_newest, encode_cursor, decode_cursor
 
 # 29 days, effectively infinite in cache years
 # XXX NOTE: For some reason, the memcached client we're using
@@ -99,6 +101,7 @@ class CacheMixin(object):
     @classmethod
     def get_region_slug_param(*args, **kwargs):
         from regions.models import RegionSettings
+        from regions.resolver import resolve_region_domain
 
         if kwargs.get('region'):
             return kwargs.get('region')
@@ -107,7 +110,10 @@ class CacheMixin(object):
             raise KeyError("Need either `request` or a `region` parameter.")
 
         request = kwargs.get('request')
-        return RegionSettings.objects.get(domain=request.META['HTTP_HOST']).region.slug
+        region = resolve_region_domain(request.META['HTTP_HOST'], request)
+        if region is None:
+            raise RegionSettings.DoesNotExist
+        return region.slug
 
 
 class Custom404Mixin(object):
@@ -288,12 +294,36 @@ class MultipleTypesPaginatedView(TemplateView):
         """
         return None
 
+    def get_pagination_cursor_fields(self, qs):
+        """
+        Args:
+            qs: One of the querysets from get_object_lists().
+
+        Returns:
+            A (date field, id field) tuple.  If given for every queryset,
+            we page through them newest first with cursors, seeking past
+            the last item shown from each queryset, rather than with
+            OFFSETs.  Default: None (page by index).
+        """
+        return None
+
     def get_pagination_objects(self):
+        object_lists = self.get_object_lists()
+        pagination_keys = [self.get_pagination_key(qs) for qs in object_lists]
+        cursor_fields = [self.get_pagination_cursor_fields(qs) for qs in object_lists]
+        params = [self.request.GET.get(key, '') for key in pagination_keys]
+
+        # Old, index-style URLs keep paging by index.
+        uses_indexes = any([p.isdigit() for p in params])
+        if all(cursor_fields) and not uses_indexes:
+            return self.get_pagination_objects_by_cursor(
+                object_lists, pagination_keys, cursor_fields, params)
+
         items_with_indexes = []
         id_to_page_key = {}
-        for (_id, qs) in enumerate(self.get_object_lists()):
-            pagination_key = self.get_pagination_key(qs)
-            page = int(self.request.GET.get(pagination_key, 0))
+        for (_id, qs) in enumerate(object_lists):
+            pagination_key = pagination_keys[_id]
+            page = int(params[_id] or 0)
             items_with_indexes.append((qs, page))
             id_to_page_key[_id] = pagination_key
 
@@ -310,6 +340,42 @@ class MultipleTypesPaginatedView(TemplateView):
 
         return items
 
+    def get_pagination_objects_by_cursor(self, object_lists, pagination_keys,
+                                         cursor_fields, params):
+        n = self.items_per_page
+        seeks = []
+        for qs, (date_field, id_field), param in zip(object_lists, cursor_fields, params):
+            qs = qs.order_by('-%s' % date_field, '-%s' % id_field)
+            if param:
+                try:
+                    date, id = decode_cursor(param)
+                except ValueError:
+                    raise Http404
+                qs = qs.filter(
+                    Q(**{'%s__lt' % date_field: date}) |
+                    Q(**{date_field: date, '%s__lt' % id_field: id})
+                )
+            # One query per list.  The extra item tells us if there's more.
+            seeks.append([
+                ((getattr(x, date_field), getattr(x, id_field)), x)
+                for x in qs[:n + 1]
+            ])
+
+        keyed_items, last_keys, has_more_left = take_n_newest(
+            seeks, n, key=(lambda keyed: keyed[0]))
+        items = [x for (key, x) in keyed_items]
+        self.has_more_left = has_more_left
+
+        # The (date, id) of the last item shown from each list.  A list
+        # we've run out of keeps the cursor it came in with.
+        self.current_indexes = {}
+        for key, param, last_key in zip(pagination_keys, params, last_keys):
+            if last_key is not None:
+                self.current_indexes[key] = last_key
+            elif param:
+                self.current_indexes[key] = decode_cursor(param)
+        return items
+
     def get_context_data(self, *args, **kwargs):
         c = super(MultipleTypesPaginatedView, self).get_context_data(*args, **kwargs)
 
@@ -319,6 +385,8 @@ class MultipleTypesPaginatedView(TemplateView):
         if self.has_more_left:
             qitems = []
             for pagelabel, index in self.current_indexes.items():
+                if isinstance(index, tuple):
+                    index = encode_cursor(*index)
                 qitems.append('%s=%s' % (pagelabel, index))
             c['pagination_next'] = '?' + '&'.join(qitems)
 
@@ -13,7 +13,7 @@ from django.core.urlresolvers import reverse_lazy
 
 from utils import static_url
 import diff_match_patch
-import daisydiff
+from htmldiff import htmldiff
 from versionutils.versioning.utils import is_historical_instance
 
 
@@ -328,17 +328,15 @@ class HtmlFieldDiff(BaseFieldDiff):
     To use for a field type, first register in your code like this:
     diff.register(MyHtmlField, diff.HtmlFieldDiff)
     """
-    DAISYDIFF_URL = getattr(settings, 'DAISYDIFF_URL', 'http://localhost:8080')
-
     def as_html(self, context=None):
         d = self.get_diff()
         if d is None:
             return ('<tr><td colspan="2">(%s)</td></tr>'
                     % _('No differences found'))
         try:
-            return daisydiff.daisydiff(d['deleted'], d['inserted'],
-                                       self.DAISYDIFF_URL)
-        except:
+            return htmldiff(d['deleted'], d['inserted'])
+        except Exception:
+            # Too large, or something we couldn't parse.
             return TextFieldDiff(d['deleted'], d['inserted']).as_html(context=context)
 
     def get_diff(self):
@@ -0,0 +1,267 @@
+"""
+In-process, tree-aware HTML diff.
+
+Both versions are broken up into tokens -- words, runs of whitespace,
+punctuation and "atomic" elements that have no text of their own (images,
+line breaks, plugins) -- each of which remembers the elements it sits
+inside of.  The token sequences are diffed with diff_match_patch, using the
+same trick as its line mode: each distinct token becomes one character.
+We then rebuild the two versions side-by-side, marking up what was removed,
+added or only changed formatting the same way DaisyDiff does, so the
+results work with htmldiff.js.
+"""
+import re
+import urllib
+from cgi import escape
+
+from django.conf import settings
+from django.utils.translation import ugettext as _
+from lxml import etree
+from lxml.html import fragments_fromstring
+
+from diff_match_patch import diff_match_patch
+
+# Combined length, in characters, of the two versions we're willing to diff.
+HTMLDIFF_MAX_SIZE = getattr(settings, 'HTMLDIFF_MAX_SIZE', 500000)
+# Seconds diff_match_patch may spend before settling for a coarser diff.
+HTMLDIFF_TIMEOUT = getattr(settings, 'HTMLDIFF_TIMEOUT', 1.0)
+
+# Each distinct token is mapped to a single character.
+MAX_TOKENS = 65535
+
+TOKEN_RE = re.compile(r'\w+|\s+|[^\w\s]', re.UNICODE)
+
+
+class HtmlDiffTooLarge(Exception):
+    pass
+
+
+class _Element(object):
+    """
+    An element that tokens sit inside of.  Compared by identity when
+    rebuilding the HTML and by `signature` when looking for formatting
+    changes.
+    """
+    def __init__(self, elem):
+        self.tag = elem.tag
+        self.attrib = sorted(elem.attrib.items())
+        self.signature = (self.tag, tuple(self.attrib))
+
+    def start_tag(self):
+        attrs = u''.join([u' %s="%s"' % (k, escape(v, quote=True))
+                          for k, v in self.attrib])
+        return u'<%s%s>' % (self.tag, attrs)
+
+    def end_tag(self):
+        return u'</%s>' % self.tag
+
+
+class _Token(object):
+    def __init__(self, key, html, path):
+        self.key = key
+        self.html = html
+        self.path = path
+
+    def signature(self):
+        return [e.signature for e in self.path]
+
+
+def _is_atomic(elem):
+    return not len(elem) and not (elem.text or u'').strip()
+
+
+def _text_tokens(text, path, tokens):
+    if not text:
+        return
+    for word in TOKEN_RE.findall(text):
+        tokens.append(_Token(word, escape(word), path))
+
+
+def _tokenize_element(elem, path, tokens):
+    if not isinstance(elem.tag, basestring):
+        # Comments and processing instructions.
+        pass
+    elif _is_atomic(elem):
+        html = etree.tostring(elem, method='html', encoding=unicode, with_tail=False)
+        tokens.append(_Token(html, html, path))
+    else:
+        inner = path + (_Element(elem),)
+        _text_tokens(elem.text, inner, tokens)
+        for child in elem:
+            _tokenize_element(child, inner, tokens)
+    _text_tokens(elem.tail, path, tokens)
+
+
+def tokenize(html):
+    """
+    Returns:
+        The list of tokens making up `html`.
+    """
+    tokens = []
+    if not html.strip():
+        return tokens
+    for e in fragments_fromstring(html):
+        if isinstance(e, basestring):
+            _text_tokens(e, (), tokens)
+        else:
+            _tokenize_element(e, (), tokens)
+    return tokens
+
+
+def _tokens_to_chars(tokens1, tokens2):
+    token_chars = {}
+
+    def munge(tokens):
+        chars = []
+        for t in tokens:
+            c = token_chars.get(t.key)
+            if c is None:
+                if len(token_chars) >= MAX_TOKENS:
+                    raise HtmlDiffTooLarge('Too many distinct words to diff')
+                c = unichr(len(token_chars) + 1)
+                token_chars[t.key] = c
+            chars.append(c)
+        return u''.join(chars)
+
+    return munge(tokens1), munge(tokens2)
+
+
+def diff_tokens(tokens1, tokens2, timeout=None):
+    """
+    Returns:
+        A list of (op, old_tokens, new_tokens) where op is one of
+        diff_match_patch's DIFF_EQUAL, DIFF_DELETE or DIFF_INSERT.
+    """
+    chars1, chars2 = _tokens_to_chars(tokens1, tokens2)
+    dmp = diff_match_patch()
+    dmp.Diff_Timeout = HTMLDIFF_TIMEOUT if timeout is None else timeout
+    diffs = dmp.diff_main(chars1, chars2, False)
+
+    ops = []
+    i = j = 0
+    for op, chars in diffs:
+        n = len(chars)
+        if op == dmp.DIFF_EQUAL:
+            ops.append((op, tokens1[i:i + n], tokens2[j:j + n]))
+            i += n
+            j += n
+        elif op == dmp.DIFF_DELETE:
+            ops.append((op, tokens1[i:i + n], []))
+            i += n
+        else:
+            ops.append((op, [], tokens2[j:j + n]))
+            j += n
+    return ops
+
+
+def _describe_changes(old_path, new_path):
+    old_tags = [e.tag for e in old_path]
+    new_tags = [e.tag for e in new_path]
+    added = [t for t in new_tags if t not in old_tags]
+    removed = [t for t in old_tags if t not in new_tags]
+    changes = []
+    if added:
+        changes.append(_('%s added') % u', '.join(added))
+    if removed:
+        changes.append(_('%s removed') % u', '.join(removed))
+    if not changes:
+        changes.append(_('Formatting changed'))
+    return u'<br/>'.join(changes)
+
+
+class _Writer(object):
+    """
+    Rebuilds HTML from tokens, opening and closing their elements as
+    needed and wrapping runs of tokens in <del>, <ins> or <span> markers.
+
+    Tokens are considered to be in the same element if they share the
+    very same _Element, or, if `by_signature` is set, an _Element with the
+    same tag and attributes (for mixing tokens from different versions).
+    """
+    def __init__(self, by_signature=False):
+        self.out = []
+        self.stack = ()
+        self.marker = None
+        self.by_signature = by_signature
+
+    def _same(self, e1, e2):
+        if self.by_signature:
+            return e1.signature == e2.signature
+        return e1 is e2
+
+    def _close_marker(self):
+        if self.marker is not None:
+            self.out.append(self.marker[1])
+            self.marker = None
+
+    def _move_to(self, path):
+        common = 0
+        while (common < len(self.stack) and common < len(path)
+               and self._same(self.stack[common], path[common])):
+            common += 1
+        if common == len(self.stack) and common == len(path):
+            return
+        self._close_marker()
+        for e in reversed(self.stack[common:]):
+            self.out.append(e.end_tag())
+        for e in path[common:]:
+            self.out.append(e.start_tag())
+        self.stack = path
+
+    def write(self, token, marker=None):
+        self._move_to(token.path)
+        if self.marker != marker:
+            self._close_marker()
+            if marker is not None:
+                self.out.append(marker[0])
+            self.marker = marker
+        self.out.append(token.html)
+
+    def getvalue(self):
+        self._close_marker()
+        self._move_to(())
+        return u''.join(self.out)
+
+
+DELETED = (u'<del class="diff-html-removed">', u'</del>')
+INSERTED = (u'<ins class="diff-html-added">', u'</ins>')
+
+
+def htmldiff(html1, html2, max_size=None, timeout=None):
+    """
+    Diffs two versions of some HTML.
+
+    Returns:
+        A table row with the old version, deletions marked, on the left
+        and the new version, additions and formatting changes marked, on
+        the right.
+
+    Raises:
+        HtmlDiffTooLarge: If the HTML is too large to diff.
+    """
+    max_size = HTMLDIFF_MAX_SIZE if max_size is None else max_size
+    if max_size and len(html1) + len(html2) > max_size:
+        raise HtmlDiffTooLarge('HTML is too large to diff')
+
+    old = _Writer()
+    new = _Writer()
+    dmp = diff_match_patch
+    for op, old_tokens, new_tokens in diff_tokens(tokenize(html1),
+                                                  tokenize(html2), timeout):
+        if op == dmp.DIFF_DELETE:
+            for t in old_tokens:
+                old.write(t, DELETED)
+        elif op == dmp.DIFF_INSERT:
+            for t in new_tokens:
+                new.write(t, INSERTED)
+        else:
+            for t1, t2 in zip(old_tokens, new_tokens):
+                old.write(t1)
+                if t1.signature() == t2.signature():
+                    new.write(t2)
+                else:
+                    changes = _describe_changes(t1.path, t2.path)
+                    new.write(t2, (u'<span class="diff-html-changed" changes="%s">'
+                        % urllib.quote(changes.encode('utf-8')), u'</span>'))
+    return u'<tr class="htmldiff"><td>%s</td><td>%s</td></tr>' % (
+        old.getvalue(), new.getvalue())
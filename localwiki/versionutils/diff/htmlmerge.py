@@ -0,0 +1,218 @@
+"""
+Three-way merge of HTML.
+
+The three versions are split into their top-level (block) elements and
+merged diff3-style: wherever only one side changed a run of blocks, we take
+that side's blocks.  Where both sides changed the same run of blocks, we
+line the blocks up by their tags and try again at the word level, using the
+tokens from htmldiff.  Anything that still can't be merged is marked up as
+an edit conflict, showing both versions.
+"""
+from difflib import SequenceMatcher
+from cgi import escape
+
+from django.utils.translation import ugettext as _
+from lxml import etree
+from lxml.html import fragments_fromstring
+
+from htmldiff import tokenize, _Writer
+
+
+def _conflict_marker(msg):
+    return u'<strong class="editConflict">%s</strong>' % msg
+
+
+def _conflict(yours, theirs):
+    return ([_conflict_marker(_('Edit conflict! Other version:'))] + theirs +
+            [_conflict_marker(_('Edit conflict! Your version:'))] + yours)
+
+
+def split_blocks(html):
+    """
+    Returns:
+        A list of the serialized top-level elements, and any text between
+        them, in `html`.
+    """
+    blocks = []
+    if not html or not html.strip():
+        return blocks
+    for e in fragments_fromstring(html):
+        if isinstance(e, basestring):
+            if e.strip():
+                blocks.append(escape(e))
+            continue
+        blocks.append(etree.tostring(e, method='html', encoding=unicode, with_tail=False))
+        if e.tail and e.tail.strip():
+            blocks.append(escape(e.tail))
+    return blocks
+
+
+def _matches(a, b):
+    """
+    Returns:
+        A dict mapping indexes of items in `a` to the indexes of the
+        matching items in `b`.
+    """
+    matches = {}
+    for i, j, n in SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks():
+        for x in range(n):
+            matches[i + x] = j + x
+    return matches
+
+
+def diff3(ancestor, yours, theirs, key=None):
+    """
+    Lines up the three sequences.
+
+    Returns:
+        A list of (ancestor, yours, theirs) chunks.  Chunks alternate
+        between stable ones, where all three agree, and ones where at
+        least one side differs from the ancestor.
+    """
+    key = key or (lambda x: x)
+    a_keys = [key(x) for x in ancestor]
+    to_yours = _matches(a_keys, [key(x) for x in yours])
+    to_theirs = _matches(a_keys, [key(x) for x in theirs])
+
+    chunks = []
+    i = j = k = 0
+    for ai in range(len(ancestor)):
+        if ai < i or ai not in to_yours or ai not in to_theirs:
+            continue
+        yi, ti = to_yours[ai], to_theirs[ai]
+        if yi < j or ti < k:
+            continue
+        if ai > i or yi > j or ti > k:
+            chunks.append((ancestor[i:ai], yours[j:yi], theirs[k:ti]))
+        chunks.append(([ancestor[ai]], [yours[yi]], [theirs[ti]]))
+        i, j, k = ai + 1, yi + 1, ti + 1
+    if i < len(ancestor) or j < len(yours) or k < len(theirs):
+        chunks.append((ancestor[i:], yours[j:], theirs[k:]))
+    return chunks
+
+
+def _resolve(a, y, t, key=None):
+    """
+    Returns:
+        The merged version of a chunk, or None if both sides changed it.
+    """
+    key = key or (lambda x: x)
+    a_keys, y_keys, t_keys = [[key(x) for x in s] for s in (a, y, t)]
+    if y_keys == t_keys:
+        return y
+    if a_keys == y_keys:
+        return t
+    if a_keys == t_keys:
+        return y
+    return None
+
+
+def _start_tag(block):
+    return block.split('>', 1)[0]
+
+
+def _words(tokens):
+    """
+    Groups tokens into words along with the whitespace that follows them,
+    so that whitespace can't line up the versions on its own.
+    """
+    words = []
+    for token in tokens:
+        if words and not token.key.strip():
+            words[-1].append(token)
+        else:
+            words.append([token])
+    return words
+
+
+def _word_key(word):
+    return tuple([t.key for t in word])
+
+
+def _word_formatting(word):
+    return tuple([(t.key, tuple(t.signature())) for t in word])
+
+
+def _merge_words(ancestor, yours, theirs):
+    merged = []
+    for a, y, t in diff3(ancestor, yours, theirs, key=_word_key):
+        if len(a) == len(y) == len(t) == 1 and \
+                _word_key(a[0]) == _word_key(y[0]) == _word_key(t[0]):
+            # Same word, though maybe formatted differently.
+            merged.extend(_resolve(a, y, t, key=_word_formatting) or y)
+            continue
+        resolved = _resolve(a, y, t, key=_word_key)
+        if resolved is None:
+            return None
+        merged.extend(resolved)
+    return merged
+
+
+def _merge_block(ancestor, yours, theirs):
+    """
+    Word-level merge of a block both sides changed.
+
+    Returns:
+        The merged block, or None if the same words were changed.
+    """
+    if not (_start_tag(ancestor) == _start_tag(yours) == _start_tag(theirs)):
+        return None
+
+    merged = _merge_words(_words(tokenize(ancestor)), _words(tokenize(yours)),
+                          _words(tokenize(theirs)))
+    if merged is None:
+        return None
+    writer = _Writer(by_signature=True)
+    for word in merged:
+        for token in word:
+            writer.write(token)
+    return writer.getvalue()
+
+
+def _merge_chunk(ancestor, yours, theirs):
+    """
+    Merges a run of blocks both sides changed, lining up the blocks by
+    their tags and merging the ones that line up word by word.
+
+    Returns:
+        The tuple (merged_blocks, has_conflict).
+    """
+    merged = []
+    has_conflict = False
+    for a, y, t in diff3(ancestor, yours, theirs, key=_start_tag):
+        resolved = _resolve(a, y, t)
+        if resolved is None and len(a) == len(y) == len(t) == 1:
+            block = _merge_block(a[0], y[0], t[0])
+            if block is not None:
+                resolved = [block]
+        if resolved is None:
+            has_conflict = True
+            resolved = _conflict(y, t)
+        merged.extend(resolved)
+    return (merged, has_conflict)
+
+
+def merge_html(yours, theirs, ancestor):
+    """
+    Merges two versions of some HTML, given their common ancestor.
+
+    Returns:
+        The tuple (merged_html, has_conflict) where has_conflict is True if
+        the merge could not be done cleanly.  Conflicting parts are
+        included from both versions, preceded by editConflict markers.
+    """
+    if yours == theirs or ancestor == theirs:
+        return (yours, False)
+    if ancestor == yours:
+        return (theirs, False)
+
+    merged = []
+    has_conflict = False
+    for a, y, t in diff3(split_blocks(ancestor), split_blocks(yours),
+                         split_blocks(theirs)):
+        resolved = _resolve(a, y, t)
+        if resolved is None:
+            resolved, chunk_conflict = _merge_chunk(a, y, t)
+            has_conflict = has_conflict or chunk_conflict
+        merged.extend(resolved)
+    return (u''.join(merged), has_conflict)
@@ -0,0 +1,68 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from versionutils.diff.htmldiff import htmldiff
+from versionutils.diff.daisydiff.daisydiff import daisydiff, DAISYDIFF_URL
+
+
+def sample_html(paragraphs):
+    return u''.join([
+        u'<p>Paragraph %d has <strong>some</strong> words and '
+        u'<a href="Page%d">a link</a>.</p>' % (i, i)
+        for i in range(paragraphs)])
+
+
+class Command(BaseCommand):
+    args = '[<old.html> <new.html>]'
+    help = ('Times the in-process HTML diff against the DaisyDiff service.\n' +
+            'Without any files, diffs a generated page against an edited copy.')
+    option_list = BaseCommand.option_list + (
+        make_option('--repeat',
+            type='int',
+            dest='repeat',
+            default=10,
+            help='Number of times to run each diff'),
+        make_option('--paragraphs',
+            type='int',
+            dest='paragraphs',
+            default=500,
+            help='Size of the generated page'),
+        make_option('--daisydiff-url',
+            dest='daisydiff_url',
+            default=DAISYDIFF_URL,
+            help='DaisyDiff service to compare against'),
+    )
+
+    def handle(self, *files, **options):
+        if len(files) == 2:
+            html1, html2 = [open(f).read().decode('utf-8') for f in files]
+        elif not files:
+            html1 = sample_html(options['paragraphs'])
+            html2 = html1.replace(u'Paragraph 1 ', u'The first paragraph ')
+            html2 = html2.replace(u'<strong>some</strong> words and <a href="Page7">',
+                                  u'some words and <a href="Page7">')
+            html2 += u'<p>A new paragraph at the end.</p>'
+        else:
+            raise CommandError("Give either two files to compare or none.")
+
+        self.stdout.write('Diffing %d and %d characters, %d times\n' % (
+            len(html1), len(html2), options['repeat']))
+
+        engines = [
+            ('htmldiff', lambda: htmldiff(html1, html2, max_size=0)),
+            ('daisydiff', lambda: daisydiff(html1, html2, options['daisydiff_url'])),
+        ]
+        for name, run in engines:
+            try:
+                start = time.time()
+                for i in range(options['repeat']):
+                    run()
+                elapsed = time.time() - start
+            except Exception, e:
+                self.stdout.write('%s: unavailable (%s)\n' % (name, e))
+                continue
+            self.stdout.write('%s: %.1fms per diff\n' % (
+                name, elapsed * 1000 / options['repeat']))
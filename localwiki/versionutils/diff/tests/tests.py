@@ -14,6 +14,8 @@ from versionutils.diff.diffutils import FileFieldDiff
 from versionutils.diff.diffutils import ImageFieldDiff
 from versionutils.diff.diffutils import HtmlFieldDiff
 from versionutils.diff.diffutils import GeometryFieldDiff
+from versionutils.diff.htmldiff import htmldiff, HtmlDiffTooLarge
+from versionutils.diff.htmlmerge import merge_html
 
 mgr = TestSettingsManager()
 INSTALLED_APPS = list(settings.INSTALLED_APPS)
@@ -198,18 +200,127 @@ class HtmlFieldTest(TestCase):
         htmlDiff = HtmlFieldDiff('abc', 'def')
         self.assertTrue('def</ins>' in htmlDiff.as_html())
 
-    def test_daisydiff_broken_fallback(self):
+    def test_too_large_fallback(self):
         """
-        In case something is wrong with the DaisyDiff service, fallback to
-        text-only diff
+        If the HTML is too large to diff, fallback to text-only diff
         """
-        backup = HtmlFieldDiff.DAISYDIFF_URL
+        import versionutils.diff.htmldiff
+        backup = versionutils.diff.htmldiff.HTMLDIFF_MAX_SIZE
 
-        HtmlFieldDiff.DAISYDIFF_URL = 'http://badurl'
+        versionutils.diff.htmldiff.HTMLDIFF_MAX_SIZE = 4
         htmlDiff = HtmlFieldDiff('abc', 'def')
         self.assertTrue('<del>abc</del>' in htmlDiff.as_html())
 
-        HtmlFieldDiff.DAISYDIFF_URL = backup
+        versionutils.diff.htmldiff.HTMLDIFF_MAX_SIZE = backup
+
+
+class HtmlDiffTest(TestCase):
+    def test_words(self):
+        tr = htmldiff('<p>The quick fox</p>', '<p>The slow fox</p>')
+        self.assertEqual(tr, '<tr class="htmldiff">'
+            '<td><p>The <del class="diff-html-removed">quick</del> fox</p></td>'
+            '<td><p>The <ins class="diff-html-added">slow</ins> fox</p></td></tr>')
+
+    def test_formatting_change(self):
+        tr = htmldiff('<p>The quick fox</p>', '<p>The <em>quick</em> fox</p>')
+        self.assertTrue('<em><span class="diff-html-changed" changes="em%20added">'
+                        'quick</span></em>' in tr)
+        self.assertFalse('diff-html-added' in tr)
+
+    def test_elements_without_text(self):
+        tr = htmldiff('<p>A <img src="a.png"> picture</p>',
+                      '<p>A <img src="b.png"> picture</p>')
+        self.assertTrue('<del class="diff-html-removed"><img src="a.png"></del>' in tr)
+        self.assertTrue('<ins class="diff-html-added"><img src="b.png"></ins>' in tr)
+
+    def test_escaping(self):
+        tr = htmldiff('<p>1 &lt; 2</p>', '<p>1 &lt; 3</p>')
+        self.assertTrue('<p>1 &lt; <del class="diff-html-removed">2</del></p>' in tr)
+
+    def test_size_cap(self):
+        self.assertRaises(HtmlDiffTooLarge, htmldiff, 'abc', 'def', max_size=4)
+
+
+class HtmlMergeTest(TestCase):
+    def test_one_side_changed(self):
+        (body, conflict) = merge_html('<p>Original</p>', '<p>Changed</p>',
+                                      '<p>Original</p>')
+        self.assertFalse(conflict)
+        self.assertEqual(body, '<p>Changed</p>')
+
+    def test_merge_clean(self):
+        (body, conflict) = merge_html(
+            '<p>New stuff before</p><p>Original</p>',
+            '<p>Original</p><p>New stuff after</p>',
+            '<p>Original</p>'
+        )
+        self.assertFalse(conflict)
+        self.assertEqual(body,
+            '<p>New stuff before</p><p>Original</p><p>New stuff after</p>')
+
+    def test_merge_different_blocks(self):
+        (body, conflict) = merge_html(
+            '<p>Pizza, served hot.</p><p>Open late.</p>',
+            '<p>Pizza.</p><p>Open late, except Sundays.</p>',
+            '<p>Pizza.</p><p>Open late.</p>'
+        )
+        self.assertFalse(conflict)
+        self.assertEqual(body,
+            '<p>Pizza, served hot.</p><p>Open late, except Sundays.</p>')
+
+    def test_merge_same_block(self):
+        (body, conflict) = merge_html(
+            '<p>The quick brown fox jumps.</p>',
+            '<p>The quick fox <em>leaps</em>.</p>',
+            '<p>The quick fox jumps.</p>'
+        )
+        self.assertFalse(conflict)
+        self.assertEqual(body, '<p>The quick brown fox <em>leaps</em>.</p>')
+
+    def test_merge_formatting(self):
+        (body, conflict) = merge_html(
+            '<p>The quick fox jumps!</p>',
+            '<p>The <strong>quick</strong> fox jumps.</p>',
+            '<p>The quick fox jumps.</p>'
+        )
+        self.assertFalse(conflict)
+        self.assertEqual(body, '<p>The <strong>quick</strong> fox jumps!</p>')
+
+    def test_merge_conflict(self):
+        (body, conflict) = merge_html(
+            '<p>First version</p>',
+            '<p>Second version</p>',
+            '<p>Original</p>'
+        )
+        self.assertTrue(conflict)
+        self.assertEqual(body,
+            '<strong class="editConflict">Edit conflict! Other version:</strong>'
+            '<p>Second version</p>'
+            '<strong class="editConflict">Edit conflict! Your version:</strong>'
+            '<p>First version</p>')
+
+    def test_merge_conflict_keeps_rest(self):
+        (body, conflict) = merge_html(
+            '<p>Intro</p><p>Mine</p><p>Outro</p>',
+            '<p>Intro</p><p>Theirs</p><p>Outro, updated</p>',
+            '<p>Intro</p><p>Original</p><p>Outro</p>'
+        )
+        self.assertTrue(conflict)
+        self.assertTrue(body.startswith('<p>Intro</p><strong class="editConflict">'))
+        self.assertTrue(body.endswith('<p>Mine</p><p>Outro, updated</p>'))
+
+    def test_both_added_at_end(self):
+        (body, conflict) = merge_html(
+            '<p>Sausages!</p><p>Mine</p>',
+            '<p>Sausages!</p><p>Theirs</p><p>More of theirs</p>',
+            '<p>Sausages!</p>'
+        )
+        self.assertTrue(conflict)
+        self.assertEqual(body, '<p>Sausages!</p>'
+            '<strong class="editConflict">Edit conflict! Other version:</strong>'
+            '<p>Theirs</p><p>More of theirs</p>'
+            '<strong class="editConflict">Edit conflict! Your version:</strong>'
+            '<p>Mine</p>')
 
 
 class GeometryFieldDiffTest(BaseFieldDiffTest):
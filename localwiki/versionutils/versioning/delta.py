@@ -0,0 +1,245 @@
+"""
+Delta storage for large text fields on historical records.
+
+Models registered with delta_fields (see registry.register) get an extra
+history_delta_base field on their historical model.  When it's empty the
+historical record stores its delta fields in full -- it's a "keyframe".
+Otherwise it points at the history_id of a keyframe for the same object
+and the delta fields hold diff_match_patch deltas against the keyframe's
+values.
+
+Every keyframe is followed by at most VERSIONUTILS_DELTA_KEYFRAME_INTERVAL
+- 1 delta records, and we start a new keyframe early if a delta isn't
+much smaller than the text itself, so reading any version costs at most
+one extra fetch.  Deltas are turned back into text lazily, when one of the
+delta fields is first accessed on the historical instance.
+"""
+import threading
+
+from django.conf import settings
+
+
+# How many recently used keyframes we keep around, per process.
+KEYFRAME_CACHE_SIZE = 200
+
+_keyframes = {}
+_keyframes_lock = threading.Lock()
+
+
+def delta_storage_enabled():
+    return getattr(settings, 'VERSIONUTILS_DELTA_STORAGE', False)
+
+
+def keyframe_interval():
+    return getattr(settings, 'VERSIONUTILS_DELTA_KEYFRAME_INTERVAL', 25)
+
+
+def max_delta_ratio():
+    return getattr(settings, 'VERSIONUTILS_DELTA_MAX_RATIO', 0.5)
+
+
+def _dmp():
+    from versionutils.diff.diff_match_patch import diff_match_patch
+    dmp = diff_match_patch()
+    dmp.Diff_Timeout = 0.5
+    return dmp
+
+
+def make_delta(base, text):
+    """
+    Returns:
+        A delta that turns `base` into `text`.
+    """
+    dmp = _dmp()
+    diffs = dmp.diff_main(base, text, False)
+    dmp.diff_cleanupEfficiency(diffs)
+    return dmp.diff_toDelta(diffs)
+
+
+def apply_delta(base, delta):
+    """
+    Returns:
+        The text made by applying `delta`, from make_delta(), to `base`.
+    """
+    dmp = _dmp()
+    return dmp.diff_text2(dmp.diff_fromDelta(base, delta))
+
+
+def encode(keyframe_values, values):
+    """
+    Args:
+        keyframe_values: The values of the delta fields on the keyframe.
+        values: The values of the delta fields on the new record.
+
+    Returns:
+        A list of deltas to store in place of `values`, or None if the
+        values should be stored in full.
+    """
+    deltas = []
+    for base, text in zip(keyframe_values, values):
+        if not isinstance(base, basestring) or not isinstance(text, basestring):
+            return None
+        delta = make_delta(base, text)
+        if len(delta) > len(text) * max_delta_ratio():
+            return None
+        if apply_delta(base, delta) != text:
+            # Shouldn't happen, but never store something we can't read.
+            return None
+        deltas.append(delta)
+    return deltas
+
+
+def _cache_keyframe(key, values):
+    with _keyframes_lock:
+        if len(_keyframes) >= KEYFRAME_CACHE_SIZE:
+            _keyframes.clear()
+        _keyframes[key] = values
+
+
+def get_full_values(hist_model, history_id):
+    """
+    Returns:
+        The full values of the delta fields of the historical record
+        with id `history_id`.
+    """
+    fields = hist_model._history_delta_fields
+    key = (hist_model._meta.db_table, history_id)
+    values = _keyframes.get(key)
+    if values is not None:
+        return values
+
+    row = hist_model._default_manager.filter(history_id=history_id).values_list(
+        'history_delta_base', *fields)[0]
+    base_id, values = row[0], list(row[1:])
+    if base_id is not None:
+        # The keyframe has itself been compacted since we looked.
+        values = [apply_delta(base, delta) for base, delta in
+                  zip(get_full_values(hist_model, base_id), values)]
+    _cache_keyframe(key, values)
+    return values
+
+
+def materialize(m):
+    """
+    Replaces the deltas on the historical instance `m` with the full
+    values.  After this `m` looks like a keyframe.
+    """
+    d = object.__getattribute__(m, '__dict__')
+    base_id = d.get('history_delta_base')
+    if base_id is None:
+        return
+    hist_model = type(m)
+    keyframe_values = get_full_values(hist_model, base_id)
+    for name, base in zip(hist_model._history_delta_fields, keyframe_values):
+        d[name] = apply_delta(base, d[name])
+    d['history_delta_base'] = None
+
+
+def delta_attrs(hist_model, pk, values, latest=None):
+    """
+    Decides how to store a new historical record for the object with
+    primary key `pk`.
+
+    Args:
+        hist_model: The historical model.
+        pk: The primary key of the object.
+        values: The values of its delta fields.
+        latest: Optional (pk, history_id, history_delta_base) of the most
+            recent historical record of the object.
+
+    Returns:
+        A dictionary of the history_delta_base and delta fields to store,
+        or an empty dictionary to store the record as a keyframe.
+    """
+    if latest is None:
+        return {}
+    latest_pk, latest_id, latest_base = latest
+    if latest_pk != pk:
+        # Only ever point at keyframes of the same object.
+        return {}
+    keyframe_id = latest_base or latest_id
+    num_deltas = hist_model._default_manager.filter(
+        history_delta_base=keyframe_id).count()
+    if num_deltas + 1 >= keyframe_interval():
+        return {}
+    deltas = encode(get_full_values(hist_model, keyframe_id), values)
+    if deltas is None:
+        return {}
+    attrs = dict(zip(hist_model._history_delta_fields, deltas))
+    attrs['history_delta_base'] = keyframe_id
+    return attrs
+
+
+def _delta_fields_of(hist_model):
+    return getattr(hist_model, '_history_delta_fields', None)
+
+
+def keyframe_pre_delete(sender, instance, **kws):
+    """
+    Before a keyframe is deleted, store the records that depend on it in
+    full.
+    """
+    fields = _delta_fields_of(sender)
+    if not fields:
+        return
+    d = object.__getattribute__(instance, '__dict__')
+    if d.get('history_delta_base') is not None:
+        return
+    history_id = d.get('history_id')
+    dependents = sender._default_manager.filter(history_delta_base=history_id)
+    keyframe_values = [d.get(f) for f in fields]
+    for row in dependents.values_list('history_id', *fields):
+        full = [apply_delta(base, delta) for base, delta in zip(keyframe_values, row[1:])]
+        attrs = dict(zip(fields, full))
+        attrs['history_delta_base'] = None
+        sender._default_manager.filter(history_id=row[0]).update(**attrs)
+
+
+def compact(hist_model, pk_name, pk):
+    """
+    Rewrites the history of the object with primary key `pk` into
+    keyframes and deltas.
+
+    Returns:
+        The tuple (number of records, number of records rewritten).
+    """
+    fields = hist_model._history_delta_fields
+    manager = hist_model._default_manager
+    history = manager.filter(**{pk_name: pk}).order_by('history_date', 'history_id')
+    # Original keyframes that other records are currently stored against.
+    referenced = set(history.filter(history_delta_base__isnull=False).values_list(
+        'history_delta_base', flat=True))
+    originals = {}
+
+    keyframe_id = keyframe_values = None
+    num_deltas = 0
+    n = n_rewritten = 0
+    for row in history.values_list('history_id', 'history_delta_base', *fields).iterator():
+        history_id, base_id, stored = row[0], row[1], list(row[2:])
+        n += 1
+        if base_id is None:
+            values = stored
+        elif base_id in originals:
+            values = [apply_delta(b, s) for b, s in zip(originals[base_id], stored)]
+        else:
+            values = [apply_delta(b, s) for b, s in
+                      zip(get_full_values(hist_model, base_id), stored)]
+        if history_id in referenced:
+            originals[history_id] = values
+
+        deltas = None
+        if keyframe_id is not None and num_deltas + 1 < keyframe_interval():
+            deltas = encode(keyframe_values, values)
+        if deltas is None:
+            new_base, new_stored = None, values
+            keyframe_id, keyframe_values, num_deltas = history_id, values, 0
+        else:
+            new_base, new_stored = keyframe_id, deltas
+            num_deltas += 1
+
+        if new_base != base_id or new_stored != stored:
+            attrs = dict(zip(fields, new_stored))
+            attrs['history_delta_base'] = new_base
+            manager.filter(history_id=history_id).update(**attrs)
+            n_rewritten += 1
+    return (n, n_rewritten)
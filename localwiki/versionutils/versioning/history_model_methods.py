@@ -16,6 +16,7 @@ from django.core.exceptions import ObjectDoesNotExist
 
 from constants import *
 from utils import *
+from delta import materialize
 
 
 def get_history_methods(self, model):
@@ -52,6 +53,9 @@ def get_history_fields(self, model):
         'history__object_rel_populated': HistoricalObjectDescriptor(
             model, populate_related=True),
         'history_date': models.DateTimeField(default=datetime.datetime.now, db_index=True),
+        # Assigned in order as records are created, see
+        # ChangesTracker.create_historical_record.
+        'history_version': models.IntegerField(null=True, db_index=True),
         'history_version_number': version_number_of,
         'history_type': models.SmallIntegerField(choices=TYPE_CHOICES),
         'history_type_verbose': type_to_verbose,
@@ -250,6 +254,10 @@ def historical_record_getattribute(model, m, name):
     direct_val = basedict.get('_wrapped_lookup_fields', {}).get(name)
     if direct_val is not None:
         return direct_val
+    if (basedict.get('history_delta_base') is not None and
+            name in type(m)._history_delta_fields):
+        # Stored as a delta -- rebuild the full values on first access.
+        materialize(m)
     # We allow the original attribute to be obtained by asking for
     # m.__direct_name.
     if name.startswith('__direct_'):
@@ -434,6 +442,9 @@ def version_number_of(hm):
     Args:
         hm: Historical record instance.
     """
+    if hm.history_version is not None:
+        return hm.history_version
+    # Records from before version numbers were stored.
     if getattr(hm.version_info.instance, '_version_number', None) is None:
         date = hm.version_info.date
         obj = hm.version_info._object
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import models, transaction
+
+from versionutils.versioning import delta
+from versionutils.versioning.utils import is_versioned, get_versions
+
+
+def delta_models():
+    """
+    Returns:
+        The versioned models that have delta_fields.
+    """
+    return [m for m in models.get_models() if is_versioned(m) and
+            getattr(get_versions(m).model, '_history_delta_fields', None)]
+
+
+class Command(BaseCommand):
+    args = '[<app_label.ModelName> ...]'
+    help = ('Rewrites the history of models registered with delta_fields into '
+            'keyframes and deltas.\nWith no arguments, compacts all of them.')
+
+    def handle(self, *labels, **options):
+        if labels:
+            to_compact = []
+            for label in labels:
+                model = models.get_model(*label.split('.', 1))
+                if model is None or model not in delta_models():
+                    raise CommandError("%s isn't versioned with delta_fields" % label)
+                to_compact.append(model)
+        else:
+            to_compact = delta_models()
+
+        for model in to_compact:
+            hist_model = get_versions(model).model
+            pk_name = model._meta.pk.attname
+            pks = hist_model._default_manager.order_by(pk_name).values_list(
+                pk_name, flat=True).distinct()
+            total = rewritten = 0
+            for pk in pks.iterator():
+                with transaction.commit_on_success():
+                    n, n_rewritten = delta.compact(hist_model, pk_name, pk)
+                total += n
+                rewritten += n_rewritten
+            self.stdout.write('%s: rewrote %d of %d historical records\n' % (
+                model._meta.object_name, rewritten, total))
@@ -187,7 +187,7 @@ class HistoryManager(models.Manager):
         """
         try:
             if version and version > 0:
-                v = self.all().order_by('history_date')[version - 1]
+                v = self.filter(history_version=version)[0]
             elif date:
                 v = self.filter(history_date__lte=date)[0]
         except IndexError:
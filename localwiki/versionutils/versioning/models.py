@@ -1,8 +1,9 @@
 import copy
 from functools import partial
 from collections import defaultdict
+from contextlib import contextmanager
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.db.models.options import DEFAULT_NAMES as ALL_META_OPTIONS
 from django.utils.translation import string_concat
@@ -14,11 +15,15 @@ from history_model_methods import get_history_fields
 from history_model_methods import get_history_methods
 import fields
 import manager
+import delta
 
 
 class ChangesTracker(object):
-    def connect(self, m, manager_name=None):
+    def connect(self, m, manager_name=None, delta_fields=None):
         self.manager_name = manager_name
+        self.delta_fields = tuple(delta_fields or ())
+        if self.delta_fields and m._meta.parents:
+            raise ValueError("delta_fields aren't supported on subclassed models")
 
         if m._meta.abstract:
             # We can't do anything on the abstract model.
@@ -32,6 +37,9 @@ class ChangesTracker(object):
                 history_model = get_versions(m).model
         else:
             history_model = self.create_history_model(m)
+            if self.delta_fields:
+                models.signals.pre_delete.connect(delta.keyframe_pre_delete,
+                    sender=history_model, weak=False)
 
         do_versioning = getattr(
             settings, 'VERSIONUTILS_VERSIONING_ENABLED', True)
@@ -114,6 +122,8 @@ class ChangesTracker(object):
             attrs.update(get_history_fields(self, model))
             attrs.update(self.get_extra_history_fields(model))
         attrs.update(self.get_fields(model))
+        if self.delta_fields:
+            attrs.update(self.get_delta_fields(model))
 
         name = '%s_hist' % model._meta.object_name
         # If we have a parent (meaning we're concretely subclassing)
@@ -391,6 +401,17 @@ class ChangesTracker(object):
         }
         return attrs
 
+    def get_delta_fields(self, model):
+        """
+        Fields for storing some of the historical values as deltas.  See
+        delta.py.
+        """
+        return {
+            '_history_delta_fields': self.delta_fields,
+            'history_delta_base': models.IntegerField(null=True, blank=True,
+                db_index=True),
+        }
+
     META_TO_SKIP = [
         'db_table', 'get_latest_by', 'managed', 'unique_together', 'ordering',
     ]
@@ -528,11 +549,13 @@ class ChangesTracker(object):
         for field in instance._meta.many_to_many:
             parent_model = field.rel.to
             if is_versioned(parent_model):
-                current_objs = getattr(instance, field.name).all()
-                m2m_items = []
-                for o in current_objs:
-                    m2m_items.append(get_versions(o).most_recent())
-                setattr(hist_instance, field.name, m2m_items)
+                current_pks = getattr(instance, field.name).values_list(
+                    'pk', flat=True)
+                m2m_items = most_recent_versions(parent_model, current_pks)
+                if m2m_items:
+                    # The historical instance is new, so there's nothing to
+                    # clear first.
+                    getattr(hist_instance, field.name).add(*m2m_items)
 
     def m2m_changed(self, attname, sender, instance, action, reverse,
                     model, pk_set, **kwargs):
@@ -547,22 +570,22 @@ class ChangesTracker(object):
             # Skip this signal when we have version tracking disabled.
             return
 
-        if pk_set:
-            changed_ms = [model.objects.get(pk=pk) for pk in pk_set]
-            hist_changed_ms = []
-            for m in changed_ms:
-                hist_changed_ms.append(get_versions(m).most_recent())
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        if action != 'post_clear' and not pk_set:
+            return
 
         hist_instance = get_versions(instance).most_recent()
         hist_through = getattr(hist_instance, attname)
-        if action == 'post_add':
-            for hist_m in hist_changed_ms:
-                hist_through.add(hist_m)
-        elif action == 'post_remove':
-            for hist_m in hist_changed_ms:
-                hist_through.remove(hist_m)
-        elif action == 'post_clear':
+        if action == 'post_clear':
             hist_through.clear()
+            return
+        # add() and remove() write all of the through rows in one go.
+        hist_changed_ms = most_recent_versions(model, pk_set)
+        if action == 'post_add':
+            hist_through.add(*hist_changed_ms)
+        else:
+            hist_through.remove(*hist_changed_ms)
 
     def create_historical_record(self, instance, type):
         manager = getattr(instance, self.manager_name)
@@ -603,7 +626,61 @@ class ChangesTracker(object):
             attrs[field.attname] = getattr(instance, field.attname)
 
         attrs.update(self._get_save_with_attrs(instance))
-        return manager.create(history_type=type, **attrs)
+
+        latest_fields = [instance._meta.pk.attname, 'history_id', 'history_version']
+        if self.delta_fields:
+            latest_fields.append('history_delta_base')
+        with self._numbering_lock(instance):
+            latest = list(manager.all().values_list(*latest_fields)[:1])
+            latest = latest[0] if latest else None
+            attrs['history_version'] = self._next_version_number(manager, latest)
+            if self.delta_fields and delta.delta_storage_enabled():
+                attrs.update(self._get_delta_attrs(instance, manager, attrs, latest))
+            return manager.create(history_type=type, **attrs)
+
+    @contextmanager
+    def _numbering_lock(self, instance):
+        """
+        Holds a lock on the instance's row while its next version number is
+        worked out and the record written, so that concurrent saves of the
+        same object are numbered one after the other.
+
+        Outside of a managed transaction (e.g. in Celery tasks and
+        management commands, which autocommit) the lock would be dropped
+        straight away, so we take it in a transaction of our own.
+        """
+        rows = instance.__class__._base_manager.select_for_update().\
+            filter(pk=instance.pk).values_list('pk')
+        if transaction.is_managed():
+            list(rows)
+            yield
+        else:
+            with transaction.commit_on_success():
+                list(rows)
+                yield
+
+    def _next_version_number(self, manager, latest):
+        """
+        The number of the record we're about to create.  Called under
+        _numbering_lock(), so concurrent saves of the same object can't be
+        handed the same number.
+        """
+        if latest is None:
+            return 1
+        if latest[2] is None:
+            # History from before version numbers were stored.
+            return manager.all().count() + 1
+        return latest[2] + 1
+
+    def _get_delta_attrs(self, instance, manager, attrs, latest):
+        """
+        Store the delta fields as deltas against the object's latest
+        keyframe, when that's worthwhile.
+        """
+        values = [attrs[name] for name in self.delta_fields]
+        if latest is not None:
+            latest = (latest[0], latest[1], latest[3])
+        return delta.delta_attrs(manager.model, instance.pk, values, latest)
 
     def _get_save_with_attrs(self, instance):
         """
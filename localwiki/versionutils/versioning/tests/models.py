@@ -357,6 +357,13 @@ class M31(models.Model):
 versioning.register(M31)
 
 
+class M32Delta(models.Model):
+    a = models.CharField(max_length=200)
+    b = models.TextField()
+
+versioning.register(M32Delta, delta_fields=['b'])
+
+
 TEST_MODELS = [
     M1, M2, M3BigInteger, M4Date, M5Decimal, M6Email, M7Numbers,
     M8Time, M9URL, M10File, M11Image, M12ForeignKey, M13ForeignKeySelf,
@@ -367,7 +374,7 @@ TEST_MODELS = [
     M24SubclassProxy, M25SubclassAbstract,
     M26SubclassConcreteA, M26ConcreteModelB,
     M26SubclassConcreteB, M26ConcreteModelC, M26SubclassConcreteC,
-    MUniqueAndFK, MUniqueAndFK2,
+    MUniqueAndFK, MUniqueAndFK2, M32Delta,
     NonVersionedModel, M27FKToNonVersioned,
     M28OneToOneNonVersioned,
     M29, M30, M31,
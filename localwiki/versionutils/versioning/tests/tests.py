@@ -11,6 +11,8 @@ from django.core.files.base import ContentFile
 from django.utils.unittest import skipIf
 from django.test.utils import override_settings
 
+from localwiki.utils.queries import count_queries
+
 from utils import TestSettingsManager
 from models import *
 from versionutils.versioning.constants import *
@@ -354,6 +356,26 @@ class ChangesTrackingTest(TestCase):
             m_old = m.versions.as_of(version=i)
             self.assertEqual(m_old.c, i)
 
+    def test_stored_version_number(self):
+        m = M16Unique(a="numbered", b="first", c=1)
+        m.save()
+        m.b = "second"
+        m.save()
+        m.delete()
+        # Re-created objects carry on with the same history.
+        m = M16Unique(a="numbered", b="third", c=1)
+        m.save()
+
+        self.assertEqual(
+            [h.version_info.version for h in m.versions.all().order_by('history_id')],
+            [1, 2, 3, 4])
+        # Looking up a version is a single query, however long the history.
+        with self.assertNumQueries(1):
+            m_old = m.versions.as_of(version=2)
+        with self.assertNumQueries(0):
+            self.assertEqual(m_old.version_info.version_number(), 2)
+        self.assertEqual(m_old.b, "second")
+
     def test_version_date_grab(self):
         m = M2(a="Yay versioning!", b="Hey!", c=1)
         m.save()
@@ -959,6 +981,35 @@ class ChangesTrackingTest(TestCase):
         tags = m19_h.tags.all()
         self.assertEqual(set([t.name for t in tags]), set(["T1", "T2"]))
 
+    def test_m2m_history_queries(self):
+        # Keeping the ManyToMany history in sync shouldn't cost queries
+        # per related object.
+        def num_queries(func):
+            with count_queries() as queries:
+                func()
+            return queries.count
+
+        counts = []
+        for n in (2, 30):
+            tags = [LameTag(name="bulk %d" % i) for i in range(n)]
+            for t in tags:
+                t.save()
+            m19 = M19ManyToManyFieldVersioned(a="tagged %d" % n)
+            m19.save()
+            add_queries = num_queries(lambda: m19.tags.add(*tags))
+            m19.a += "!"
+            save_queries = num_queries(m19.save)
+            counts.append((add_queries, save_queries))
+
+            m19_h = m19.versions.most_recent()
+            self.assertEqual(set([t.name for t in m19_h.tags.all()]),
+                             set([t.name for t in tags]))
+            removed = tags[:n / 2]
+            m19.tags.remove(*removed)
+            m19_h = m19.versions.most_recent()
+            self.assertEqual(len(m19_h.tags.all()), n - len(removed))
+        self.assertEqual(counts[0], counts[1])
+
     def test_fk_to_self_hist_lookup(self):
         m = M13ForeignKeySelf(a=None, b="Yo!")
         m.save()
@@ -1356,3 +1407,54 @@ class ChangesTrackingTest(TestCase):
         self.assertEqual(len(m.versions.all()), 0)
         m.delete()
         self.assertEqual(len(m.versions.all()), 0)
+
+    @override_settings(VERSIONUTILS_DELTA_STORAGE=True,
+                       VERSIONUTILS_DELTA_KEYFRAME_INTERVAL=3)
+    def test_delta_storage(self):
+        text = u"A long enough paragraph of text to be worth storing as a delta. " * 10
+        m = M32Delta(a="delta", b=text)
+        m.save()
+        for i in range(4):
+            m.b = m.b + u"Edit %d." % i
+            m.save()
+
+        stored = M32Delta.versions.filter(a="delta").order_by('history_id')
+        bases = [h['history_delta_base'] for h in stored.values('history_delta_base')]
+        ids = [h.history_id for h in stored]
+        # A keyframe is followed by up to two deltas, then a new keyframe.
+        self.assertEqual(bases, [None, ids[0], ids[0], None, ids[3]])
+        # The deltas are much smaller than the text.
+        self.assertTrue(len(stored.values_list('b', flat=True)[1]) < 100)
+
+        # Each version reads back in full.
+        for n, h in enumerate(stored):
+            expected = text + u"".join([u"Edit %d." % i for i in range(n)])
+            self.assertEqual(h.b, expected)
+        self.assertEqual(m.versions.as_of(version=2).b, text + u"Edit 0.")
+
+        # Deleting a keyframe stores the versions that need it in full.
+        M32Delta.versions.filter(history_id=ids[0]).delete()
+        h = M32Delta.versions.get(history_id=ids[2])
+        self.assertEqual(h.history_delta_base, None)
+        self.assertEqual(h.b, text + u"Edit 0.Edit 1.")
+
+    def test_compact_history(self):
+        from versionutils.versioning import delta
+
+        text = u"Some text that is edited a little bit at a time. " * 10
+        m = M32Delta(a="compact", b=text)
+        m.save()
+        for i in range(3):
+            m.b = m.b + u"Edit %d." % i
+            m.save()
+        hist_model = M32Delta.versions.model
+        stored = M32Delta.versions.filter(a="compact")
+        self.assertEqual(stored.filter(history_delta_base__isnull=False).count(), 0)
+
+        self.assertEqual(delta.compact(hist_model, 'id', m.id), (4, 3))
+        self.assertEqual(stored.filter(history_delta_base__isnull=True).count(), 1)
+        for n, h in enumerate(stored.order_by('history_id')):
+            expected = text + u"".join([u"Edit %d." % i for i in range(n)])
+            self.assertEqual(h.b, expected)
+        # Nothing left to do the second time around.
+        self.assertEqual(delta.compact(hist_model, 'id', m.id), (4, 0))
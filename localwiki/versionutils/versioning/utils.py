@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Max
 from django.conf import settings
 from django.db.models.constants import LOOKUP_SEP
 
@@ -51,6 +52,45 @@ def get_versions(m):
     return getattr(m, history_manager_name)
 
 
+def most_recent_versions(model, pks):
+    """
+    Looks up the most recent historical records of many objects at once,
+    rather than calling get_versions(obj).most_recent() on each.
+
+    Args:
+        model: A versioned model class.
+        pks: The primary keys of objects of the model.
+
+    Returns:
+        A list of the most recent historical record of each object, in the
+        same order as pks.
+    """
+    pks = list(pks)
+    if not pks:
+        return []
+    hist_model = get_versions(model).model
+    pk_name = model._meta.pk.attname
+
+    by_pk = {}
+    if not model._meta.pk.rel:
+        latest_ids = hist_model.objects.filter(
+            **{'%s__in' % pk_name: pks}).order_by().values(
+            pk_name).annotate(Max('history_id'))
+        latest = hist_model.objects.in_bulk(
+            [v['history_id__max'] for v in latest_ids])
+        for h in latest.itervalues():
+            by_pk[getattr(h, pk_name)] = h
+
+    hist_objs = []
+    for pk in pks:
+        if pk not in by_pk:
+            # Concretely subclassed, or the history is only findable by
+            # the object's unique fields.
+            by_pk[pk] = get_versions(model.objects.get(pk=pk)).most_recent()
+        hist_objs.append(by_pk[pk])
+    return hist_objs
+
+
 def is_directly_versioned(m):
     """
     Args: